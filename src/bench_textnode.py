@@ -0,0 +1,70 @@
+import timeit
+import tracemalloc
+
+from textnode import (TextNode, TextType, DELIMITER_TYPES, extract_emails, extract_images, extract_links, split_nodes,
+                      split_nodes_delimiter, text_to_textnodes, markdown_to_html_node, markdown_to_html_tree)
+
+def text_to_textnodes_multipass(text):
+    """Reference implementation of text_to_textnodes, one split pass per inline syntax"""
+    nodes = [TextNode(text, TextType.NORMAL)]
+    nodes = split_nodes(nodes, extract_images, TextType.IMAGE)
+    nodes = split_nodes(nodes, extract_links, TextType.LINK)
+    nodes = split_nodes(nodes, extract_emails, TextType.EMAIL)
+    for delimiter, text_type in DELIMITER_TYPES:
+        nodes = split_nodes_delimiter(nodes, delimiter, text_type)
+    return nodes
+
+LINK = "[link {idx}](https://example.com/posts/{idx}) "
+EMPHASIS = "**bold {idx}** some _italic {idx}_ and `code {idx}` "
+
+def bench(name, line, number):
+    assert text_to_textnodes(line) == text_to_textnodes_multipass(line)
+    multipass = min(timeit.repeat(lambda: text_to_textnodes_multipass(line), number=number, repeat=3))
+    single_pass = min(timeit.repeat(lambda: text_to_textnodes(line), number=number, repeat=3))
+    print(f"{name:<28}{multipass / number * 1e3:>12.3f} ms{single_pass / number * 1e3:>12.3f} ms{multipass / single_pass:>9.1f}x")
+
+# Adversarial lines by size; the time of each must grow linearly with it
+ADVERSARIAL = {
+    'nested url path': lambda size: "[a](" + "/a" * (size // 2) + " ",
+    'unclosed brackets': lambda size: "[" * size,
+    'long domain': lambda size: "[a](http://" + "a." * (size // 2),
+    'unclosed emails': lambda size: "<a@" * (size // 3),
+    'setext paragraph': lambda size: "word " * (size // 5),
+}
+
+def bench_adversarial():
+    sizes = (10_000, 100_000, 1_000_000)
+    print(f"{'adversarial line':<28}" + ''.join(f"{size:>12,} ch" for size in sizes))
+    for name, make_line in ADVERSARIAL.items():
+        timings = [min(timeit.repeat(lambda: markdown_to_html_node(line), number=1, repeat=3))
+                   for line in map(make_line, sizes)]
+        print(f"{name:<28}" + ''.join(f"{timing * 1e3:>12.1f} ms" for timing in timings))
+
+def large_page(paragraphs):
+    blocks = []
+    for idx in range(paragraphs):
+        blocks.append(f"## Section {idx}")
+        blocks.append(f"Some **bold {idx}** text with _italic_, `code` and a [link](/posts/{idx}).\nA second line with ![an image](/images/{idx}.png).")
+        blocks.append(f"- item **{idx}**\n- item [{idx}](https://example.com/{idx})\n- item _{idx}_")
+    return '\n\n'.join(blocks)
+
+def bench_large_page(paragraphs=20000):
+    page = large_page(paragraphs)
+    timing = min(timeit.repeat(lambda: markdown_to_html_node(page), number=1, repeat=3))
+    tracemalloc.start()
+    markdown_to_html_tree(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"large page ({len(page) / 1e6:.1f} MB markdown): {timing * 1e3:.0f} ms to HTML, {peak / 1e6:.1f} MB peak for the tree")
+
+if __name__ == '__main__':
+    print(f"{'line':<28}{'multipass':>15}{'single pass':>15}{'speedup':>10}")
+    for count in (10, 100, 1000, 10000):
+        bench(f"{count} links", ''.join(LINK.format(idx=idx) for idx in range(count)), 200 // count or 1)
+    for count in (10, 100, 1000, 10000):
+        bench(f"{count} emphasis groups", ''.join(EMPHASIS.format(idx=idx) for idx in range(count)), 200 // count or 1)
+    bench("prose", "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20, 200)
+    print()
+    bench_adversarial()
+    print()
+    bench_large_page()
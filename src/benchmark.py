@@ -0,0 +1,164 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import textnode as tn
+from copy_static import copy_static, sync_static
+from corpus import SHAPES, generate_corpus, write_corpus, write_static
+from generate_page import generate_pages_recursive
+from manifest import new_manifest
+from template import compile_template
+
+RESULTS_VERSION = 1
+TEMPLATE = '<html><head><title>{{ Title }}</title></head><body><article>{{ Content }}</article></body></html>'
+
+def best_of(function, repeat):
+    """Lowest wall time of `repeat` calls, in seconds. Output printed by the function is discarded."""
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def bench_stages(pages, repeat):
+    """Times each stage of the pipeline on its own, over every page of a corpus"""
+    markdowns = list(pages.values())
+    blocks = [block for markdown in markdowns for block in tn.markdown_to_blocks(markdown)]
+    lines = [line for block in blocks if tn.block_to_block_type(block) is not tn.BlockType.CODE
+             for line in block.split('\n')]
+    trees = [tn.markdown_to_html_tree(markdown) for markdown in markdowns]
+    contents = [tree.to_html() for tree in trees]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template_path = os.path.join(tmp_dir, 'template.html')
+        with open(template_path, 'w') as template_file:
+            template_file.write(TEMPLATE)
+        template = compile_template(template_path)
+
+    return {
+        'markdown_to_blocks': best_of(lambda: [tn.markdown_to_blocks(markdown) for markdown in markdowns], repeat),
+        'block_to_block_type': best_of(lambda: [tn.block_to_block_type(block) for block in blocks], repeat),
+        'text_to_textnodes': best_of(lambda: [tn.text_to_textnodes(line) for line in lines], repeat),
+        'to_html': best_of(lambda: [tree.to_html() for tree in trees], repeat),
+        'template': best_of(lambda: [template.render({'Title': 'Title', 'Content': content}, '/charlot/')
+                                     for content in contents], repeat),
+    }
+
+def bench_build(pages, repeat):
+    """End-to-end build of the corpus into a fresh docs/, then an incremental one with nothing changed.
+    The build runs from the temporary directory, with relative paths like those of main.py."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            write_corpus(pages, 'content')
+            with open('template.html', 'w') as template_file:
+                template_file.write(TEMPLATE)
+            build = lambda dest_dir, manifest=None: generate_pages_recursive('content', 'template.html', dest_dir, '/', manifest)
+            builds = iter(range(repeat))
+            manifest = new_manifest()
+            best_of(lambda: build('docs', manifest), 1)
+            return {
+                'build': best_of(lambda: build(f"docs{next(builds)}"), repeat),
+                'build_unchanged': best_of(lambda: build('docs', manifest), repeat),
+            }
+        finally:
+            os.chdir(cwd)
+
+def bench_static(repeat, files=200, size=1 << 16):
+    """Full copy of a static tree against a sync of it with nothing changed"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        static_dir = os.path.join(tmp_dir, 'static')
+        write_static(static_dir, files, size)
+        manifest = new_manifest()
+        best_of(lambda: sync_static(static_dir, os.path.join(tmp_dir, 'synced'), manifest), 1)
+        return {
+            'copy_static': best_of(lambda: copy_static(static_dir, os.path.join(tmp_dir, 'copied')), repeat),
+            'sync_static_unchanged': best_of(lambda: sync_static(static_dir, os.path.join(tmp_dir, 'synced'), manifest), repeat),
+        }
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+def run_benchmarks(shapes, scale=1, repeat=3):
+    results = {}
+    for shape in shapes:
+        pages = generate_corpus(shape, scale)
+        print(f"Benchmarking {shape} ({len(pages)} pages, {sum(map(len, pages.values())) / 1e6:.1f} MB)")
+        results[shape] = bench_stages(pages, repeat) | bench_build(pages, repeat)
+    results['static'] = bench_static(repeat)
+    return {
+        'version': RESULTS_VERSION,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'scale': scale,
+        'results': results,
+    }
+
+def compare_results(baseline, current, threshold=0.1):
+    """Returns (shape, stage, baseline seconds, current seconds) for every stage slower than the
+    baseline by more than threshold, as a fraction"""
+    regressions = []
+    for shape, stages in current['results'].items():
+        for stage, timing in stages.items():
+            base = baseline['results'].get(shape, {}).get(stage)
+            if base and timing > base * (1 + threshold):
+                regressions.append((shape, stage, base, timing))
+    return regressions
+
+def print_results(results, baseline=None):
+    print(f"{'shape':<14}{'stage':<24}{'time':>12}" + (f"{'baseline':>12}{'change':>9}" if baseline else ''))
+    for shape, stages in results['results'].items():
+        for stage, timing in stages.items():
+            line = f"{shape:<14}{stage:<24}{timing * 1e3:>9.2f} ms"
+            base = baseline and baseline['results'].get(shape, {}).get(stage)
+            if base:
+                line += f"{base * 1e3:>9.2f} ms{(timing / base - 1) * 100:>+8.0f}%"
+            print(line)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Time every build stage on synthetic corpora.")
+    parser.add_argument('-s', '--shape', action='append', choices=list(SHAPES),
+                        help="corpus shape to benchmark, repeatable (default: all)")
+    parser.add_argument('--scale', type=int, default=1, help="corpus size multiplier (default: 1)")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="runs per stage, the fastest is kept (default: 3)")
+    parser.add_argument('-o', '--output', help="write the results as JSON to this file")
+    parser.add_argument('-c', '--compare', help="JSON results of an earlier run to compare against")
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help="slowdown over the baseline reported as a regression (default: 0.1)")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    results = run_benchmarks(args.shape or list(SHAPES), args.scale, args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=1)
+    if baseline:
+        regressions = compare_results(baseline, results, args.threshold)
+        for shape, stage, base, timing in regressions:
+            print(f"Regression: {shape} {stage} {base * 1e3:.2f} ms -> {timing * 1e3:.2f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
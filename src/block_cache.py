@@ -0,0 +1,147 @@
+import hashlib
+import os
+import sqlite3
+
+from htmlnode import FragmentNode, ParentNode
+import htmlnode
+import minify
+import textnode
+
+BLOCK_CACHE_PATH = os.path.join('.charlot', 'blocks.sqlite')
+MAX_CACHE_BYTES = 64 << 20
+
+def parser_version():
+    """Hash of the parser and serializer sources. Fragments rendered by other code are discarded."""
+    digest = hashlib.sha256()
+    for module in (textnode, htmlnode, minify):
+        with open(module.__file__, 'rb') as source_file:
+            digest.update(source_file.read())
+    return digest.hexdigest()
+
+def block_key(block, minified=False):
+    """Minified and plain fragments of a block are kept apart"""
+    return hashlib.blake2b(block.encode(), digest_size=16, person=b'min' if minified else b'').digest()
+
+class BlockCache:
+    """On-disk cache of the HTML fragment of each markdown block, keyed by the hash of its text.
+
+    Hits are only recorded in memory and written with the new fragments on flush(), so an
+    unchanged block costs one hash and one lookup. evict() drops the least recently used
+    fragments beyond max_bytes. Safe to share between build processes.
+    """
+    def __init__(self, path=BLOCK_CACHE_PATH, max_bytes=MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        dir_path = os.path.dirname(path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        # A build uses the cache from one thread at a time, but the dev server and the build
+        # daemon each build from another thread than the one that opened it
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS blocks (key BLOB PRIMARY KEY, html TEXT, saved INTEGER, size INTEGER, used INTEGER)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS blocks_used ON blocks (used)')
+            version = parser_version()
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'parser'").fetchone()
+            if row is None or row[0] != version:
+                self.connection.execute('DELETE FROM blocks')
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('parser', ?)", (version,))
+        self._clock = self.connection.execute('SELECT COALESCE(MAX(used), 0) FROM blocks').fetchone()[0]
+        self._hits = set()
+        self._new = {}
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        """The (html, bytes saved by minification) fragment of a block key, or None"""
+        fragment = self._new.get(key)
+        if fragment is None:
+            fragment = self.connection.execute('SELECT html, saved FROM blocks WHERE key = ?', (key,)).fetchone()
+            if fragment is None:
+                self.misses += 1
+                return None
+        self._hits.add(key)
+        self.hits += 1
+        return fragment
+
+    def put(self, key, html, saved=0):
+        self._new[key] = (html, saved)
+
+    def flush(self):
+        if not (self._hits or self._new):
+            return
+        self._clock += 1
+        with self.connection:
+            self.connection.executemany('UPDATE blocks SET used = ? WHERE key = ?',
+                                        ((self._clock, key) for key in self._hits - self._new.keys()))
+            self.connection.executemany('INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?)',
+                                        ((key, html, saved, len(html), self._clock)
+                                         for key, (html, saved) in self._new.items()))
+        self._hits.clear()
+        self._new.clear()
+
+    def evict(self):
+        """Deletes the least recently used fragments until the cache fits in max_bytes"""
+        self.flush()
+        total, = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM blocks').fetchone()
+        if total <= self.max_bytes:
+            return 0
+        evicted = 0
+        with self.connection:
+            for key, size in self.connection.execute('SELECT key, size FROM blocks ORDER BY used').fetchall():
+                if total <= self.max_bytes:
+                    break
+                self.connection.execute('DELETE FROM blocks WHERE key = ?', (key,))
+                total -= size
+                evicted += 1
+        return evicted
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+def cached_html_tree(blocks, cache, minifier=None):
+    """textnode.blocks_to_html_tree with the blocks found in the cache taken from it as they were
+    serialized. The others are rendered, serialized and added to it.
+
+    With a minifier the fragments are minified, and it is credited with what they saved.
+    """
+    return ParentNode('div', children=list(cached_block_nodes(blocks, cache, minifier)))
+
+def cached_block_nodes(blocks, cache, minifier=None):
+    """The nodes of cached_html_tree, one block at a time"""
+    for block in blocks:
+        key = block_key(block, minifier is not None)
+        fragment = cache.get(key)
+        if fragment is None:
+            block_minifier = type(minifier)() if minifier else None
+            html = ''.join(textnode.block_to_html_node(block).iter_html(block_minifier))
+            fragment = (html, block_minifier.saved if block_minifier else 0)
+            cache.put(key, *fragment)
+        html, saved = fragment
+        if minifier:
+            minifier.saved += saved
+        yield FragmentNode(html)
+
+def evict_cache(path=BLOCK_CACHE_PATH, max_bytes=MAX_CACHE_BYTES):
+    """Trims the cache at path to max_bytes after a build"""
+    cache = BlockCache(path, max_bytes)
+    try:
+        evicted = cache.evict()
+    finally:
+        cache.close()
+    if evicted:
+        print(f"Evicted {evicted} blocks from the block cache")
+    return evicted
+
+# Open caches by process and path: connections are not shared with forked build workers
+_caches = {}
+
+def get_cache(path=BLOCK_CACHE_PATH):
+    key = (os.getpid(), os.path.abspath(path))
+    if key not in _caches:
+        _caches[key] = BlockCache(path)
+    return _caches[key]
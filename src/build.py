@@ -0,0 +1,176 @@
+from contextlib import contextmanager
+import os
+import time
+
+from block_cache import BLOCK_CACHE_PATH, evict_cache
+from compress import precompress, remove_compressed
+from copy_static import sync_static
+from fingerprint import ASSET_MANIFEST_NAME, asset_map, write_asset_manifest
+from frontmatter import MetadataIndex
+from generate_page import generate_pages_recursive
+from listing import generate_listings
+from link_checker import check_links, site_index, template_sources
+from manifest import load_manifest, save_manifest
+from output import update_deploy_manifest
+from pngopt import optimize_pngs
+from profiler import Profiler, print_report, save_report
+from search_index import SEARCH_RECORDS_DIR, remove_search_index, update_search_index
+from sitemap import remove_sitemap, write_feed, write_sitemap
+
+PROFILE_PATH = os.path.join('.charlot', 'profile.json')
+STATIC_PATH = 'static'
+PUBLIC_PATH = 'docs'
+CONTENT_PATH = 'content'
+TEMPLATE_PATH = 'template.html'
+
+class BuildConfig:
+    """Options of a build, those of main.py's command line, and the paths it reads and writes"""
+    def __init__(self, basepath='/', jobs=1, hash=False, hardlink=False, fingerprint=False, optimize_png=False,
+                 minify=False, precompress=False, search=False, site_url=None, check=False, block_cache=True,
+                 profile=None, profile_top=10, static_path=STATIC_PATH, public_path=PUBLIC_PATH,
+                 content_path=CONTENT_PATH, template_path=TEMPLATE_PATH):
+        self.basepath = basepath
+        self.jobs = jobs or os.cpu_count() or 1
+        self.hash = hash
+        self.hardlink = hardlink
+        self.fingerprint = fingerprint
+        self.optimize_png = optimize_png
+        self.minify = minify
+        self.precompress = precompress
+        self.search = search
+        self.site_url = site_url
+        self.check = check
+        self.block_cache = block_cache
+        self.profile = profile
+        self.profile_top = profile_top
+        self.static_path = static_path
+        self.public_path = public_path
+        self.content_path = content_path
+        self.template_path = template_path
+
+    @classmethod
+    def from_args(cls, args):
+        options = vars(args).copy()
+        options['block_cache'] = not options.pop('no_block_cache')
+        return cls(**options)
+
+class BuildResult:
+    """What a build did: the pages and listing pages it rendered, the bytes of those whose file
+    changed and was written, the seconds each stage took, the output files added, changed and
+    removed since the last deploy, and the (source, line, URL) of the broken links it found"""
+    def __init__(self):
+        self.pages = []
+        self.listings = []
+        self.bytes_written = 0
+        self.timings = {}
+        self.broken_links = []
+        self.deploy = None
+        self.profile = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def report(self):
+        """The result as a JSON-serializable dict"""
+        return {
+            'pages': self.pages,
+            'listings': self.listings,
+            'bytes_written': self.bytes_written,
+            'seconds': sum(self.timings.values()),
+            'timings': self.timings,
+            'broken_links': [list(link) for link in self.broken_links],
+            'deploy': self.deploy,
+            'profile': self.profile,
+        }
+
+def build(config, manifest=None, metadata=None):
+    """Builds the site as config says and returns a BuildResult.
+
+    The manifest and metadata index are loaded unless given, so a long-lived caller can keep
+    them in memory between builds; both are saved whether the build succeeds or not. A
+    profiled build renders every page again, so every page is measured. Raises BuildError
+    when pages fail.
+    """
+    result = BuildResult()
+    if manifest is None:
+        manifest = load_manifest()
+    if metadata is None:
+        metadata = MetadataIndex()
+    profiler = Profiler() if config.profile else None
+    if profiler:
+        profiler.start()
+    try:
+        with result.stage('static'):
+            replacements = optimize_pngs(config.static_path, manifest, jobs=config.jobs) if config.optimize_png else None
+            if profiler:
+                with profiler.stage('static copy'):
+                    sync_static(config.static_path, config.public_path, manifest, config.hash, config.hardlink,
+                                fingerprint=config.fingerprint, replacements=replacements)
+            else:
+                sync_static(config.static_path, config.public_path, manifest, config.hash, config.hardlink,
+                            fingerprint=config.fingerprint, replacements=replacements)
+            assets = None
+            if config.fingerprint:
+                assets = asset_map(manifest, config.static_path, config.public_path)
+                write_asset_manifest(assets, config.public_path)
+            elif os.path.isfile(os.path.join(config.public_path, ASSET_MANIFEST_NAME)):
+                os.remove(os.path.join(config.public_path, ASSET_MANIFEST_NAME))
+        # A profiled build skips the block cache too
+        block_cache = BLOCK_CACHE_PATH if config.block_cache and not config.profile else None
+        search_records = SEARCH_RECORDS_DIR if config.search else None
+        with result.stage('pages'):
+            result.pages = generate_pages_recursive(config.content_path, config.template_path, config.public_path,
+                                                    config.basepath, manifest, config.jobs, profiler, assets,
+                                                    config.minify, block_cache, search_records, metadata,
+                                                    force=bool(config.profile))
+        with result.stage('listings'):
+            result.listings = generate_listings(manifest, metadata, config.content_path, config.template_path,
+                                                config.public_path, config.basepath, assets, config.minify)
+        with result.stage('search'):
+            if config.search:
+                update_search_index(manifest['pages'], result.pages, config.public_path, config.basepath)
+            else:
+                remove_search_index(config.public_path)
+        with result.stage('sitemap'):
+            if config.site_url:
+                write_sitemap(manifest['pages'], config.public_path, config.site_url, config.basepath,
+                              listings=manifest.get('listings', {}))
+                write_feed(manifest['pages'], config.content_path, config.public_path, config.site_url,
+                           config.basepath, metadata=metadata)
+            else:
+                remove_sitemap(config.public_path, keep=manifest['static'])
+        if block_cache:
+            with result.stage('block cache'):
+                evict_cache(block_cache)
+        with result.stage('precompress'):
+            if config.precompress:
+                precompress(config.public_path, manifest, jobs=config.jobs)
+            else:
+                remove_compressed(manifest)
+        with result.stage('deploy manifest'):
+            built, result.deploy = update_deploy_manifest(config.public_path)
+        # Pages rendered the same as before are left untouched, and are not among the changes
+        replaced = built['added'].keys() | built['changed'].keys()
+        result.bytes_written = sum(os.path.getsize(path) for path in result.pages + result.listings
+                                   if os.path.relpath(path, config.public_path).replace(os.sep, '/') in replaced)
+    finally:
+        save_manifest(manifest)
+        metadata.save()
+        if profiler:
+            profiler.stop()
+    if profiler:
+        result.profile = profiler.report(config.profile_top)
+        save_report(result.profile, config.profile)
+        print_report(result.profile)
+        print(f"Profile written to {config.profile}")
+    if config.check:
+        with result.stage('check'):
+            sources = [entry['source'] for entry in manifest['pages'].values()] + template_sources(config.template_path)
+            result.broken_links = check_links(sources, site_index(manifest, config.public_path, config.basepath),
+                                              config.basepath, assets, config.jobs)
+    return result
@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import os
+
+from template import file_state
+
+try:
+    from compression import zstd # Python 3.14+
+except ImportError:
+    zstd = None
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js', '.mjs', '.json', '.xml', '.svg', '.txt', '.map')
+# A sibling is only written when it is at most this fraction of the original
+MAX_RATIO = 0.95
+
+def encoders():
+    """Compressed sibling extensions with their compress functions, as available here"""
+    available = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if zstd is not None:
+        available['.zst'] = lambda data: zstd.compress(data, level=19)
+    return available
+
+def _write_atomic(path, data, mtime_ns):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as tmp_file:
+        tmp_file.write(data)
+    os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+    os.replace(tmp_path, path)
+
+def compress_file(path, encoders):
+    """Writes the compressed siblings of a file that are small enough, removing the others.
+    Returns the extensions written."""
+    with open(path, 'rb') as source_file:
+        data = source_file.read()
+    mtime_ns = os.stat(path).st_mtime_ns
+    written = []
+    for extension, encode in encoders.items():
+        compressed = encode(data)
+        if len(compressed) <= len(data) * MAX_RATIO:
+            _write_atomic(path + extension, compressed, mtime_ns)
+            written.append(extension)
+        elif os.path.exists(path + extension):
+            os.remove(path + extension)
+    return written
+
+def remove_siblings(path, extensions):
+    for extension in extensions:
+        if os.path.isfile(path + extension):
+            os.remove(path + extension)
+
+def remove_compressed(manifest):
+    """Deletes the siblings written by precompress, for builds without it, so they never
+    outlive the files they were compressed from. Returns the files they were removed for."""
+    known = manifest.pop('compressed', {})
+    for path, (_, extensions) in known.items():
+        remove_siblings(path, extensions)
+    return sorted(known)
+
+def precompress(dir_path, manifest, jobs=8):
+    """Writes .gz, and .zst where available, siblings of every compressible file under dir_path.
+
+    Files whose state is the one recorded in manifest['compressed'] when they were last
+    compressed are skipped, and the siblings of files that are gone are deleted.
+    Returns the paths compressed.
+    """
+    available = encoders()
+    extensions = sorted(available)
+    known = manifest.get('compressed', {})
+    states = {}
+    for walk_path, _, filenames in os.walk(dir_path):
+        for filename in filenames:
+            if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+                path = os.path.join(walk_path, filename)
+                states[path] = list(file_state(path))
+
+    for path in known.keys() - states.keys():
+        remove_siblings(path, extensions)
+    # Recompressed when changed, or when the set of encoders changed since
+    stale = [path for path, state in states.items() if known.get(path) != [state, extensions]]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        written = list(executor.map(lambda path: compress_file(path, available), stale))
+    manifest['compressed'] = {path: [state, extensions] for path, state in states.items()}
+
+    saved = sum(1 for extensions_written in written if extensions_written)
+    print(f"Compressed {len(stale)} of {len(states)} files ({len(states) - len(stale)} unchanged, "
+          f"{len(stale) - saved} not worth compressing) to {', '.join(extensions)}")
+    return stale
@@ -1,10 +1,17 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
-def clear_dir(path):
+import fingerprint as fp
+import manifest as mf
+
+def clear_dir(path, keep=()):
+    keep = set(map(os.path.normpath, keep))
     def clear_files(path):
         for filename in os.listdir(path):
             filepath = os.path.join(path, filename)
+            if os.path.normpath(filepath) in keep:
+                continue
             if os.path.isfile(filepath):
                 print(f"Deleting file ...\t{filepath}")
                 os.remove(filepath)
@@ -15,7 +22,8 @@ def clear_dir(path):
             os.rmdir(path)
             return 0
     clear_files(path)
-    os.mkdir(path)
+    if not os.path.isdir(path):
+        os.mkdir(path)
     return 0
 
 def copy_dir(orig_path, dest_dir):
@@ -26,17 +34,18 @@ def copy_dir(orig_path, dest_dir):
             print(f"Copy file ...\t{filename} to {dest_dir}")
             shutil.copy(orig_filepath, dest_filepath)
         else:
-            print(f"Creating dir ...\t{filename} in {dest_dir}")
-            os.mkdir(dest_filepath)
+            if not os.path.isdir(dest_filepath):
+                print(f"Creating dir ...\t{filename} in {dest_dir}")
+                os.mkdir(dest_filepath)
             copy_dir(orig_filepath, dest_filepath)
 
-def copy_static(from_dir, to_dir):
+def copy_static(from_dir, to_dir, keep=()):
     if not os.path.isdir(from_dir):
         raise ValueError(f"Target directory {from_dir} does not exist.")
     if os.path.isdir(to_dir):
         print(f"Deleting destination directory...")
         try:
-            clear_dir(to_dir)
+            clear_dir(to_dir, keep)
         except Exception as e:
             print(f"Error: {e}")
     else:
@@ -46,6 +55,136 @@ def copy_static(from_dir, to_dir):
     copy_dir(from_dir, to_dir)
     return 0
 
+def _copy_file(orig_filepath, dest_filepath):
+    """Copies through copy_file_range where the kernel supports it, sendfile otherwise.
+
+    The copy is written next to the destination and moved over it, so a file being
+    served is never seen half written.
+    """
+    tmp_filepath = f"{dest_filepath}.tmp"
+    try:
+        with open(orig_filepath, 'rb') as orig_file, open(tmp_filepath, 'wb') as tmp_file:
+            size = os.fstat(orig_file.fileno()).st_size
+            copied = 0
+            try:
+                while copied < size:
+                    sent = os.copy_file_range(orig_file.fileno(), tmp_file.fileno(), size - copied)
+                    if sent == 0:
+                        break
+                    copied += sent
+                # Short when the file shrank meanwhile, or the filesystem quietly copied nothing
+                in_kernel = copied == size
+            except (AttributeError, OSError):
+                # No copy_file_range here, or not between these filesystems
+                in_kernel = False
+        if not in_kernel:
+            # Overwrites the partial copy, with sendfile where the platform has it
+            shutil.copyfile(orig_filepath, tmp_filepath)
+        shutil.copystat(orig_filepath, tmp_filepath)
+        os.replace(tmp_filepath, dest_filepath)
+    finally:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+
+def _link_file(orig_filepath, dest_filepath):
+    tmp_filepath = f"{dest_filepath}.tmp"
+    try:
+        os.link(orig_filepath, tmp_filepath)
+    except OSError:
+        # Across filesystems or unsupported: fall back to a copy
+        return _copy_file(orig_filepath, dest_filepath)
+    os.replace(tmp_filepath, dest_filepath)
+
+def is_unchanged(orig_filepath, dest_filepath, use_hash=False):
+    """Whether the destination already holds the file.
+
+    Copies keep the source mtime, so equal size and mtime mean nothing to do. With
+    use_hash, a size match with a different mtime is settled by comparing contents.
+    """
+    try:
+        dest_stat = os.stat(dest_filepath)
+    except FileNotFoundError:
+        return False
+    orig_stat = os.stat(orig_filepath)
+    if orig_stat.st_size != dest_stat.st_size:
+        return False
+    if orig_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    if use_hash and mf.hash_file(orig_filepath) == mf.hash_file(dest_filepath):
+        shutil.copystat(orig_filepath, dest_filepath)
+        return True
+    return False
+
+def remove_static(dest_filepath, to_dir):
+    """Deletes a synced file and any directory it leaves empty under to_dir"""
+    if os.path.isfile(dest_filepath):
+        print(f"Deleting file ...\t{dest_filepath}")
+        os.remove(dest_filepath)
+    dir_path = os.path.dirname(dest_filepath)
+    root = os.path.normpath(to_dir)
+    while dir_path and os.path.normpath(dir_path) != root and os.path.isdir(dir_path) and not os.listdir(dir_path):
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
+
+def sync_static(from_dir, to_dir, manifest, use_hash=False, hardlink=False, jobs=8, fingerprint=False, replacements=None):
+    """Brings to_dir in line with from_dir, touching only what changed.
+
+    New and changed files are copied in parallel, unchanged ones are left alone and files
+    synced by a previous build whose source is gone are deleted. manifest['static'] records
+    what was synced, so files written to to_dir by anything else are never removed.
+    With fingerprint, assets are also linked under a content-hashed name next to their copy,
+    recorded by source in manifest['assets'] (see fingerprint.asset_map). replacements maps
+    sources to the files published in their place, such as optimized images.
+    Returns the destinations copied.
+    """
+    if not os.path.isdir(from_dir):
+        raise ValueError(f"Target directory {from_dir} does not exist.")
+    files = []
+    for dir_path, _, filenames in os.walk(from_dir):
+        dest_dir = os.path.join(to_dir, os.path.relpath(dir_path, from_dir))
+        os.makedirs(dest_dir, exist_ok=True)
+        files.extend((os.path.join(dir_path, filename), os.path.normpath(os.path.join(dest_dir, filename)))
+                     for filename in filenames)
+
+    previous_assets = manifest.get('assets', {})
+    replacements = replacements or {}
+    link_or_copy = _link_file if hardlink else _copy_file
+    def sync_file(paths):
+        orig_filepath, dest_filepath = paths
+        published_filepath = replacements.get(orig_filepath, orig_filepath)
+        copied = not is_unchanged(published_filepath, dest_filepath, use_hash)
+        if copied:
+            link_or_copy(published_filepath, dest_filepath)
+        if not (fingerprint and fp.is_fingerprinted(orig_filepath)):
+            return copied, None
+        # Hashed again only when the file changed since its last fingerprint
+        hashed_filepath = previous_assets.get(orig_filepath)
+        if hashed_filepath is None or not is_unchanged(published_filepath, hashed_filepath):
+            hashed_filepath = fp.fingerprinted_path(dest_filepath, mf.hash_file(published_filepath))
+        if not is_unchanged(dest_filepath, hashed_filepath):
+            _link_file(dest_filepath, hashed_filepath)
+        return copied, hashed_filepath
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(sync_file, files))
+
+    synced = manifest.setdefault('static', {})
+    new_synced = {dest_filepath: orig_filepath for orig_filepath, dest_filepath in files}
+    assets = {}
+    for (orig_filepath, _), (_, hashed_filepath) in zip(files, results):
+        if hashed_filepath:
+            new_synced[hashed_filepath] = orig_filepath
+            assets[orig_filepath] = hashed_filepath
+    for dest_filepath in sorted(synced.keys() - new_synced.keys()):
+        remove_static(dest_filepath, to_dir)
+    manifest['static'] = new_synced
+    manifest['assets'] = assets
+
+    copied = [dest_filepath for (_, dest_filepath), (was_copied, _) in zip(files, results) if was_copied]
+    for dest_filepath in copied:
+        print(f"Copy file ...\t{dest_filepath}")
+    print(f"Synced {len(copied)} of {len(files)} static files ({len(files) - len(copied)} unchanged)")
+    return copied
 
 if __name__ == '__main__':
     import subprocess
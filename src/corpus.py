@@ -0,0 +1,92 @@
+import os
+import random
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+    "et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip "
+    "ex ea commodo consequat duis aute irure in reprehenderit voluptate velit esse cillum fugiat nulla"
+).split()
+
+def words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+def inline_text(rng, count, link_ratio=0.05):
+    """A line of prose with emphasis, code and, at link_ratio per word, links and images"""
+    parts = []
+    for idx in range(count):
+        roll = rng.random()
+        word = rng.choice(WORDS)
+        if roll < link_ratio:
+            parts.append(f"[{word}](/{word}/{idx})")
+        elif roll < link_ratio * 1.2:
+            parts.append(f"![{word}](/images/{word}.png)")
+        elif roll < link_ratio * 1.2 + 0.03:
+            parts.append(f"**{word}**")
+        elif roll < link_ratio * 1.2 + 0.06:
+            parts.append(f"_{word}_")
+        elif roll < link_ratio * 1.2 + 0.08:
+            parts.append(f"`{word}`")
+        else:
+            parts.append(word)
+    return ' '.join(parts)
+
+def paragraph(rng, lines=3, link_ratio=0.05):
+    return '\n'.join(inline_text(rng, rng.randint(8, 20), link_ratio) for _ in range(lines))
+
+def list_block(rng, items, ordered=False):
+    return '\n'.join(f"{f'{idx + 1}.' if ordered else '-'} {inline_text(rng, rng.randint(3, 10))}"
+                     for idx in range(items))
+
+def code_block(rng, lines):
+    body = '\n'.join(f"{'    ' * rng.randint(0, 2)}{rng.choice(WORDS)}({words(rng, 3).replace(' ', ', ')})"
+                     for _ in range(lines))
+    return f"```\n{body}\n```"
+
+def page(rng, title, sections, make_block):
+    blocks = [f"# {title}"]
+    for idx in range(sections):
+        blocks.append(f"## {words(rng, 3)} {idx}")
+        blocks.append(make_block(rng))
+    return '\n\n'.join(blocks)
+
+# Corpus shapes: each maps (rng, scale) to the pages of a content tree, by relative path
+SHAPES = {
+    'small-posts': lambda rng, scale: {
+        f"posts/post{idx}.md": page(rng, f"Post {idx}", 3, paragraph) for idx in range(200 * scale)
+    },
+    'huge-page': lambda rng, scale: {
+        "index.md": page(rng, "Huge", 2000 * scale, paragraph),
+    },
+    'link-heavy': lambda rng, scale: {
+        f"links/page{idx}.md": page(rng, f"Links {idx}", 20, lambda rng: paragraph(rng, 4, link_ratio=0.4))
+        for idx in range(20 * scale)
+    },
+    'list-heavy': lambda rng, scale: {
+        f"lists/page{idx}.md": page(rng, f"Lists {idx}", 20, lambda rng: list_block(rng, 8, rng.random() < 0.5))
+        for idx in range(20 * scale)
+    },
+    'code-heavy': lambda rng, scale: {
+        f"code/page{idx}.md": page(rng, f"Code {idx}", 20, lambda rng: code_block(rng, 12))
+        for idx in range(20 * scale)
+    },
+}
+
+def generate_corpus(shape, scale=1, seed=0):
+    """Pages of a synthetic content tree. The same shape, scale and seed always give the same pages."""
+    return SHAPES[shape](random.Random(f"{shape}-{seed}"), scale)
+
+def write_corpus(pages, content_dir):
+    for rel_path, markdown in pages.items():
+        path = os.path.join(content_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as page_file:
+            page_file.write(markdown)
+
+def write_static(static_dir, files=100, size=1 << 16, seed=0):
+    """A static tree of `files` binary files of `size` bytes, spread over a few directories"""
+    rng = random.Random(seed)
+    for idx in range(files):
+        path = os.path.join(static_dir, f"dir{idx % 8}", f"asset{idx}.bin")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as static_file:
+            static_file.write(rng.randbytes(size))
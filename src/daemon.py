@@ -0,0 +1,133 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+
+from build import BuildConfig, build
+from frontmatter import MetadataIndex
+from generate_page import BuildError
+from manifest import MANIFEST_PATH, load_manifest
+from template import file_state
+
+SOCKET_PATH = os.path.join('.charlot', 'build.sock')
+# Paths stay those of the site the daemon was started in, whose .charlot/ state it keeps
+PATH_OPTIONS = ('static_path', 'public_path', 'content_path', 'template_path', 'profile')
+
+def request_config(options):
+    """The BuildConfig of a build request. Raises ValueError for options naming paths."""
+    paths = sorted(set(PATH_OPTIONS) & options.keys())
+    if paths:
+        raise ValueError(f"Path options are not accepted: {', '.join(paths)}")
+    return BuildConfig(**options)
+
+def use_forkserver():
+    """Starts the worker processes of parallel builds from a fork server, so a multi-threaded
+    process does not fork itself with locks held by its other threads"""
+    methods = multiprocessing.get_all_start_methods()
+    multiprocessing.set_start_method('forkserver' if 'forkserver' in methods else 'spawn')
+
+class BuildDaemon:
+    """Builds on request, one at a time, keeping what builds read warm in between: the manifest
+    and metadata index in memory, and in this process the compiled templates and the open
+    block cache. The manifest is loaded again only when another process built meanwhile."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.manifest = None
+        self.manifest_state = None
+        self.metadata = MetadataIndex()
+
+    def build(self, config):
+        """Builds with the BuildConfig given and returns the BuildResult"""
+        with self.lock:
+            if self.manifest is None or file_state(MANIFEST_PATH) != self.manifest_state:
+                self.manifest = load_manifest()
+            try:
+                return build(config, self.manifest, self.metadata)
+            finally:
+                self.manifest_state = file_state(MANIFEST_PATH)
+
+class BuildRequestHandler(socketserver.StreamRequestHandler):
+    """Reads build requests, one JSON object of options other than paths per line, and answers
+    each with a line of JSON: {"ok": true, "result": ...} with the build report, or
+    {"ok": false, "error": ...}"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                config = request_config(json.loads(line))
+                response = {'ok': True, 'result': self.server.builder.build(config).report()}
+            except BuildError as e:
+                response = {'ok': False, 'error': str(e), 'errors': e.errors}
+            except Exception as e:
+                response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+
+class BuildServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path=SOCKET_PATH):
+        self.builder = BuildDaemon()
+        dir_path = os.path.dirname(socket_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        # A socket left behind by a daemon that did not shut down cleanly
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, BuildRequestHandler)
+
+    def server_bind(self):
+        # Only the user running the daemon may ask for builds
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        os.chmod(self.server_address, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+def request_build(options=None, socket_path=SOCKET_PATH):
+    """Asks the daemon listening on socket_path for a build, and returns its response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(options or {}).encode() + b'\n')
+        with client.makefile('rb') as response:
+            return json.loads(response.readline())
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Keep a build process warm and build the site whenever asked to over a Unix socket.")
+    parser.add_argument('--socket', default=SOCKET_PATH, help=f"path of the socket (default: {SOCKET_PATH})")
+    parser.add_argument('--send', nargs='?', const='{}', metavar='OPTIONS',
+                        help="instead of serving, ask the running daemon for a build with the given JSON object of "
+                             "options, such as '{\"minify\": true}', and print its result")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.send is not None:
+        response = request_build(json.loads(args.send), args.socket)
+        print(json.dumps(response, indent=1))
+        if not response['ok'] or response['result']['broken_links']:
+            sys.exit(1)
+        return
+    use_forkserver()
+    # Stopped by a service manager, the daemon still removes its socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    with BuildServer(args.socket) as server:
+        print(f"Waiting for builds at {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
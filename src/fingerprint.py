@@ -0,0 +1,68 @@
+import json
+import os
+
+import manifest as mf
+from output import write_output
+
+# Assets referenced from pages. Files fetched by well-known names (favicon.ico, robots.txt,
+# pages) keep their names only.
+FINGERPRINT_EXTENSIONS = (
+    '.css', '.js', '.mjs', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.woff', '.woff2',
+)
+DIGEST_SIZE = 10
+ASSET_MANIFEST_NAME = 'asset-manifest.json'
+
+def is_fingerprinted(path):
+    return path.lower().endswith(FINGERPRINT_EXTENSIONS)
+
+def fingerprinted_path(path, digest):
+    """static/index.css with digest 3f2a9c... becomes static/index.3f2a9c1b0e.css"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest[:DIGEST_SIZE]}{ext}"
+
+def url(path, root):
+    return '/' + os.path.relpath(path, root).replace(os.sep, '/')
+
+class AssetMap(dict):
+    """Root-relative URLs of the static files to their fingerprinted URLs.
+
+    `digest` identifies the whole map, for what is rendered again when any asset changes,
+    such as the literals of compiled templates. Pages depend on lookup_digest of the URLs
+    they reference only.
+    """
+    def __init__(self, urls=()):
+        super().__init__(urls)
+        self.digest = mf.hash_bytes(json.dumps(self, sort_keys=True).encode())
+
+    def lookup_digest(self, urls):
+        """Digest of what the given URLs point at, None for those that are not assets, so it
+        also changes when one of them becomes an asset"""
+        return mf.hash_bytes(json.dumps({url: self.get(url) for url in urls}, sort_keys=True).encode())
+
+class AssetLookups:
+    """An AssetMap recording the URLs looked up in it while a page is rendered. Recording even
+    when the map is empty, it is always true."""
+    def __init__(self, assets, urls=()):
+        self.assets = assets
+        self.digest = assets.digest
+        self.urls = set(urls)
+
+    def __bool__(self):
+        return True
+
+    def get(self, url, default=None):
+        self.urls.add(url)
+        return self.assets.get(url, default)
+
+def asset_map(manifest, from_dir, to_dir):
+    """The AssetMap of the assets fingerprinted by sync_static"""
+    return AssetMap({
+        url(orig_filepath, from_dir): url(dest_filepath, to_dir)
+        for orig_filepath, dest_filepath in manifest.get('assets', {}).items()
+    })
+
+def write_asset_manifest(assets, to_dir):
+    """Writes the asset map to to_dir, for servers to mark every fingerprinted file immutable"""
+    path = os.path.join(to_dir, ASSET_MANIFEST_NAME)
+    write_output(path, json.dumps(dict(assets), indent=1, sort_keys=True))
+    return path
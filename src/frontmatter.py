@@ -0,0 +1,152 @@
+from datetime import date
+from itertools import chain
+import json
+import os
+
+from template import file_state
+from textnode import scan_blocks
+
+FENCE = '---'
+METADATA_PATH = os.path.join('.charlot', 'metadata.json')
+METADATA_VERSION = 2
+
+def default_metadata():
+    return {'title': None, 'date': None, 'tags': [], 'draft': False, 'template': None, 'summary': None}
+
+def parse_value(key, value):
+    value = value.strip()
+    if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'':
+        value = value[1:-1]
+    if key == 'tags':
+        if value.startswith('[') and value.endswith(']'):
+            value = value[1:-1]
+        return [tag.strip().strip('"\'') for tag in value.split(',') if tag.strip()]
+    if key == 'draft':
+        return value.lower() in ('true', 'yes', '1')
+    if key == 'date':
+        return date.fromisoformat(value).isoformat()
+    return value
+
+def parse_front_matter(lines):
+    """Metadata of the `key: value` lines of a front matter. Tags are a comma-separated or
+    bracketed list and dates are ISO dates. Returns None if a line is not `key: value`."""
+    metadata = default_metadata()
+    for line in lines:
+        if not line.strip():
+            continue
+        key, separator, value = line.partition(':')
+        if not separator:
+            return None
+        key = key.strip().lower()
+        try:
+            metadata[key] = parse_value(key, value)
+        except ValueError:
+            raise ValueError(f"Invalid front matter {key}: {value.strip()!r}")
+    return metadata
+
+def split_front_matter(markdown):
+    """The (metadata, body) of a page. The front matter, if any, is the `key: value` lines
+    between a first line of `---` and the next `---` line. Only the header is scanned."""
+    first, _, rest = markdown.partition('\n')
+    if first.rstrip() != FENCE:
+        return default_metadata(), markdown
+    position = 0
+    while True:
+        line_end = rest.find('\n', position)
+        line = rest[position:] if line_end == -1 else rest[position:line_end]
+        if line.rstrip() == FENCE:
+            metadata = parse_front_matter(rest[:position].split('\n'))
+            if metadata is None:
+                return default_metadata(), markdown
+            return metadata, '' if line_end == -1 else rest[line_end + 1:]
+        if line_end == -1:
+            return default_metadata(), markdown
+        position = line_end + 1
+
+def scan_title(lines):
+    """extract_title over an iterable of lines, stopping at the title"""
+    for block in scan_blocks(lines):
+        if block.text.startswith('# '):
+            return block.text.split('# ')[1]
+    raise ValueError("No h1 markdown syntax found. Should start with '# '.", 1)
+
+def read_front_matter(from_file):
+    """(metadata, lines, line) of an open page source: the metadata of its front matter, the
+    lines of the body read along with it and the number of the first one. The rest of the
+    body is left in the file."""
+    first = from_file.readline()
+    lines = [first] if first else []
+    if first.rstrip() == FENCE:
+        header = []
+        for line in from_file:
+            if line.rstrip() == FENCE:
+                metadata = parse_front_matter(header)
+                if metadata is not None:
+                    return metadata, [], len(header) + 3
+                return default_metadata(), lines + header + [line], 1
+            header.append(line)
+        lines += header
+    return default_metadata(), lines, 1
+
+def read_metadata(from_path):
+    """Metadata of a page source. Only the front matter is read, and the lines up to the title
+    when the front matter has none. Raises FileNotFoundError if the template it names is missing."""
+    with open(from_path, 'r') as from_file:
+        metadata, lines, _ = read_front_matter(from_file)
+        if metadata['title'] is None:
+            try:
+                metadata['title'] = scan_title(chain(lines, from_file))
+            except ValueError:
+                pass
+    if metadata['template'] and not os.path.isfile(metadata['template']):
+        raise FileNotFoundError(f"Front matter template {metadata['template']} does not exist")
+    return metadata
+
+class MetadataIndex:
+    """Site-wide index of page metadata, by source path, saved in .charlot/metadata.json.
+
+    Entries are read on first use and kept with the state of their source, so sources are
+    only opened again once they change. With no path the index lives in memory only.
+    """
+    def __init__(self, path=METADATA_PATH):
+        self.path = path
+        self.entries = {}
+        if path:
+            try:
+                with open(path, 'r') as metadata_file:
+                    saved = json.load(metadata_file)
+                if saved.get('version') == METADATA_VERSION:
+                    self.entries = saved['pages']
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+
+    def get(self, from_path):
+        state = list(file_state(from_path))
+        entry = self.entries.get(from_path)
+        if entry is None or entry[0] != state:
+            entry = self.entries[from_path] = [state, read_metadata(from_path)]
+        return entry[1]
+
+    def query(self, sources=None, tag=None, drafts=False):
+        """(source, metadata) of the indexed pages, or of the sources given, with the tag if any"""
+        sources = self.entries.keys() if sources is None else sources
+        for from_path in sources:
+            metadata = self.get(from_path)
+            if (drafts or not metadata['draft']) and (tag is None or tag in metadata['tags']):
+                yield from_path, metadata
+
+    def prune(self, sources):
+        """Drops the entries of the sources that are gone"""
+        for from_path in self.entries.keys() - set(sources):
+            del self.entries[from_path]
+
+    def save(self):
+        if not self.path:
+            return
+        dir_path = os.path.dirname(self.path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as metadata_file:
+            json.dump({'version': METADATA_VERSION, 'pages': self.entries}, metadata_file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -1,6 +1,24 @@
-import textnode as tn
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain
+import io
 import os
 
+import textnode as tn
+import manifest as mf
+from block_cache import cached_block_nodes, cached_html_tree, get_cache
+from fingerprint import AssetLookups
+from frontmatter import MetadataIndex, read_front_matter, scan_title, split_front_matter
+from htmlnode import ParentNode
+from search_index import PageTerms, record_path, write_page_record
+from minify import Minifier
+from output import OutputFile
+from pipeline import make_dirs, run_pipeline
+from template import file_state, load_template, select_template
+
+# Sources larger than this are not read whole but scanned a block at a time as they are written
+STREAM_SIZE = 8 * 1024 * 1024
+
 def create_dir_path(path):
     dirs = path.split('/')
     new_dir = ''
@@ -8,47 +26,392 @@ def create_dir_path(path):
         if dir and dir != '.':
             new_dir += dir
             if not os.path.isdir(new_dir):
-                os.mkdir(new_dir)
+                try:
+                    os.mkdir(new_dir)
+                except FileExistsError: # created meanwhile by another build worker
+                    pass
             new_dir += '/'
 
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+class BuildError(Exception):
+    """Raised after a parallel build, with the (source, error) pairs of every failed page in build order"""
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} page(s) failed to generate: " + ', '.join(from_path for from_path, _ in errors))
 
-    with open(from_path, 'r') as from_file:
-        markdown = from_file.read()
-
-    title = tn.extract_title(markdown)
-    content = tn.markdown_to_html_node(markdown)
-
-    placeholders = [
-        ('{{ Title }}', title),
-        ('{{ Content }}', content),
-        ('href="/', f'href="{basepath}'),
-        ('src="/', f'src="{basepath}'),
-    ]
-    with open(template_path, 'r') as template_file:
-        generated_file = template_file.read()
-        for placeholder in placeholders:
-            generated_file = generated_file.replace(placeholder[0], placeholder[1])
+def page_values(markdown, block_cache=None, minifier=None):
+    """Values of the template placeholders for a page. The content is left as an HTMLNode tree
+    so it is serialized straight into the page file. With the path of a block cache, the
+    blocks rendered before are taken from it, serialized for the minifier given.
+    The title of the front matter, if any, comes before the first heading."""
+    metadata, markdown = split_front_matter(markdown)
+    title = metadata['title'] or tn.extract_title(markdown)
+    if block_cache:
+        content = cached_html_tree(tn.markdown_to_blocks(markdown), get_cache(block_cache), minifier)
+    else:
+        content = tn.markdown_to_html_tree(markdown)
+    return {'Title': title, 'Content': content}
+
+def stream_values(from_file, block_cache=None, minifier=None, terms=None):
+    """page_values of an open source too large to read whole. The content is scanned from the
+    file as it is serialized, so the file must stay open until the page is written, and the
+    terms of its blocks are counted in terms meanwhile. Only a title missing from the front
+    matter is looked for beforehand, in a first pass that stops at it."""
+    metadata, lines, line = read_front_matter(from_file)
+    title = metadata['title']
+    if not title:
+        title = scan_title(chain(lines, from_file))
+        from_file.seek(0)
+        metadata, lines, line = read_front_matter(from_file)
+    blocks = tn.scan_blocks(chain(lines, from_file), line)
+    if block_cache:
+        nodes = cached_block_nodes((block.text for block in blocks), get_cache(block_cache), minifier)
+    else:
+        nodes = (tn.block_to_html_node(block.text, block.block_type, block.heading) for block in blocks)
+    if terms is not None:
+        nodes = counted_nodes(nodes, terms)
+    return {'Title': title, 'Content': ParentNode('div', children=nodes)}
 
+def counted_nodes(nodes, terms):
+    for node in nodes:
+        terms.add(node)
+        yield node
+
+def open_page(dest_path):
+    """The page file to write, left untouched if written the same as before (see output.OutputFile)"""
     dir_path = os.path.dirname(dest_path)
     dest_path = dest_path[1:] if dest_path.startswith('/') else dest_path # default to relative paths
-    if os.path.isfile(dest_path):
-        mode = 'w'
-    else:
-        mode = 'x'
+    try:
+        return OutputFile(dest_path)
+    except FileNotFoundError: # directories are only looked at when they are missing
         create_dir_path(dir_path)
-    with open(dest_path, mode) as dest_file:
-         dest_file.write(generated_file)
+        return OutputFile(dest_path)
+
+def page_assets(assets, template):
+    """The assets to render a page with, recording the URLs the page looks up in them"""
+    return AssetLookups(assets, template.urls) if assets is not None else None
+
+def write_page(from_path, template_path, dest_path, basepath, assets=None, minify=False, block_cache=None,
+               search_records=None, asset_urls=None):
+    """Renders a page into its destination, leaving its search terms in search_records if given
+    and the URLs it looked up in the assets in the asset_urls dict if given.
+    Returns the bytes minification saved, if minified."""
+    template = load_template(template_path)
+    assets = page_assets(assets, template)
+    minifier = Minifier() if minify else None
+    terms = None
+    with open(from_path, 'r') as from_file:
+        if os.fstat(from_file.fileno()).st_size > STREAM_SIZE:
+            terms = PageTerms() if search_records else None
+            values = stream_values(from_file, block_cache, minifier, terms)
+        else:
+            values = page_values(from_file.read(), block_cache, minifier)
+        with open_page(dest_path) as dest_file:
+            template.write(dest_file, values, basepath, assets, minifier)
+    if search_records:
+        write_page_record(search_records, dest_path, values['Title'], values['Content'],
+                          terms.terms if terms else None)
+    if block_cache:
+        get_cache(block_cache).flush()
+    if assets and asset_urls is not None:
+        asset_urls[dest_path] = sorted(assets.urls)
+    return minifier.saved if minifier else None
+
+def minified_note(saved):
+    return '' if saved is None else f" (minified, {saved:,} bytes saved)"
+
+def generate_page(from_path, template_path, dest_path, basepath, assets=None, minify=False, block_cache=None,
+                  search_records=None):
+    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    saved = write_page(from_path, template_path, dest_path, basepath, assets, minify, block_cache, search_records)
+    if saved is not None:
+        print(f"Minified {dest_path}{minified_note(saved)}")
+
+def generate_page_profiled(from_path, template_path, dest_path, basepath, profiler, assets=None, minify=False,
+                           block_cache=None, search_records=None, asset_urls=None):
+    """generate_page with every stage run and recorded on its own. The page is the same,
+    only the content is serialized to a string before it goes into the template."""
+    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+
+    with profiler.stage('read', from_path):
+        with open(from_path, 'r') as from_file:
+            markdown = from_file.read()
+    profiler.bytes_in += len(markdown.encode())
+    template = load_template(template_path)
+    assets = page_assets(assets, template)
+    with profiler.stage('block split', from_path):
+        metadata, markdown = split_front_matter(markdown)
+        blocks = tn.markdown_to_blocks(markdown)
+    minifier = Minifier() if minify else None
+    with profiler.stage('inline parse', from_path):
+        title = metadata['title'] or tn.extract_title(markdown)
+        if block_cache:
+            content = cached_html_tree(blocks, get_cache(block_cache), minifier)
+        else:
+            content = tn.blocks_to_html_tree(blocks)
+    with profiler.stage('html serialize', from_path):
+        content = ''.join(content.iter_html(minifier))
+    with profiler.stage('template', from_path):
+        html = template.render({'Title': title, 'Content': content}, basepath, assets, minifier)
+    with profiler.stage('write', from_path):
+        with open_page(dest_path) as dest_file:
+            dest_file.write(html)
+    if search_records:
+        write_page_record(search_records, dest_path, title, content)
+    if block_cache:
+        get_cache(block_cache).flush()
+    if assets and asset_urls is not None:
+        asset_urls[dest_path] = sorted(assets.urls)
+    if minifier:
+        print(f"Minified {dest_path}{minified_note(minifier.saved)}")
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
+def _generate_page_worker(page, basepath, assets=None, minify=False, block_cache=None, search_records=None):
+    # Templates are compiled once per worker process and kept in the template cache
+    from_path, template_path, dest_path = page
+    asset_urls = {}
+    try:
+        saved = write_page(from_path, template_path, dest_path, basepath, assets, minify, block_cache,
+                           search_records, asset_urls)
+        return None, saved, asset_urls.get(dest_path)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", None, None
+
+def generate_pages_parallel(pages, basepath, jobs, assets=None, minify=False, block_cache=None, search_records=None,
+                            asset_urls=None):
+    """Renders the (source, template, destination) triples in a pool of `jobs` processes.
+
+    Every page is attempted. Returns the (source, error) pairs of the pages that failed, in
+    the order the pages were given, so the report does not depend on worker scheduling.
+    """
+    errors = []
+    make_dirs(dest_path[1:] if dest_path.startswith('/') else dest_path for _, _, dest_path in pages)
+    chunksize = max(1, len(pages) // (jobs * 8))
+    worker = partial(_generate_page_worker, basepath=basepath, assets=assets, minify=minify, block_cache=block_cache,
+                     search_records=search_records)
+    with ProcessPoolExecutor(jobs) as executor:
+        results = executor.map(worker, pages, chunksize=chunksize)
+        for (from_path, template_path, dest_path), (error, saved, urls) in zip(pages, results):
+            if error:
+                print(f"Error generating page from {from_path}: {error}")
+                errors.append((from_path, error))
+            else:
+                if urls is not None and asset_urls is not None:
+                    asset_urls[dest_path] = urls
+                print(f"Generated page from {from_path} to {dest_path} using {template_path}{minified_note(saved)}")
+    return errors
+
+def generate_pages_pipelined(pages, basepath, assets=None, minify=False, block_cache=None, search_records=None,
+                             asset_urls=None):
+    """Renders the (source, template, destination) triples in this process while threads read
+    the next sources and write the pages rendered, so I/O overlaps with rendering. The
+    destination directories are created up front, once each.
+
+    Every page is attempted. Returns the (source, error) pairs of the pages that failed, in
+    the order the pages were given.
+    """
+    make_dirs(dest_path[1:] if dest_path.startswith('/') else dest_path for _, _, dest_path in pages)
+    saved = {}
+
+    def read(page):
+        with open(page[0], 'r') as from_file:
+            if os.fstat(from_file.fileno()).st_size > STREAM_SIZE:
+                return None
+            return from_file.read()
+
+    def render(page, markdown):
+        from_path, template_path, dest_path = page
+        if markdown is None: # too large to hold, streamed from its source to its destination here
+            saved[dest_path] = write_page(from_path, template_path, dest_path, basepath, assets, minify,
+                                          block_cache, search_records, asset_urls)
+            return None
+        template = load_template(template_path)
+        lookups = page_assets(assets, template)
+        minifier = Minifier() if minify else None
+        values = page_values(markdown, block_cache, minifier)
+        html = io.StringIO()
+        template.write(html, values, basepath, lookups, minifier)
+        if search_records:
+            write_page_record(search_records, dest_path, values['Title'], values['Content'])
+        if block_cache:
+            get_cache(block_cache).flush()
+        if lookups and asset_urls is not None:
+            asset_urls[dest_path] = sorted(lookups.urls)
+        saved[dest_path] = minifier.saved if minifier else None
+        return html.getvalue()
+
+    def write(page, html):
+        if html is None:
+            return
+        with open_page(page[2]) as dest_file:
+            dest_file.write(html)
+
+    failures = run_pipeline(pages, read, render, write)
+    errors = []
+    for idx, (from_path, template_path, dest_path) in enumerate(pages):
+        if idx in failures:
+            error = f"{type(failures[idx]).__name__}: {failures[idx]}"
+            print(f"Error generating page from {from_path}: {error}")
+            errors.append((from_path, error))
+        else:
+            print(f"Generated page from {from_path} to {dest_path} using {template_path}{minified_note(saved[dest_path])}")
+    return errors
+
+def generate_pages(pages, basepath, jobs=1, profiler=None, assets=None, minify=False, block_cache=None,
+                   search_records=None, asset_urls=None):
+    """Generates the given (source, template, destination) triples, in parallel when jobs > 1
+    and pipelined otherwise, and returns the failed ones. With a profiler pages are generated
+    one by one and profiled. The URLs each page looked up in the assets go to the asset_urls
+    dict if given."""
+    if profiler:
+        errors = []
+        for from_path, template_path, dest_path in pages:
+            try:
+                generate_page_profiled(from_path, template_path, dest_path, basepath, profiler, assets, minify,
+                                       block_cache, search_records, asset_urls)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                print(f"Error generating page from {from_path}: {error}")
+                errors.append((from_path, error))
+        return errors
+    if jobs > 1 and len(pages) > 1:
+        return generate_pages_parallel(pages, basepath, min(jobs, len(pages)), assets, minify, block_cache,
+                                       search_records, asset_urls)
+    return generate_pages_pipelined(pages, basepath, assets, minify, block_cache, search_records, asset_urls)
+
+def collect_pages(dir_path_content, dest_dir_path):
+    """Walks the content tree and returns its (source, destination) page pairs"""
+    pages = []
     if os.path.isdir(dir_path_content):
-        if (files := os.listdir(dir_path_content)):
-            for file in files:
-                filepath = os.path.join(dir_path_content, file)
-                dest_filepath = os.path.join(dest_dir_path, file)
-                if os.path.isfile(filepath):
-                    dest_filepath, _ = os.path.splitext(dest_filepath)
-                    generate_page(filepath, template_path, dest_filepath + '.html', basepath)
-                elif os.path.isdir(filepath):
-                    generate_pages_recursive(filepath, template_path, dest_filepath, basepath)
+        for file in os.listdir(dir_path_content):
+            filepath = os.path.join(dir_path_content, file)
+            dest_filepath = os.path.join(dest_dir_path, file)
+            if os.path.isfile(filepath):
+                dest_filepath, _ = os.path.splitext(dest_filepath)
+                pages.append((filepath, dest_filepath + '.html'))
+            elif os.path.isdir(filepath):
+                pages.extend(collect_pages(filepath, dest_filepath))
+    return pages
+
+# Source hashes by path with the file state they were computed from, so a long-running
+# process such as the dev server only rehashes sources that were touched
+_source_hashes = {}
+
+def source_hash(from_path):
+    key = os.path.abspath(from_path)
+    state = file_state(from_path)
+    cached = _source_hashes.get(key)
+    if cached is None or cached[0] != state:
+        cached = _source_hashes[key] = (state, mf.hash_file(from_path))
+    return cached[1]
+
+def remove_page(dest_path, dest_dir_path):
+    """Deletes a generated page and any directory it leaves empty under dest_dir_path"""
+    dest_path = dest_path[1:] if dest_path.startswith('/') else dest_path
+    if os.path.isfile(dest_path):
+        print(f"Deleting page ...\t{dest_path}")
+        os.remove(dest_path)
+    dir_path = os.path.dirname(dest_path)
+    root = os.path.normpath(dest_dir_path)
+    while dir_path and os.path.normpath(dir_path) != root and os.path.isdir(dir_path) and not os.listdir(dir_path):
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, manifest=None, jobs=1, profiler=None, assets=None, minify=False,
+                             block_cache=None, search_records=None, metadata=None, force=False):
+    """Generates every page under dir_path_content and returns the destinations rendered.
+
+    Each page uses the template of its nearest content directory under templates/, falling
+    back to template_path. With a manifest, pages whose source, compiled template and
+    basepath are unchanged since the last build are skipped, and pages whose source is
+    gone are deleted. The manifest is updated in place; saving it is up to the caller.
+    Pages are rendered in a process pool with jobs > 1, and pipelined with their reads and
+    writes otherwise; failures are raised together as a BuildError once all are done, with
+    those of pages whose front matter or template cannot be read. A profiler records the stages of every page rendered.
+    References to assets in the AssetMap are rewritten to their fingerprinted URLs, and a
+    page is rendered again only when the assets it references change. Pages are minified as they are written with minify. With the path of a block cache,
+    blocks unchanged since they were last rendered, on any page, are taken from it. With a
+    search records directory, every page rendered leaves its search terms there, and pages
+    whose record is missing are rendered again.
+    Pages whose front matter, looked up in the metadata index, marks them as drafts are left
+    out, and a template given there comes before the one of the directory. With force every
+    page is rendered again, unchanged or not, while removed ones are still deleted.
+    """
+    metadata = metadata if metadata is not None else MetadataIndex(None)
+    templates_by_dir = {}
+    pages = []
+    sources = []
+    drafts = 0
+    # Pages failing before they are rendered, with a bad front matter or a missing template
+    errors = []
+    failed_dests = set()
+    for from_path, dest_path in collect_pages(dir_path_content, dest_dir_path):
+        sources.append(from_path)
+        try:
+            page_metadata = metadata.get(from_path)
+        except (ValueError, OSError) as e:
+            print(f"Error generating page from {from_path}: {type(e).__name__}: {e}")
+            errors.append((from_path, f"{type(e).__name__}: {e}"))
+            failed_dests.add(dest_path)
+            continue
+        if page_metadata['draft']:
+            drafts += 1
+            continue
+        dir_path = os.path.dirname(from_path)
+        if dir_path not in templates_by_dir:
+            templates_by_dir[dir_path] = select_template(from_path, dir_path_content, template_path)
+        pages.append((from_path, page_metadata['template'] or templates_by_dir[dir_path], dest_path))
+    metadata.prune(sources)
+    if drafts:
+        print(f"Skipped {drafts} draft page(s)")
+
+    if manifest is None:
+        errors += generate_pages(pages, basepath, jobs, profiler, assets, minify, block_cache, search_records)
+        if errors:
+            raise BuildError(errors)
+        return [dest_path for _, _, dest_path in pages]
+
+    old_entries = manifest['pages']
+    new_entries = {}
+    stale_pages = []
+    for page in pages:
+        from_path, page_template_path, dest_path = page
+        try:
+            template_hash = load_template(page_template_path).digest
+        except OSError as e:
+            print(f"Error generating page from {from_path}: {type(e).__name__}: {e}")
+            errors.append((from_path, f"{type(e).__name__}: {e}"))
+            failed_dests.add(dest_path)
+            continue
+        # Only the assets the page looked up when last rendered, so other assets changing leave it alone
+        old_entry = old_entries.get(dest_path)
+        asset_urls = (old_entry.get('asset_urls') or []) if old_entry and assets is not None else []
+        entry = mf.page_entry(from_path, source_hash(from_path), template_hash, basepath,
+                              assets.lookup_digest(asset_urls) if assets is not None else None, minify,
+                              search_records is not None, asset_urls if assets is not None else None)
+        relative_dest_path = dest_path[1:] if dest_path.startswith('/') else dest_path
+        if (force or old_entries.get(dest_path) != entry or not os.path.isfile(relative_dest_path)
+                or search_records and not os.path.isfile(record_path(search_records, dest_path))):
+            stale_pages.append(page)
+        new_entries[dest_path] = entry
+    # Pages that failed keep their last output until they build again
+    removed = sorted(old_entries.keys() - new_entries.keys() - failed_dests)
+
+    rendered_urls = {}
+    errors += generate_pages(stale_pages, basepath, jobs, profiler, assets, minify, block_cache, search_records,
+                             rendered_urls)
+    failed = {from_path for from_path, _ in errors}
+    generated = []
+    for from_path, _, dest_path in stale_pages:
+        if from_path in failed:
+            del new_entries[dest_path] # retried on the next build
+        else:
+            if assets is not None:
+                new_entries[dest_path]['asset_urls'] = rendered_urls[dest_path]
+                new_entries[dest_path]['assets_hash'] = assets.lookup_digest(rendered_urls[dest_path])
+            generated.append(dest_path)
+    for dest_path in removed:
+        remove_page(dest_path, dest_dir_path)
+    manifest['pages'] = new_entries
+    print(f"Generated {len(generated)} of {len(pages)} pages ({len(pages) - len(stale_pages)} unchanged)")
+    if errors:
+        raise BuildError(errors)
+    return generated
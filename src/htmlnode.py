@@ -1,4 +1,10 @@
+# Elements whose contents render as written, left alone by minification
+RAW_TAGS = ('pre', 'textarea', 'script', 'style')
+
 class HTMLNode:
+    # Pages are made of many small nodes: slots keep each one free of a per-instance __dict__
+    __slots__ = ('tag', 'value', 'children', 'props')
+
     def __init__(self, tag: str = None, value: str = None, children: list = None, props: dict = None):
         self.tag =tag
         self.value = value
@@ -9,32 +15,96 @@ class HTMLNode:
         return f"{self.__class__.__name__}({self.tag}, {self.value}, {self.children}, {self.props})"
 
     def to_html(self):
+        return ''.join(self.iter_html())
+
+    def iter_html(self, minifier=None):
+        """Yields the HTML of the node in chunks, without building it as a whole. A
+        minify.Minifier, if given, minifies text and attributes as they are serialized."""
         raise NotImplementedError
 
-    def props_to_html(self):
+    def write_html(self, stream, minifier=None):
+        """Serializes the node into a text stream, such as an open file or an io.StringIO"""
+        stream.writelines(self.iter_html(minifier))
+
+    def props_to_html(self, minifier=None):
+        if minifier and self.props:
+            return minifier.attributes(self.props)
+        html = ''
         if self.props:
-            return ''.join(list(map(lambda key: f' {key}="{self.props[key]}"', self.props)))
-        return ''
+            for key, value in self.props.items():
+                html += f' {key}="{value}"'
+        return html
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
-        super().__init__(tag, value, None, props)
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
 
-    def to_html(self):
+    def to_html(self, minifier=None):
+        value = minifier.text(self.value) if minifier and self.value else self.value
         if not self.tag:
-            return self.value
-        if self.tag and not self.value:
-            return f"<{self.tag}{self.props_to_html()}>"
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            return value
+        if self.tag and not value:
+            return f"<{self.tag}{self.props_to_html(minifier)}>"
+        return f"<{self.tag}{self.props_to_html(minifier)}>{value}</{self.tag}>"
+
+    def iter_html(self, minifier=None):
+        yield self.to_html(minifier)
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        super().__init__(tag, None, children, props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
 
-    def to_html(self):
+    def start_tag(self, minifier=None):
         if not self.tag:
             raise ValueError("A parent node must have a tag")
         if not self.children:
             raise ValueError("A parent node must have children nodes")
+        return f"<{self.tag}{self.props_to_html(minifier)}>"
+
+    def iter_html(self, minifier=None):
+        # Depth-first with an explicit stack of open nodes, so depth is not bound by the
+        # recursion limit and no level copies the HTML of the levels below it.
+        # Nothing inside <pre> and the like is minified, its whitespace renders.
+        yield self.start_tag(minifier)
+        stack = [(self.tag, iter(self.children), None if self.tag in RAW_TAGS else minifier)]
+        while stack:
+            tag, children, child_minifier = stack[-1]
+            for child in children:
+                if isinstance(child, ParentNode):
+                    yield child.start_tag(child_minifier)
+                    stack.append((child.tag, iter(child.children), None if child.tag in RAW_TAGS else child_minifier))
+                    break
+                if isinstance(child, LeafNode):
+                    yield child.to_html(child_minifier)
+                else:
+                    yield from child.iter_html(child_minifier)
+            else:
+                stack.pop()
+                yield f"</{tag}>"
+
+class FragmentNode(HTMLNode):
+    """HTML serialized beforehand, such as a block from the block cache, written as it is.
+    It was minified, or not, when it was serialized."""
+    __slots__ = ()
+
+    def __init__(self, html):
+        self.tag = None
+        self.value = html
+        self.children = None
+        self.props = None
+
+    def to_html(self, minifier=None):
+        return self.value
 
-        return f"<{self.tag}{self.props_to_html()}>{''.join(map(lambda x: x.to_html(), self.children))}</{self.tag}>"
+    def iter_html(self, minifier=None):
+        yield self.value
@@ -0,0 +1,96 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+from urllib.parse import unquote
+
+from fingerprint import url
+from template import ROOT_URL_REGEX, TEMPLATES_DIR, rewrite_urls
+from textnode import LINK_PATTERN
+
+CODE_FENCE = '```'
+
+def site_index(manifest, to_dir, basepath='/'):
+    """URLs of every generated page, listing page and static file, as served under the basepath.
+    Pages are also reachable by their directory, or without their .html extension."""
+    prefix = basepath.rstrip('/')
+    paths = [*manifest['pages'], *manifest.get('listings', {}), *manifest.get('static', {}),
+             *manifest.get('assets', {}).values()]
+    index = set()
+    for dest_path in paths:
+        page_url = prefix + url(dest_path, to_dir)
+        index.add(page_url)
+        if page_url.endswith('/index.html'):
+            index.add(page_url[:-len('index.html')])
+            index.add(page_url[:-len('/index.html')])
+        elif page_url.endswith('.html'):
+            index.add(page_url[:-len('.html')])
+    return index
+
+def source_links(path):
+    """Yields the (line number, URL) of every root-relative link and image in a markdown
+    source, out of code blocks, or every root-relative href and src in a template"""
+    is_markdown = not path.endswith('.html')
+    in_code = False
+    with open(path, 'r') as source_file:
+        for line_number, line in enumerate(source_file, 1):
+            if is_markdown:
+                if line.startswith(CODE_FENCE):
+                    in_code = not in_code
+                if in_code:
+                    continue
+                for match in LINK_PATTERN.finditer(line):
+                    if match[2].startswith('/'):
+                        yield line_number, match[2]
+            else:
+                for match in ROOT_URL_REGEX.finditer(line):
+                    yield line_number, match[2]
+
+def target(link, basepath='/', assets=None):
+    """Path a link points at once the page is rendered, without its query and fragment"""
+    rewritten = rewrite_urls(f'href="{link}"', basepath, assets)[len('href="'):-1]
+    return unquote(rewritten.split('#', 1)[0].split('?', 1)[0])
+
+# Set once in every checking process, so the index is not sent along with every file
+_checked_site = None
+
+def _init_worker(index, basepath, assets):
+    global _checked_site
+    _checked_site = (index, basepath, assets)
+
+def check_file(path):
+    """Returns the number of links of a source and its (source, line, URL) broken ones"""
+    index, basepath, assets = _checked_site
+    links = 0
+    broken = []
+    for line_number, link in source_links(path):
+        links += 1
+        if target(link, basepath, assets) not in index:
+            broken.append((path, line_number, link))
+    return links, broken
+
+def check_links(sources, index, basepath='/', assets=None, jobs=1):
+    """Checks the internal links of the markdown sources and templates against the site index,
+    as they are rewritten for the basepath and fingerprinted assets, in a pool of `jobs`
+    processes. Every source is read once and every link is one lookup.
+    Reports and returns the (source, line, URL) of every broken link."""
+    sources = sorted(sources)
+    if jobs > 1 and len(sources) > 1:
+        chunksize = max(1, len(sources) // (jobs * 8))
+        with ProcessPoolExecutor(min(jobs, len(sources)), initializer=_init_worker,
+                                 initargs=(index, basepath, assets)) as executor:
+            results = list(executor.map(check_file, sources, chunksize=chunksize))
+    else:
+        _init_worker(index, basepath, assets)
+        results = list(map(check_file, sources))
+    links = sum(count for count, _ in results)
+    broken = [link for _, broken_links in results for link in broken_links]
+    for path, line_number, link in broken:
+        print(f"{path}:{line_number}: broken link to {link}")
+    print(f"Checked {links} links in {len(sources)} files, {len(broken)} broken")
+    return broken
+
+def template_sources(template_path, templates_dir=TEMPLATES_DIR):
+    """The default template and every template under templates_dir"""
+    sources = [template_path] if os.path.isfile(template_path) else []
+    for dir_path, _, filenames in os.walk(templates_dir):
+        sources.extend(os.path.join(dir_path, filename) for filename in filenames if filename.endswith('.html'))
+    return sources
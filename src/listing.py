@@ -0,0 +1,130 @@
+import json
+import os
+import re
+
+import manifest as mf
+from fingerprint import url
+from generate_page import open_page, remove_page
+from htmlnode import LeafNode, ParentNode
+from minify import Minifier
+from template import load_template, select_template
+
+# Content directories whose pages are listed, newest first, in paginated index pages
+LISTED_DIRS = ('blog',)
+TAGS_DIR = 'tags'
+PAGE_SIZE = 10
+SLUG_REGEX = re.compile(r'[^\w-]+')
+
+def slug(tag):
+    return SLUG_REGEX.sub('-', tag.strip().lower()).strip('-')
+
+def listing_item(dest_path, page_metadata, to_dir):
+    return [url(dest_path, to_dir), page_metadata['title'], page_metadata['date'], page_metadata['summary']]
+
+def sort_items(items):
+    """Newest first. Undated pages come last, by title."""
+    items = sorted(items, key=lambda item: item[1] or '')
+    return sorted(items, key=lambda item: (item[2] is not None, item[2] or ''), reverse=True)
+
+def paginate(title, items, first_dest, dest_dir, template_path):
+    """The listing pages of a list of items: the first one at first_dest, and the next ones at
+    dest_dir/page/2.html and so on"""
+    items = sort_items(items)
+    page_count = (len(items) + PAGE_SIZE - 1) // PAGE_SIZE
+    dests = [first_dest] + [os.path.join(dest_dir, 'page', f"{number}.html") for number in range(2, page_count + 1)]
+    listings = {}
+    for number, dest_path in enumerate(dests, 1):
+        listings[dest_path] = {
+            'title': title if number == 1 else f"{title}, page {number}",
+            'items': items[(number - 1) * PAGE_SIZE:number * PAGE_SIZE],
+            'newer': dests[number - 2] if number > 1 else None,
+            'older': dests[number] if number < page_count else None,
+            'template': template_path,
+        }
+    return listings
+
+def collect_listings(pages, metadata, content_dir, to_dir, template_path, listed_dirs=LISTED_DIRS):
+    """Every listing page of the site, by destination, from one pass over the metadata of the
+    generated pages: the index of each listed directory and the page of each tag. Listing pages
+    whose destination is a page written by hand are left out, with a warning."""
+    collections = {listed_dir: [] for listed_dir in listed_dirs}
+    tags = {}
+    for dest_path, entry in sorted(pages.items()):
+        page_metadata = metadata.get(entry['source'])
+        item = listing_item(dest_path, page_metadata, to_dir)
+        rel_path = os.path.relpath(entry['source'], content_dir)
+        listed_dir = rel_path.split(os.sep, 1)[0]
+        if listed_dir in collections and rel_path != os.path.join(listed_dir, 'index.md'):
+            collections[listed_dir].append(item)
+        for tag in page_metadata['tags']:
+            if slug(tag):
+                tags.setdefault(slug(tag), (tag, []))[1].append(item)
+
+    listings = {}
+    for listed_dir, items in collections.items():
+        if not items:
+            continue
+        dest_dir = os.path.join(to_dir, listed_dir)
+        first_dest = os.path.join(dest_dir, 'index.html')
+        if first_dest in pages: # written by hand
+            first_dest = os.path.join(dest_dir, 'page', '1.html')
+        listed_template = select_template(os.path.join(content_dir, listed_dir, 'index.md'), content_dir, template_path)
+        listings.update(paginate(listed_dir.capitalize(), items, first_dest, dest_dir, listed_template))
+    for tag_slug, (tag, items) in tags.items():
+        dest_dir = os.path.join(to_dir, TAGS_DIR, tag_slug)
+        listings.update(paginate(f"Tagged {tag}", items, os.path.join(dest_dir, 'index.html'), dest_dir, template_path))
+    for dest_path in sorted(listings.keys() & pages.keys()):
+        print(f"Warning: listing page {dest_path} ({listings.pop(dest_path)['title']}) not generated, "
+              f"{pages[dest_path]['source']} is written there")
+    return listings
+
+def listing_content(listing, to_dir):
+    items = []
+    for item_url, title, date, summary in listing['items']:
+        children = [LeafNode('a', title or item_url, {'href': item_url})]
+        if date:
+            children.append(LeafNode('time', date, {'datetime': date}))
+        if summary:
+            children.append(LeafNode('p', summary))
+        items.append(ParentNode('li', children))
+    content = [ParentNode('ul', items, {'class': 'listing'})]
+    links = [LeafNode('a', text, {'href': url(listing[key], to_dir), 'rel': rel})
+             for key, text, rel in (('newer', 'Newer', 'prev'), ('older', 'Older', 'next')) if listing[key]]
+    if links:
+        content.append(ParentNode('nav', links))
+    return ParentNode('div', content)
+
+def listing_hash(listing, basepath, assets=None, minify=False):
+    """Digest of everything a listing page is made of. A change to a page changes only the
+    digests of the listing pages that show it."""
+    inputs = [listing, load_template(listing['template']).digest, basepath, assets.digest if assets else None, minify]
+    return mf.hash_bytes(json.dumps(inputs, sort_keys=True).encode())
+
+def generate_listings(manifest, metadata, content_dir, template_path, to_dir, basepath, assets=None, minify=False):
+    """Writes the listing pages of the pages in the manifest, and deletes the ones that are gone.
+
+    Listing pages whose digest is the one in manifest['listings'] are skipped, so when one
+    page changes only the listing pages that include it are written again.
+    Returns the listing pages written.
+    """
+    listings = collect_listings(manifest['pages'], metadata, content_dir, to_dir, template_path)
+    known = manifest.get('listings', {})
+    digests = {}
+    generated = []
+    for dest_path, listing in listings.items():
+        digests[dest_path] = listing_hash(listing, basepath, assets, minify)
+        if known.get(dest_path) == digests[dest_path] and os.path.isfile(dest_path):
+            continue
+        minifier = Minifier() if minify else None
+        with open_page(dest_path) as dest_file:
+            load_template(listing['template']).write(
+                dest_file, {'Title': listing['title'], 'Content': listing_content(listing, to_dir)},
+                basepath, assets, minifier)
+        generated.append(dest_path)
+    for dest_path in sorted(known.keys() - digests.keys()):
+        if dest_path not in manifest['pages']:
+            remove_page(dest_path, to_dir)
+    manifest['listings'] = digests
+    if listings or known:
+        print(f"Generated {len(generated)} of {len(listings)} listing pages ({len(listings) - len(generated)} unchanged)")
+    return generated
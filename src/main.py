@@ -1,17 +1,62 @@
+import argparse
 import sys
-import os
 
-from copy_static import copy_static
-from generate_page import generate_pages_recursive
+from block_cache import BLOCK_CACHE_PATH
+from build import PROFILE_PATH, BuildConfig, build
+from generate_page import BuildError
+from output import mark_deployed
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Generate the static site from content/ into docs/.")
+    parser.add_argument('basepath', nargs='?', default='/', help="URL path the site is served from (default: /)")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="number of processes rendering pages in parallel, 0 for one per CPU (default: 1)")
+    parser.add_argument('--hash', action='store_true',
+                        help="compare static files by content when their mtimes differ, not only by size and mtime")
+    parser.add_argument('--hardlink', action='store_true',
+                        help="hardlink static files into docs/ instead of copying them, where the filesystem allows")
+    parser.add_argument('--fingerprint', action='store_true',
+                        help="also publish css, js, images and fonts under content-hashed names, point pages at them "
+                             "and list them in docs/asset-manifest.json")
+    parser.add_argument('--optimize-png', action='store_true',
+                        help="publish static PNGs losslessly recompressed, each optimized once and cached in .charlot/png/")
+    parser.add_argument('--minify', action='store_true',
+                        help="minify pages as they are written: collapse whitespace, drop comments and optional quotes")
+    parser.add_argument('--precompress', action='store_true',
+                        help="write .gz, and .zst where Python provides it, next to every compressible file in docs/")
+    parser.add_argument('--search', action='store_true',
+                        help="write a client-side search index of the pages to docs/search/, sharded by term prefix")
+    parser.add_argument('--site-url', metavar='URL',
+                        help="origin the site is published at, such as https://example.com: write docs/sitemap.xml "
+                             "and an Atom feed of content/blog/ to docs/blog/atom.xml")
+    parser.add_argument('--check', action='store_true',
+                        help="after the build, check that every internal link and image of the content and templates "
+                             "points at a generated page or static file, and fail if any is broken")
+    parser.add_argument('--no-block-cache', action='store_true',
+                        help=f"render every block of the pages rendered, instead of reusing the HTML of the blocks "
+                             f"unchanged since any build, cached in {BLOCK_CACHE_PATH}")
+    parser.add_argument('--profile', nargs='?', const=PROFILE_PATH, metavar='REPORT',
+                        help=f"render every page one by one, timing and tracing the memory of each stage, and write "
+                             f"a JSON report (default: {PROFILE_PATH})")
+    parser.add_argument('--profile-top', type=int, default=10, metavar='N',
+                        help="number of slowest pages in the profile report (default: 10)")
+    parser.add_argument('--deployed', action='store_true',
+                        help="instead of building, record docs/ as last built as deployed, so .charlot/deploy.json "
+                             "lists only the changes of the builds after it")
+    return parser.parse_args(argv)
 
 def main():
-    basepath = sys.argv[1] if (len(sys.argv) == 2) else '/'
-    static_path = os.path.join('static')
-    public_path = os.path.join('docs')
-    content_path = os.path.join('content')
-    template_path = os.path.join('template.html')
+    args = parse_args(sys.argv[1:])
+    if vars(args).pop('deployed'):
+        mark_deployed()
+        return
+    try:
+        result = build(BuildConfig.from_args(args))
+    except BuildError as e:
+        sys.exit(f"Error: {e}")
+    if result.broken_links:
+        sys.exit(f"Error: {len(result.broken_links)} broken link(s)")
 
-    copy_static(static_path, public_path)
-    generate_pages_recursive(content_path, template_path, public_path, basepath)
 
-main()
+if __name__ == '__main__':
+    main()
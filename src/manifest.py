@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 3
+MANIFEST_PATH = os.path.join('.charlot', 'manifest.json')
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while (chunk := file.read(1 << 16)):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def new_manifest():
+    return {'version': MANIFEST_VERSION, 'pages': {}, 'static': {}}
+
+def load_manifest(path=MANIFEST_PATH):
+    """Loads the build manifest, or an empty one if missing, unreadable or outdated"""
+    try:
+        with open(path, 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return new_manifest()
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return new_manifest()
+    return manifest
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Writes the manifest atomically, so an interrupted build never leaves it half written"""
+    dir_path = os.path.dirname(path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def page_entry(from_path, source_hash, template_hash, basepath, assets_hash=None, minify=False, search=False,
+               asset_urls=None):
+    """Inputs a generated page depends on. The page is re-rendered when any of them changes.
+    assets_hash is the digest of the assets at the asset_urls the page references."""
+    return {
+        'source': from_path,
+        'source_hash': source_hash,
+        'template_hash': template_hash,
+        'basepath': basepath,
+        'assets_hash': assets_hash,
+        'minify': minify,
+        'search': search,
+        'asset_urls': asset_urls,
+    }
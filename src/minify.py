@@ -0,0 +1,102 @@
+import re
+
+from htmlnode import RAW_TAGS
+
+WHITESPACE_REGEX = re.compile(r'\s+')
+# Values that may go without quotes: no whitespace, quotes, `=`, `<`, `>`, backticks or slot marks
+UNQUOTED_VALUE_REGEX = re.compile(r'[^\s"\'=<>`\x00]+')
+HTML_TOKEN_REGEX = re.compile(
+    r'<!--.*?-->|<(pre|textarea|script|style)\b.*?</\1\s*>|<[^<>]*>|[^<]+|<', re.S | re.I)
+TAG_PART_REGEX = re.compile(r'("[^"]*"|\'[^\']*\')|\s+')
+TAG_NAME_REGEX = re.compile(r'</?\s*([!\w-]+)')
+# Whitespace next to these tags never renders
+BLOCK_TAGS = {
+    '!doctype', 'html', 'head', 'body', 'title', 'meta', 'link', 'base', 'script', 'style', 'div', 'p',
+    'article', 'aside', 'header', 'footer', 'main', 'nav', 'section', 'ul', 'ol', 'li', 'dl', 'dt', 'dd',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'blockquote', 'hr', 'table', 'thead', 'tbody', 'tfoot',
+    'tr', 'td', 'th', 'form', 'figure', 'figcaption', 'br',
+}
+# Stands in for template slots while the template source is minified
+SLOT_MARK = '\x00'
+
+class Minifier:
+    """Minifies the parts of a page as they are serialized, counting the bytes saved.
+
+    Everything it drops is ASCII, so the characters saved are the bytes saved.
+    """
+    def __init__(self):
+        self.saved = 0
+
+    def text(self, value):
+        minified = WHITESPACE_REGEX.sub(' ', value)
+        self.saved += len(value) - len(minified)
+        return minified
+
+    def attributes(self, props):
+        html = ''
+        for key, value in props.items():
+            value = str(value)
+            # Root-relative URLs keep their quotes for the basepath and asset rewriting that follows
+            if UNQUOTED_VALUE_REGEX.fullmatch(value) and not value.startswith('/'):
+                html += f' {key}={value}'
+                self.saved += 2
+            else:
+                html += f' {key}="{value}"'
+        return html
+
+def minify_tag(tag):
+    def minify_part(match):
+        quoted = match[1]
+        if quoted is None:
+            return ' '
+        # Kept before `/>`, which would otherwise become part of the value
+        if (tag[match.start() - 1] == '=' and UNQUOTED_VALUE_REGEX.fullmatch(quoted[1:-1])
+                and not tag[match.end():].lstrip().startswith('/')):
+            return quoted[1:-1]
+        return quoted
+    tag = TAG_PART_REGEX.sub(minify_part, tag)
+    return tag.replace(' >', '>').replace('< ', '<').replace(' />', '/>')
+
+def tag_name(token):
+    if not token or not token.startswith('<') or token.startswith('<!--'):
+        return None
+    match = TAG_NAME_REGEX.match(token)
+    return match[1].lower() if match else None
+
+def minify_html(html):
+    """Drops comments and the whitespace that does not render, collapses the rest and unquotes
+    attribute values that do not need quotes. Raw elements such as <pre> are kept as written, and
+    so are conditional comments and comments holding a slot mark."""
+    tokens = [match[0] for match in HTML_TOKEN_REGEX.finditer(html)
+              if not match[0].startswith('<!--') or match[0].startswith('<!--[if') or SLOT_MARK in match[0]]
+    output = []
+    for idx, token in enumerate(tokens):
+        if token.startswith('<!--'):
+            output.append(token)
+        elif token.startswith('<') and len(token) > 1:
+            if tag_name(token) in RAW_TAGS and not token.startswith('</'):
+                end = token.index('>') + 1
+                output.append(minify_tag(token[:end]) + token[end:])
+            else:
+                output.append(minify_tag(token))
+        elif token.isspace():
+            around = (tag_name(tokens[idx - 1]) if idx else '!doctype',
+                      tag_name(tokens[idx + 1]) if idx + 1 < len(tokens) else '!doctype')
+            if not any(name in BLOCK_TAGS for name in around):
+                output.append(' ')
+        else:
+            output.append(WHITESPACE_REGEX.sub(' ', token))
+    return ''.join(output)
+
+def minify_segments(segments):
+    """Minifies the literals of compiled template segments as one document, with the slots
+    standing in the text, so tags and whitespace spanning slots are handled as a whole. The
+    literals are left as they are if minifying loses a slot."""
+    marked = ''.join(segment if idx % 2 == 0 else SLOT_MARK for idx, segment in enumerate(segments))
+    literals = minify_html(marked).split(SLOT_MARK)
+    if len(literals) != (len(segments) + 1) // 2:
+        return list(segments)
+    minified = []
+    for idx, segment in enumerate(segments):
+        minified.append(literals[idx // 2] if idx % 2 == 0 else segment)
+    return minified
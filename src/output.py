@@ -0,0 +1,173 @@
+import io
+import json
+import os
+import threading
+
+from manifest import hash_file
+from template import file_state
+
+OUTPUTS_PATH = os.path.join('.charlot', 'outputs.json')
+DEPLOY_MANIFEST_PATH = os.path.join('.charlot', 'deploy.json')
+DEPLOYED_PATH = os.path.join('.charlot', 'deployed.json')
+DEPLOY_MANIFEST_VERSION = 1
+COPY_CHUNK = 1 << 16
+
+class _ComparingWriter(io.RawIOBase):
+    """Raw binary writer comparing what is written with the bytes already at path. Nothing is
+    written until the first difference, when the identical prefix is copied to a temporary
+    file that the rest goes to and that replaces path once closed."""
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        self.offset = 0
+        self.tmp_file = None
+        self.discarded = False
+        try:
+            self.old_file = open(path, 'rb')
+        except (FileNotFoundError, IsADirectoryError):
+            self.old_file = None
+            self.diverge()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.tmp_file is None:
+            if self.old_file.read(len(data)) == data:
+                self.offset += len(data)
+                return len(data)
+            self.diverge()
+        self.tmp_file.write(data)
+        return len(data)
+
+    def diverge(self):
+        self.tmp_file = open(self.tmp_path, 'wb')
+        if self.offset:
+            self.old_file.seek(0)
+            remaining = self.offset
+            while remaining:
+                chunk = self.old_file.read(min(remaining, COPY_CHUNK))
+                self.tmp_file.write(chunk)
+                remaining -= len(chunk)
+
+    @property
+    def changed(self):
+        return self.tmp_file is not None
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            # A longer file than what was written differs too
+            if not self.discarded and self.tmp_file is None and self.old_file.read(1):
+                self.diverge()
+            if self.old_file:
+                self.old_file.close()
+            if self.tmp_file:
+                self.tmp_file.close()
+                if self.discarded:
+                    os.remove(self.tmp_path)
+                else:
+                    os.replace(self.tmp_path, self.path)
+        finally:
+            super().close()
+
+class OutputFile:
+    """Text file written to path only if its content changes, so unchanged outputs keep their
+    mtime and are not deployed again. A changed file is written to a temporary path and moved
+    into place once closed; if the with block raises, path is left as it was.
+
+    Raises FileNotFoundError on creation, not on entry, when the directory of a new file is missing.
+    """
+    def __init__(self, path, encoding=None):
+        self.writer = _ComparingWriter(path)
+        self.file = io.TextIOWrapper(io.BufferedWriter(self.writer), encoding=encoding)
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.writer.discarded = True
+        self.file.close()
+
+    @property
+    def changed(self):
+        return self.writer.changed
+
+def write_output(path, text, encoding=None):
+    """Writes text to path unless it already holds it. Returns whether it was written."""
+    output = OutputFile(path, encoding)
+    with output as output_file:
+        output_file.write(text)
+    return output.changed
+
+def output_states(to_dir, previous):
+    """The [mtime_ns, size, hash] of every file under to_dir, by path relative to it. Files
+    whose state is the one in previous are not hashed again, and the temporary files of
+    writes in progress, or of a build that crashed, are left out."""
+    states = {}
+    for dir_path, _, filenames in os.walk(to_dir):
+        for filename in filenames:
+            if filename.endswith('.tmp'):
+                continue
+            path = os.path.join(dir_path, filename)
+            name = os.path.relpath(path, to_dir).replace(os.sep, '/')
+            state = file_state(path)
+            if state is None:
+                continue
+            known = previous.get(name)
+            if known and tuple(known[:2]) == state:
+                states[name] = known
+            else:
+                states[name] = [*state, hash_file(path)]
+    return states
+
+def read_states(path):
+    try:
+        with open(path, 'r') as states_file:
+            return json.load(states_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def diff_states(previous, states):
+    """The files added, changed and removed from previous to states, the added and changed
+    ones with their sha256 hash"""
+    return {
+        'version': DEPLOY_MANIFEST_VERSION,
+        'added': {name: state[2] for name, state in sorted(states.items()) if name not in previous},
+        'changed': {name: state[2] for name, state in sorted(states.items())
+                    if name in previous and previous[name][2] != state[2]},
+        'removed': sorted(previous.keys() - states.keys()),
+    }
+
+def update_deploy_manifest(to_dir, outputs_path=OUTPUTS_PATH, deploy_path=DEPLOY_MANIFEST_PATH,
+                           deployed_path=DEPLOYED_PATH):
+    """Writes to deploy_path the output files added, changed and removed since the outputs
+    last marked deployed in deployed_path (see mark_deployed), the added and changed ones with
+    their sha256 hash, for a deploy to upload and invalidate only those. Changes pile up over
+    builds until then. The outputs of each build are recorded in outputs_path.
+    Returns the changes of this build and those written to deploy_path.
+    """
+    previous = read_states(outputs_path)
+    states = output_states(to_dir, previous)
+    built = diff_states(previous, states)
+    changes = diff_states(read_states(deployed_path), states)
+    dir_path = os.path.dirname(outputs_path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    write_output(outputs_path, json.dumps(states, separators=(',', ':'), sort_keys=True))
+    write_output(deploy_path, json.dumps(changes, indent=1))
+    print(f"Deploy manifest: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+          f"{len(changes['removed'])} removed")
+    return built, changes
+
+def mark_deployed(outputs_path=OUTPUTS_PATH, deploy_path=DEPLOY_MANIFEST_PATH, deployed_path=DEPLOYED_PATH):
+    """Records the outputs of the last build as deployed, emptying the deploy manifest"""
+    states = read_states(outputs_path)
+    dir_path = os.path.dirname(deployed_path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    write_output(deployed_path, json.dumps(states, separators=(',', ':'), sort_keys=True))
+    write_output(deploy_path, json.dumps(diff_states(states, states), indent=1))
+    print(f"Marked {len(states)} output files deployed")
@@ -0,0 +1,90 @@
+import os
+import queue
+import threading
+
+READERS = 4
+WRITERS = 2
+QUEUE_SIZE = 32
+WRITE_BATCH = 8
+
+def make_dirs(paths):
+    """Creates the directories of the given file paths, each one once"""
+    dir_paths = {os.path.dirname(path) for path in paths} - {''}
+    # Creating the deepest directories creates the ones above them
+    parents = {os.path.dirname(dir_path) for dir_path in dir_paths}
+    for dir_path in sorted(dir_paths - parents):
+        os.makedirs(dir_path, exist_ok=True)
+
+def run_pipeline(items, read, render, write, readers=READERS, writers=WRITERS, queue_size=QUEUE_SIZE,
+                 write_batch=WRITE_BATCH):
+    """Runs read(item) in a pool of reader threads, render(item, data) in the calling thread and
+    write(item, output) in a pool of writer threads, the stages connected by queues of at most
+    queue_size items. Reads and writes overlap with rendering, and no more than a few queues
+    of items are held in memory at once, however many there are.
+
+    Every item goes through every stage it can. Returns the exceptions of the items that
+    failed, by item index.
+    """
+    items = list(items)
+    read_queue = queue.Queue(queue_size)
+    write_queue = queue.Queue(queue_size)
+    indexes = iter(range(len(items)))
+    indexes_lock = threading.Lock()
+    errors = {}
+
+    def reader():
+        while True:
+            with indexes_lock:
+                idx = next(indexes, None)
+            if idx is None:
+                return
+            try:
+                read_queue.put((idx, read(items[idx]), None))
+            except Exception as e:
+                read_queue.put((idx, None, e))
+
+    def writer():
+        while True:
+            batch = [write_queue.get()]
+            while len(batch) < write_batch:
+                try:
+                    batch.append(write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            for entry in batch:
+                if entry is not None:
+                    idx, output = entry
+                    try:
+                        write(items[idx], output)
+                    except Exception as e:
+                        errors[idx] = e
+            stops = batch.count(None)
+            if stops:
+                # One stop per writer: the ones taken for other writers are handed back
+                for _ in range(stops - 1):
+                    write_queue.put(None)
+                return
+
+    reader_threads = [threading.Thread(target=reader, daemon=True) for _ in range(max(1, min(readers, len(items))))]
+    writer_threads = [threading.Thread(target=writer, daemon=True) for _ in range(max(1, writers))]
+    for thread in reader_threads + writer_threads:
+        thread.start()
+    try:
+        for _ in range(len(items)):
+            idx, data, error = read_queue.get()
+            if error is None:
+                try:
+                    write_queue.put((idx, render(items[idx], data)))
+                    continue
+                except Exception as e:
+                    error = e
+            errors[idx] = error
+    finally:
+        # Whatever was rendered is written. Readers are only waited for once all was read.
+        for _ in writer_threads:
+            write_queue.put(None)
+        for thread in writer_threads:
+            thread.join()
+    for thread in reader_threads:
+        thread.join()
+    return errors
@@ -0,0 +1,130 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import struct
+import zlib
+
+import manifest as mf
+from template import file_state
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_CACHE_DIR = os.path.join('.charlot', 'png')
+# Part of the cache file names, so changing what the optimizer does invalidates the cache
+OPTIMIZER_VERSION = 1
+# Critical chunks, plus the ancillary ones that change how the pixels look
+KEPT_CHUNKS = {b'IHDR', b'PLTE', b'IDAT', b'IEND', b'tRNS', b'gAMA', b'cHRM', b'sRGB', b'iCCP', b'sBIT'}
+# Animated PNGs keep their frames in ancillary chunks and are left as they are
+ANIMATION_CHUNK = b'acTL'
+DEFLATE_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)
+
+def read_chunks(data):
+    """Yields the (type, data) chunks of a PNG, checking their CRCs"""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file.")
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        length, chunk_type = struct.unpack('>I4s', data[position:position + 8])
+        chunk_data = data[position + 8:position + 8 + length]
+        crc, = struct.unpack('>I', data[position + 8 + length:position + 12 + length])
+        if zlib.crc32(chunk_type + chunk_data) != crc:
+            raise ValueError(f"Corrupt {chunk_type.decode(errors='replace')} chunk.")
+        yield chunk_type, chunk_data
+        position += 12 + length
+        if chunk_type == b'IEND':
+            break
+
+def write_chunk(chunk_type, chunk_data):
+    return struct.pack('>I4s', len(chunk_data), chunk_type) + chunk_data + struct.pack('>I', zlib.crc32(chunk_type + chunk_data))
+
+def deflate(data, level=9):
+    """Smallest zlib stream among the strategies tried"""
+    streams = []
+    for strategy in DEFLATE_STRATEGIES:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, 9, strategy)
+        streams.append(compressor.compress(data) + compressor.flush())
+    return min(streams, key=len)
+
+def optimize_png(data):
+    """Losslessly shrinks a PNG: drops the chunks that do not affect the image and deflates the
+    image data again at the highest level. The scanline filters are kept as they are.
+    Returns the original data when it cannot be made smaller."""
+    chunks = list(read_chunks(data))
+    if any(chunk_type == ANIMATION_CHUNK for chunk_type, _ in chunks):
+        return data
+    image_data = zlib.decompress(b''.join(chunk_data for chunk_type, chunk_data in chunks if chunk_type == b'IDAT'))
+    output = [PNG_SIGNATURE]
+    for chunk_type, chunk_data in chunks:
+        if chunk_type == b'IDAT':
+            if image_data is not None:
+                output.append(write_chunk(b'IDAT', deflate(image_data)))
+                image_data = None
+        elif chunk_type in KEPT_CHUNKS:
+            output.append(write_chunk(chunk_type, chunk_data))
+    optimized = b''.join(output)
+    return optimized if len(optimized) < len(data) else data
+
+def _optimize_worker(paths):
+    """Returns (optimized, error). A PNG that fails to decode is cached as it is, so it is
+    published unchanged and not tried again; one that cannot be read or cached is not cached."""
+    from_path, cache_path = paths
+    error = None
+    try:
+        with open(from_path, 'rb') as png_file:
+            data = png_file.read()
+        try:
+            optimized = optimize_png(data)
+        except (ValueError, struct.error, zlib.error) as e:
+            optimized, error = data, f"{type(e).__name__}: {e}"
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as cache_file:
+            cache_file.write(optimized)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        return False, f"{type(e).__name__}: {e}"
+    return error is None, error
+
+def optimize_pngs(from_dir, manifest, cache_dir=PNG_CACHE_DIR, jobs=1):
+    """Optimizes every PNG under from_dir into a cache addressed by the hash of the original.
+
+    Each image is processed once: later builds find it in the cache, and only PNGs whose file
+    changed are hashed again (their hashes are kept in manifest['png']). Returns the cached
+    file of every PNG, by source path, for sync_static to publish instead of the original.
+    PNGs that fail to decode are cached, and published, as they are; those that cannot be read
+    are published as they are and tried again next build. Cached files no PNG uses any more
+    are deleted.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    known = manifest.get('png', {})
+    digests = {}
+    for dir_path, _, filenames in os.walk(from_dir):
+        for filename in filenames:
+            if filename.lower().endswith('.png'):
+                from_path = os.path.join(dir_path, filename)
+                state = list(file_state(from_path))
+                entry = known.get(from_path)
+                digest = entry[1] if entry and entry[0] == state else mf.hash_file(from_path)
+                digests[from_path] = (state, digest)
+    manifest['png'] = {from_path: [state, digest] for from_path, (state, digest) in digests.items()}
+
+    cached = {from_path: os.path.join(cache_dir, f"{digest}-{OPTIMIZER_VERSION}.png") for from_path, (_, digest) in digests.items()}
+    missing = {cache_path: from_path for from_path, cache_path in cached.items() if not os.path.isfile(cache_path)}
+    work = [(from_path, cache_path) for cache_path, from_path in missing.items()]
+    optimized = 0
+    if work:
+        with ProcessPoolExecutor(max(1, min(jobs, len(work)))) as executor:
+            for (from_path, _), (done, error) in zip(work, executor.map(_optimize_worker, work)):
+                optimized += done
+                if error:
+                    print(f"Error optimizing {from_path}, published as it is: {error}")
+    cached = {from_path: cache_path for from_path, cache_path in cached.items() if os.path.isfile(cache_path)}
+    used = set(cached.values())
+    for filename in os.listdir(cache_dir):
+        if os.path.join(cache_dir, filename) not in used:
+            os.remove(os.path.join(cache_dir, filename))
+
+    original_size = sum(os.path.getsize(from_path) for from_path in cached)
+    optimized_size = sum(os.path.getsize(cache_path) for cache_path in cached.values())
+    saved = original_size - optimized_size
+    print(f"Optimized {optimized} of {len(digests)} PNGs ({len(digests) - len(work)} cached, "
+          f"{len(work) - optimized} failed), "
+          f"{saved:,} bytes saved ({saved / (original_size or 1):.1%})")
+    return cached
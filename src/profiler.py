@@ -0,0 +1,81 @@
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+
+STAGES = ('read', 'block split', 'inline parse', 'html serialize', 'template', 'write', 'static copy')
+
+class Profiler:
+    """Records wall time and peak allocated memory per stage and per page.
+
+    Memory is traced with tracemalloc between start() and stop(). A stage's memory is the
+    peak allocated above what was allocated when it began.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.pages = {}
+        self.bytes_in = 0
+        self.wall_time = 0.0
+
+    def start(self):
+        tracemalloc.start()
+        self._start = time.perf_counter()
+
+    def stop(self):
+        self.wall_time = time.perf_counter() - self._start
+        tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def stage(self, name, page=None):
+        tracemalloc.reset_peak()
+        memory_before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            self.add(name, seconds, peak - memory_before, page)
+
+    def add(self, name, seconds, memory, page=None):
+        total = self.stages.setdefault(name, {'seconds': 0.0, 'peak_bytes': 0})
+        total['seconds'] += seconds
+        total['peak_bytes'] = max(total['peak_bytes'], memory)
+        if page is not None:
+            page_stages = self.pages.setdefault(page, {})
+            page_stages[name] = {'seconds': seconds, 'peak_bytes': memory}
+
+    def report(self, top=10):
+        """The report as a JSON-serializable dict: totals per stage, throughput and the `top`
+        slowest pages with their stages"""
+        page_seconds = {page: sum(stage['seconds'] for stage in stages.values()) for page, stages in self.pages.items()}
+        slowest = sorted(page_seconds, key=page_seconds.get, reverse=True)[:top]
+        wall_time = self.wall_time or 1e-9
+        return {
+            'wall_seconds': self.wall_time,
+            'pages': len(self.pages),
+            'bytes_in': self.bytes_in,
+            'pages_per_second': len(self.pages) / wall_time,
+            'mb_per_second': self.bytes_in / 1e6 / wall_time,
+            'stages': {name: self.stages[name] for name in STAGES if name in self.stages},
+            'slowest_pages': [
+                {'page': page, 'seconds': page_seconds[page], 'stages': self.pages[page]} for page in slowest
+            ],
+        }
+
+def save_report(report, path):
+    dir_path = os.path.dirname(path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    with open(path, 'w') as report_file:
+        json.dump(report, report_file, indent=1)
+
+def print_report(report):
+    print(f"Built {report['pages']} pages in {report['wall_seconds']:.2f} s: "
+          f"{report['pages_per_second']:.1f} pages/s, {report['mb_per_second']:.2f} MB/s")
+    for name, stage in report['stages'].items():
+        print(f"  {name:<16}{stage['seconds'] * 1e3:>10.1f} ms{stage['peak_bytes'] / 1e6:>10.1f} MB peak")
+    print("Slowest pages:")
+    for page in report['slowest_pages']:
+        print(f"  {page['seconds'] * 1e3:>10.1f} ms  {page['page']}")
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from htmlnode import FragmentNode, ParentNode
+from fingerprint import url
+from output import write_output
+
+SEARCH_RECORDS_DIR = os.path.join('.charlot', 'search')
+SEARCH_STATE_NAME = 'index.json'
+SEARCH_DIR_NAME = 'search'
+PAGES_NAME = 'pages.json'
+# Terms are sharded by their first characters, so a browser only fetches the shards of the
+# terms it looks up
+PREFIX_SIZE = 2
+TAG_REGEX = re.compile(r'<[^>]*>')
+TERM_REGEX = re.compile(r'\w\w+')
+
+def iter_text(node):
+    """Yields the text of a content tree, a serialized one or one with cached fragments"""
+    if isinstance(node, str):
+        yield TAG_REGEX.sub(' ', node)
+    elif isinstance(node, FragmentNode):
+        yield TAG_REGEX.sub(' ', node.value)
+    elif isinstance(node, ParentNode):
+        for child in node.children:
+            yield from iter_text(child)
+    elif node.value:
+        yield node.value
+
+class PageTerms:
+    """Terms of a page, lowercased, with the positions of their words in it, counted a node at
+    a time as the page is rendered"""
+    def __init__(self):
+        self.terms = {}
+        self.position = 0
+
+    def add(self, node):
+        for text in iter_text(node):
+            for match in TERM_REGEX.finditer(text.lower()):
+                self.terms.setdefault(match[0], []).append(self.position)
+                self.position += 1
+
+def page_terms(content):
+    """Terms of a page, lowercased, with the positions of their words in it"""
+    counter = PageTerms()
+    counter.add(content)
+    return counter.terms
+
+def record_path(records_dir, dest_path):
+    return os.path.join(records_dir, hashlib.sha1(dest_path.encode()).hexdigest() + '.json')
+
+def write_page_record(records_dir, dest_path, title, content, terms=None):
+    """Saves the terms of a page as it is rendered, for update_search_index to merge.
+    Pages rendered in worker processes leave their terms this way. Streamed pages give
+    the terms counted as they were written instead of their content."""
+    os.makedirs(records_dir, exist_ok=True)
+    path = record_path(records_dir, dest_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as record_file:
+        json.dump({'title': title, 'terms': page_terms(content) if terms is None else terms}, record_file, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+def read_json(path, default):
+    try:
+        with open(path, 'r') as json_file:
+            return json.load(json_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+def write_json(path, data):
+    write_output(path, json.dumps(data, separators=(',', ':'), sort_keys=True))
+
+def postings(id, positions):
+    """[page id, first position, gaps to the next positions...]"""
+    return [id, positions[0]] + [position - previous for previous, position in zip(positions, positions[1:])]
+
+def update_search_index(pages, generated, to_dir, basepath='/', records_dir=SEARCH_RECORDS_DIR):
+    """Brings the client-side search index in to_dir/search/ up to date.
+
+    pages are the destinations of every page of the site and generated those rendered by this
+    build, which left their terms in records_dir. Each page keeps its id across builds, so
+    only the shards holding terms of generated or removed pages are rewritten. Shards map
+    terms to the postings of the pages they appear in; pages.json maps ids to URLs and titles.
+    Returns the shards written.
+    """
+    search_dir = os.path.join(to_dir, SEARCH_DIR_NAME)
+    os.makedirs(search_dir, exist_ok=True)
+    os.makedirs(records_dir, exist_ok=True)
+    state_path = os.path.join(records_dir, SEARCH_STATE_NAME)
+    state = read_json(state_path, None)
+    if not state or not os.path.isfile(os.path.join(search_dir, PAGES_NAME)):
+        # Indexed from scratch, from the records of every page
+        state = {'next_id': 0, 'pages': {}}
+        for filename in os.listdir(search_dir):
+            os.remove(os.path.join(search_dir, filename))
+    indexed = state['pages']
+    pages = set(pages)
+    generated = set(generated)
+
+    # Generated pages, and pages never indexed, are indexed again from their records
+    records = {}
+    for dest_path in pages:
+        if dest_path in generated or dest_path not in indexed:
+            record = read_json(record_path(records_dir, dest_path), None)
+            if record is not None:
+                records[dest_path] = record
+    outdated = {dest_path for dest_path in indexed if dest_path not in pages or dest_path in records}
+    dropped_ids = {indexed[dest_path]['id'] for dest_path in outdated}
+    touched = {prefix for dest_path in outdated for prefix in indexed[dest_path]['shards']}
+    for dest_path in outdated - records.keys():
+        del indexed[dest_path]
+        if os.path.isfile(record_path(records_dir, dest_path)):
+            os.remove(record_path(records_dir, dest_path))
+
+    additions = {}
+    for dest_path, record in sorted(records.items()):
+        entry = indexed.get(dest_path)
+        if entry is None:
+            entry = indexed[dest_path] = {'id': state['next_id']}
+            state['next_id'] += 1
+        entry['url'] = basepath.rstrip('/') + url(dest_path, to_dir)
+        entry['title'] = record['title']
+        entry['shards'] = sorted({term[:PREFIX_SIZE] for term in record['terms']})
+        for term, positions in record['terms'].items():
+            additions.setdefault(term[:PREFIX_SIZE], {}).setdefault(term, []).append(postings(entry['id'], positions))
+    touched |= additions.keys()
+
+    for prefix in sorted(touched):
+        shard_path = os.path.join(search_dir, f"{prefix}.json")
+        shard = {}
+        for term, term_postings in read_json(shard_path, {}).items():
+            kept = [posting for posting in term_postings if posting[0] not in dropped_ids]
+            if kept:
+                shard[term] = kept
+        for term, term_postings in additions.get(prefix, {}).items():
+            shard[term] = sorted(shard.get(term, []) + term_postings)
+        if shard:
+            write_json(shard_path, shard)
+        elif os.path.isfile(shard_path):
+            os.remove(shard_path)
+
+    write_json(os.path.join(search_dir, PAGES_NAME), {
+        'prefix_size': PREFIX_SIZE,
+        'pages': {entry['id']: [entry['url'], entry['title']] for entry in indexed.values()},
+    })
+    write_json(state_path, state)
+    print(f"Indexed {len(records)} of {len(indexed)} pages for search, {len(touched)} shards updated")
+    return sorted(touched)
+
+def remove_search_index(to_dir, records_dir=SEARCH_RECORDS_DIR):
+    """Deletes the search index of a site built without one, with the records it came from"""
+    search_dir = os.path.join(to_dir, SEARCH_DIR_NAME)
+    if os.path.isfile(os.path.join(search_dir, PAGES_NAME)):
+        shutil.rmtree(search_dir)
+        shutil.rmtree(records_dir, ignore_errors=True)
@@ -0,0 +1,165 @@
+import argparse
+import functools
+import http.server
+import os
+import sys
+import threading
+import time
+
+from build import CONTENT_PATH, PUBLIC_PATH, STATIC_PATH, TEMPLATE_PATH, BuildConfig
+from daemon import BuildDaemon, use_forkserver
+from template import TEMPLATES_DIR, file_state
+
+EVENTS_PATH = '/__charlot/events'
+RELOAD_SCRIPT = f"""<script>new EventSource("{EVENTS_PATH}").onmessage = () => location.reload();</script>"""
+
+def snapshot(paths):
+    """File states of every file under the given files and directories"""
+    states = {}
+    for path in paths:
+        if os.path.isfile(path):
+            states[path] = file_state(path)
+        for dir_path, _, filenames in os.walk(path):
+            for filename in filenames:
+                filepath = os.path.join(dir_path, filename)
+                states[filepath] = file_state(filepath)
+    return states
+
+def changed_paths(old, new):
+    """Paths added, removed or modified between two snapshots"""
+    return {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+
+def inject_reload_script(html):
+    idx = html.rfind('</body>')
+    if idx == -1:
+        return html + RELOAD_SCRIPT
+    return html[:idx] + RELOAD_SCRIPT + html[idx:]
+
+class Reloader:
+    """Counts rebuilds and wakes the browsers waiting for the next one"""
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+class DevRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves docs/ under the basepath, with a live reload script added to every page"""
+    def __init__(self, *args, reloader, basepath, **kwargs):
+        self.reloader = reloader
+        self.basepath = basepath
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def translate_path(self, path):
+        if path.startswith(self.basepath):
+            path = '/' + path[len(self.basepath):]
+        return super().translate_path(path)
+
+    def do_GET(self):
+        if self.path == EVENTS_PATH:
+            return self.send_events()
+        path = self.translate_path(self.path.split('?', 1)[0])
+        if os.path.isdir(path):
+            path = os.path.join(path, 'index.html')
+        if path.endswith('.html') and os.path.isfile(path):
+            return self.send_page(path)
+        return super().do_GET()
+
+    def send_page(self, path):
+        with open(path, 'r') as page_file:
+            body = inject_reload_script(page_file.read()).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        version = self.reloader.version
+        try:
+            while True:
+                new_version = self.reloader.wait(version, timeout=15)
+                # A comment line every few seconds lets the server notice closed connections
+                self.wfile.write(b'data: reload\n\n' if new_version != version else b': ping\n\n')
+                self.wfile.flush()
+                version = new_version
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+def rebuild(builder, config):
+    """Brings docs/ up to date with a build as config says, through the BuildDaemon builder that
+    keeps the manifest and metadata index warm. Static files and pages that did not change are
+    skipped."""
+    return builder.build(config)
+
+def watch(builder, config, reloader, interval=0.1):
+    """Polls the sources and rebuilds on every change. Build errors are reported and the
+    watch goes on, so a half-written page does not stop the server."""
+    watched = [CONTENT_PATH, STATIC_PATH, TEMPLATES_DIR, TEMPLATE_PATH]
+    states = snapshot(watched)
+    while True:
+        time.sleep(interval)
+        new_states = snapshot(watched)
+        changed = changed_paths(states, new_states)
+        states = new_states
+        if not changed:
+            continue
+        start = time.perf_counter()
+        try:
+            rebuild(builder, config)
+        except Exception as e:
+            print(f"Error: {e}")
+            continue
+        print(f"Rebuilt in {(time.perf_counter() - start) * 1e3:.0f} ms after changes to {', '.join(sorted(changed))}")
+        reloader.notify()
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Serve docs/ and rebuild it whenever content/, static/ or the templates change.")
+    parser.add_argument('basepath', nargs='?', default='/', help="URL path the site is served from (default: /)")
+    parser.add_argument('-p', '--port', type=int, default=8888, help="port to serve on (default: 8888)")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="number of processes rendering pages in parallel, 0 for one per CPU (default: 1)")
+    parser.add_argument('--fingerprint', action='store_true', help="fingerprint assets, as main.py --fingerprint")
+    parser.add_argument('--minify', action='store_true', help="minify pages, as main.py --minify")
+    parser.add_argument('--search', action='store_true', help="write the search index, as main.py --search")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    use_forkserver()
+    config = BuildConfig(args.basepath, args.jobs, fingerprint=args.fingerprint, minify=args.minify, search=args.search)
+    builder = BuildDaemon()
+    try:
+        rebuild(builder, config)
+    except Exception as e:
+        print(f"Error: {e}")
+
+    reloader = Reloader()
+    threading.Thread(target=watch, args=(builder, config, reloader), daemon=True).start()
+    handler = functools.partial(DevRequestHandler, directory=PUBLIC_PATH, reloader=reloader, basepath=args.basepath)
+    with http.server.ThreadingHTTPServer(('localhost', args.port), handler) as server:
+        print(f"Serving {PUBLIC_PATH}/ at http://localhost:{args.port}{args.basepath}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+from datetime import datetime, timezone
+import os
+from urllib.parse import urlsplit
+from xml.sax.saxutils import escape
+
+from fingerprint import url
+from frontmatter import MetadataIndex
+from output import OutputFile
+
+SITEMAP_NAME = 'sitemap.xml'
+# The most URLs a sitemap may list. Past it the URLs are split among numbered sitemaps
+# listed by a sitemap index.
+MAX_SITEMAP_URLS = 50000
+SITEMAP_XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+FEED_DIR = 'blog'
+FEED_NAME = 'atom.xml'
+FEED_ENTRIES = 20
+ATTRIBUTE_ENTITIES = {'"': '&quot;'}
+
+def page_url(dest_path, to_dir, site_url, basepath='/'):
+    """Absolute URL of a page, directory pages ending in their directory"""
+    path = url(dest_path, to_dir)
+    if path.endswith('/index.html'):
+        path = path[:-len('index.html')]
+    return site_url.rstrip('/') + basepath.rstrip('/') + path
+
+def lastmod(from_path):
+    """W3C datetime of the last change to a page source"""
+    mtime = os.stat(from_path).st_mtime
+    return datetime.fromtimestamp(mtime, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def write_urlset(path, urls):
+    """Streams the (loc, lastmod) pairs into a sitemap, one <url> at a time"""
+    with OutputFile(path, 'utf-8') as sitemap_file:
+        sitemap_file.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_XMLNS}">\n')
+        for loc, modified in urls:
+            sitemap_file.write(f'<url><loc>{escape(loc)}</loc><lastmod>{modified}</lastmod></url>\n')
+        sitemap_file.write('</urlset>\n')
+
+def write_sitemap(pages, to_dir, site_url, basepath='/', max_urls=MAX_SITEMAP_URLS, listings=()):
+    """Writes to_dir/sitemap.xml for the pages of the manifest, with lastmod taken from the
+    page sources, and the listing pages given, with lastmod taken from the page itself, as
+    it is only written when it changes. Past max_urls it becomes the index of sitemap-1.xml,
+    sitemap-2.xml...
+
+    Entries are written to disk as they are made, so memory does not grow with the site.
+    Returns the sitemap files written.
+    """
+    modified_paths = {dest_path: dest_path for dest_path in listings}
+    modified_paths.update((dest_path, entry['source']) for dest_path, entry in pages.items())
+    dest_paths = sorted(modified_paths)
+    urls = ((page_url(dest_path, to_dir, site_url, basepath), lastmod(modified_paths[dest_path]))
+            for dest_path in dest_paths)
+    sitemap_path = os.path.join(to_dir, SITEMAP_NAME)
+    written = []
+    if len(dest_paths) <= max_urls:
+        write_urlset(sitemap_path, urls)
+        written.append(sitemap_path)
+    else:
+        for start in range(0, len(dest_paths), max_urls):
+            part_path = os.path.join(to_dir, f"sitemap-{start // max_urls + 1}.xml")
+            write_urlset(part_path, (next(urls) for _ in range(min(max_urls, len(dest_paths) - start))))
+            written.append(part_path)
+        with OutputFile(sitemap_path, 'utf-8') as index_file:
+            index_file.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_XMLNS}">\n')
+            for part_path in written:
+                loc = page_url(part_path, to_dir, site_url, basepath)
+                index_file.write(f'<sitemap><loc>{escape(loc)}</loc><lastmod>{lastmod(part_path)}</lastmod></sitemap>\n')
+            index_file.write('</sitemapindex>\n')
+        written.append(sitemap_path)
+
+    # Parts left by a bigger site
+    part = len(written)
+    while os.path.isfile(os.path.join(to_dir, f"sitemap-{part}.xml")):
+        os.remove(os.path.join(to_dir, f"sitemap-{part}.xml"))
+        part += 1
+    print(f"Wrote a sitemap of {len(dest_paths)} pages in {len(written)} files")
+    return written
+
+def write_feed(pages, content_dir, to_dir, site_url, basepath='/', feed_dir=FEED_DIR, entries=FEED_ENTRIES,
+               metadata=None):
+    """Writes an Atom feed of the latest pages under content_dir/feed_dir to
+    to_dir/feed_dir/atom.xml, streaming one entry at a time. Titles and publication dates
+    come from the metadata index; pages without a date are dated by their last change.
+    Returns its path, or None when there is nothing to feed."""
+    metadata = metadata if metadata is not None else MetadataIndex(None)
+    posts_dir = os.path.join(content_dir, feed_dir) + os.sep
+    posts = []
+    for dest_path, entry in pages.items():
+        if entry['source'].startswith(posts_dir):
+            page_metadata = metadata.get(entry['source'])
+            updated = lastmod(entry['source'])
+            published = f"{page_metadata['date']}T00:00:00Z" if page_metadata['date'] else None
+            posts.append((published or updated, updated, dest_path, page_metadata['title']))
+    feed_path = os.path.join(to_dir, feed_dir, FEED_NAME)
+    if not posts:
+        if os.path.isfile(feed_path):
+            os.remove(feed_path)
+        return None
+    posts = sorted(posts, reverse=True)[:entries]
+    feed_url = page_url(feed_path, to_dir, site_url, basepath)
+    os.makedirs(os.path.dirname(feed_path), exist_ok=True)
+    with OutputFile(feed_path, 'utf-8') as feed_file:
+        feed_file.write('<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n')
+        feed_file.write(f'<title>{escape(feed_dir)}</title>\n<id>{escape(feed_url)}</id>\n'
+                        f'<link rel="self" href="{escape(feed_url, ATTRIBUTE_ENTITIES)}"/>\n<updated>{max(updated for _, updated, _, _ in posts)}</updated>\n'
+                        f'<author><name>{escape(urlsplit(site_url).netloc or site_url)}</name></author>\n')
+        for published, updated, dest_path, title in posts:
+            link = escape(page_url(dest_path, to_dir, site_url, basepath), ATTRIBUTE_ENTITIES)
+            feed_file.write(f'<entry><title>{escape(title or "")}</title><link href="{link}"/>'
+                            f'<id>{link}</id><published>{published}</published><updated>{updated}</updated></entry>\n')
+        feed_file.write('</feed>\n')
+    print(f"Wrote a feed of {len(posts)} posts to {feed_path}")
+    return feed_path
+
+def remove_sitemap(to_dir, feed_dir=FEED_DIR, keep=()):
+    """Deletes the sitemap and feed of a site built without a site URL, except the paths in
+    keep, such as the static files of the same names"""
+    paths = [os.path.join(to_dir, SITEMAP_NAME), os.path.join(to_dir, feed_dir, FEED_NAME)]
+    part = 1
+    while os.path.isfile(os.path.join(to_dir, f"sitemap-{part}.xml")):
+        paths.append(os.path.join(to_dir, f"sitemap-{part}.xml"))
+        part += 1
+    for path in paths:
+        if path not in keep and os.path.isfile(path):
+            print(f"Deleting {path}")
+            os.remove(path)
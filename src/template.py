@@ -0,0 +1,197 @@
+import json
+import os
+import re
+
+import manifest as mf
+from minify import minify_segments
+
+TEMPLATES_DIR = 'templates'
+PARTIALS_DIR = os.path.join(TEMPLATES_DIR, 'partials')
+PLACEHOLDER_REGEX = re.compile(r"\{\{\s*(>?)\s*([\w\-/]+)\s*\}\}")
+URL_ATTRIBUTES = ('href="', 'src="')
+ROOT_URL_PREFIXES = tuple(f'{attribute}/' for attribute in URL_ATTRIBUTES)
+MAX_URL_PREFIX_SPLIT = max(map(len, ROOT_URL_PREFIXES)) - 1
+ROOT_URL_REGEX = re.compile(r'((?:href|src)=")(/[^"]*)(?=")')
+
+def rewrite_urls(html, basepath, assets=None):
+    """Points root-relative href and src attributes at the fingerprinted assets, if any, and
+    prefixes them with the basepath"""
+    if assets:
+        html = ROOT_URL_REGEX.sub(lambda match: match[1] + assets.get(match[2], match[2]), html)
+    if basepath == '/':
+        return html
+    for attribute in URL_ATTRIBUTES:
+        html = html.replace(f'{attribute}/', f'{attribute}{basepath}')
+    return html
+
+class UrlRewriter:
+    """Text stream wrapper applying rewrite_urls to everything written through it.
+
+    The end of a chunk that could be the start of an attribute split across writes is held
+    back until the next write or close. With assets, so is an attribute whose value is not
+    closed yet.
+    """
+    def __init__(self, stream, basepath, assets=None):
+        self.stream = stream
+        self.basepath = basepath
+        self.assets = assets
+        self._pending = ''
+
+    def write(self, chunk):
+        data = self._pending + chunk
+        cut = len(data)
+        for size in range(min(len(data), MAX_URL_PREFIX_SPLIT), 0, -1):
+            if any(prefix.startswith(data[-size:]) for prefix in ROOT_URL_PREFIXES):
+                cut -= size
+                break
+        if self.assets:
+            start = max(data.rfind(prefix) for prefix in ROOT_URL_PREFIXES)
+            if start != -1 and '"' not in data[start + MAX_URL_PREFIX_SPLIT:]:
+                cut = min(cut, start)
+        self._pending = data[cut:]
+        self.stream.write(rewrite_urls(data[:cut], self.basepath, self.assets))
+
+    def writelines(self, chunks):
+        for chunk in chunks:
+            self.write(chunk)
+
+    def close(self):
+        self.stream.write(rewrite_urls(self._pending, self.basepath, self.assets))
+        self._pending = ''
+
+class Template:
+    """A template compiled into literal segments and named slots.
+
+    `segments` alternates literals and slot names: literals at even indexes, slots at odd
+    ones. Partials are inlined at compile time, so rendering is a single join.
+    """
+    def __init__(self, path, segments, dependencies):
+        self.path = path
+        self.segments = segments
+        self.dependencies = dependencies
+        # Hashed as a list, so that a slot and a literal of the same text differ
+        self.digest = mf.hash_bytes(json.dumps(segments).encode())
+        # A slot right after `href="` or `src="` holds a URL, rewritten like the literal ones
+        self._url_slots = [segments[idx - 1].endswith(URL_ATTRIBUTES) for idx in range(1, len(segments), 2)]
+        # Root-relative URLs of the literals, looked up in the assets once per process only
+        self.urls = sorted({match[2] for segment in segments[::2] for match in ROOT_URL_REGEX.finditer(segment)})
+        self._literals = {}
+
+    def __repr__(self):
+        return f"Template({self.path}, {self.segments[1::2]})"
+
+    def is_fresh(self):
+        return all(file_state(path) == state for path, state in self.dependencies.items())
+
+    def literals(self, basepath, assets=None, minify=False):
+        """Segments with the literals rewritten for the basepath and assets, then minified if
+        asked, computed once per combination"""
+        key = (basepath, assets.digest if assets else None, minify)
+        if key not in self._literals:
+            if minify:
+                self._literals[key] = minify_segments(self.literals(basepath, assets))
+            else:
+                self._literals[key] = [
+                    rewrite_urls(segment, basepath, assets) if idx % 2 == 0 else segment
+                    for idx, segment in enumerate(self.segments)
+                ]
+        return self._literals[key]
+
+    def _minified_literals(self, basepath, assets, minifier):
+        parts = self.literals(basepath, assets, minifier is not None)
+        if minifier:
+            minifier.saved += sum(map(len, self.literals(basepath, assets)[::2])) - sum(map(len, parts[::2]))
+        return parts
+
+    def _slot_value(self, value, url_slot, basepath, assets=None, minifier=None):
+        if hasattr(value, 'iter_html'):
+            value = ''.join(value.iter_html(minifier))
+        value = rewrite_urls(str(value), basepath, assets)
+        if url_slot and value.startswith('/'):
+            value = basepath + (assets.get(value, value) if assets else value)[1:]
+        return value
+
+    def render(self, values, basepath='/', assets=None, minifier=None):
+        parts = self._minified_literals(basepath, assets, minifier).copy()
+        for idx, url_slot in zip(range(1, len(parts), 2), self._url_slots):
+            parts[idx] = self._slot_value(values.get(parts[idx], ''), url_slot, basepath, assets, minifier)
+        return ''.join(parts)
+
+    def write(self, stream, values, basepath='/', assets=None, minifier=None):
+        """Renders into a text stream. HTMLNode values are serialized straight into it, and
+        minified on the way with a minify.Minifier."""
+        parts = self._minified_literals(basepath, assets, minifier)
+        stream.write(parts[0])
+        for idx, url_slot in zip(range(1, len(parts), 2), self._url_slots):
+            value = values.get(parts[idx], '')
+            if hasattr(value, 'write_html') and not url_slot:
+                if basepath == '/' and not assets:
+                    value.write_html(stream, minifier)
+                else:
+                    rewriter = UrlRewriter(stream, basepath, assets)
+                    value.write_html(rewriter, minifier)
+                    rewriter.close()
+            else:
+                stream.write(self._slot_value(value, url_slot, basepath, assets, minifier))
+            stream.write(parts[idx + 1])
+
+def file_state(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _read(path):
+    with open(path, 'r') as template_file:
+        return template_file.read()
+
+def compile_template(path, partials_dir=PARTIALS_DIR):
+    dependencies = {}
+    segments = ['']
+
+    def compile_source(path, including):
+        if path in including:
+            raise ValueError(f"Partial {path} includes itself through {' -> '.join(including)}.")
+        dependencies[path] = file_state(path)
+        source = _read(path)
+        position = 0
+        for match in PLACEHOLDER_REGEX.finditer(source):
+            segments[-1] += source[position:match.start()]
+            is_partial, name = match.groups()
+            if is_partial:
+                partial_path = os.path.join(partials_dir, f"{name}.html")
+                if not os.path.isfile(partial_path):
+                    raise ValueError(f"Partial {name} not found in {partials_dir}.")
+                compile_source(partial_path, including + [path])
+            else:
+                segments.extend([name, ''])
+            position = match.end()
+        segments[-1] += source[position:]
+
+    compile_source(path, [])
+    return Template(path, segments, dependencies)
+
+# Compiled templates by (path, partials_dir), recompiled when any file they were built from changes
+_template_cache = {}
+
+def load_template(path, partials_dir=PARTIALS_DIR):
+    key = (path, partials_dir)
+    template = _template_cache.get(key)
+    if template is None or not template.is_fresh():
+        template = _template_cache[key] = compile_template(path, partials_dir)
+    return template
+
+def select_template(from_path, dir_path_content, default_template_path, templates_dir=TEMPLATES_DIR):
+    """Picks the template of the nearest content directory that has one.
+
+    A page under content/blog/2024/ uses templates/blog/2024.html if it exists, otherwise
+    templates/blog.html, otherwise the default template.
+    """
+    rel_dir = os.path.relpath(os.path.dirname(from_path), dir_path_content)
+    while rel_dir and rel_dir != '.':
+        template_path = os.path.join(templates_dir, f"{rel_dir}.html")
+        if os.path.isfile(template_path):
+            return template_path
+        rel_dir = os.path.dirname(rel_dir)
+    return default_template_path
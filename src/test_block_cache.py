@@ -0,0 +1,85 @@
+import unittest
+import tempfile
+import os
+from unittest import mock
+
+import block_cache
+from block_cache import BlockCache, block_key, cached_html_tree
+from minify import Minifier
+import textnode as tn
+
+MARKDOWN = """# Title
+
+Some **bold** and `code` with [a link](/about)
+
+```
+keep   this
+  spacing
+```
+
+- one
+- two"""
+
+class TestBlockCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'blocks.sqlite')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cached_tree_matches_parser(self):
+        blocks = tn.markdown_to_blocks(MARKDOWN)
+        expected = tn.markdown_to_html_node(MARKDOWN)
+        cache = BlockCache(self.path)
+        self.assertEqual(cached_html_tree(blocks, cache).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (0, len(blocks)))
+        cache.close()
+
+        # Every block comes from the cache in the next build
+        cache = BlockCache(self.path)
+        self.assertEqual(cached_html_tree(blocks, cache).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (len(blocks), 0))
+
+        # Only the edited block is rendered again
+        edited = tn.markdown_to_blocks(MARKDOWN.replace('- two', '- three'))
+        self.assertEqual(cached_html_tree(edited, cache).to_html(), tn.markdown_to_html_node(MARKDOWN.replace('- two', '- three')))
+        self.assertEqual(cache.misses, 1)
+        cache.close()
+
+    def test_minified_fragments(self):
+        blocks = tn.markdown_to_blocks(MARKDOWN)
+        minifier = Minifier()
+        expected = ''.join(tn.blocks_to_html_tree(blocks).iter_html(minifier))
+        cache = BlockCache(self.path)
+        for _ in range(2):
+            cached_minifier = Minifier()
+            self.assertEqual(cached_html_tree(blocks, cache, cached_minifier).to_html(), expected)
+            self.assertEqual(cached_minifier.saved, minifier.saved)
+        # Plain fragments are kept apart from the minified ones
+        self.assertEqual(cached_html_tree(blocks, cache).to_html(), tn.markdown_to_html_node(MARKDOWN))
+        cache.close()
+
+    def test_parser_change_clears_cache(self):
+        cache = BlockCache(self.path)
+        cache.put(block_key('text'), '<p>text</p>')
+        cache.close()
+        self.assertIsNotNone(BlockCache(self.path).get(block_key('text')))
+        with mock.patch.object(block_cache, 'parser_version', return_value='other'):
+            self.assertIsNone(BlockCache(self.path).get(block_key('text')))
+
+    def test_evicts_least_recently_used(self):
+        cache = BlockCache(self.path, max_bytes=10)
+        for text in ('a', 'b', 'c'):
+            cache.put(block_key(text), text * 10)
+            cache.flush()
+        cache.get(block_key('a'))
+        self.assertEqual(cache.evict(), 2)
+        self.assertIsNotNone(cache.get(block_key('a')))
+        self.assertIsNone(cache.get(block_key('b')))
+        self.assertIsNone(cache.get(block_key('c')))
+        cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+
+from build import BuildConfig, build
+from generate_page import BuildError
+from output import mark_deployed
+from testing import SiteTestCase
+
+class TestBuild(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write('content/index.md', '# Home\n\nWelcome to [Tom](/blog/tom)')
+        self.write('content/blog/tom.md', '---\ndate: 2024-05-01\n---\n# Tom\n\nOld Tom Bombadil')
+        self.write('static/index.css', 'body {}')
+        self.write('template.html', '<title>{{ Title }}</title>{{ Content }}')
+
+    def test_build(self):
+        result = build(BuildConfig(check=True))
+        self.assertListEqual(sorted(result.pages), ['docs/blog/tom.html', 'docs/index.html'])
+        self.assertListEqual(result.listings, ['docs/blog/index.html'])
+        self.assertEqual(result.bytes_written, sum(os.path.getsize(path) for path in result.pages + result.listings))
+        self.assertListEqual(list(result.timings), ['static', 'pages', 'listings', 'search', 'sitemap', 'block cache', 'precompress', 'deploy manifest', 'check'])
+        self.assertListEqual(result.broken_links, [])
+        self.assertTrue(os.path.isfile('docs/index.css'))
+        self.assertListEqual(sorted(result.deploy['added']), ['blog/index.html', 'blog/tom.html', 'index.css', 'index.html'])
+
+        # Nothing changed, and a broken link is reported
+        mark_deployed()
+        self.assertListEqual(build(BuildConfig()).pages, [])
+        self.write('content/index.md', '# Home\n\nWelcome to [Tom](/blog/bombadil)')
+        report = build(BuildConfig(check=True)).report()
+        self.assertListEqual(report['pages'], ['docs/index.html'])
+        self.assertListEqual(list(report['deploy']['changed']), ['index.html'])
+        self.assertListEqual(report['broken_links'], [['content/index.md', 3, '/blog/bombadil']])
+
+    def test_bytes_written(self):
+        build(BuildConfig())
+        # Rendered again to the same page, which is not written
+        self.write('content/index.md', '# Home\n\nWelcome to [Tom](/blog/tom)\n')
+        result = build(BuildConfig())
+        self.assertListEqual(result.pages, ['docs/index.html'])
+        self.assertEqual(result.bytes_written, 0)
+
+    def test_profiled_build(self):
+        build(BuildConfig())
+        self.write('static/b.css', 'b {}')
+        build(BuildConfig())
+        os.remove('content/blog/tom.md')
+        os.remove('static/b.css')
+        result = build(BuildConfig(profile='.charlot/profile.json'))
+        # Every page is rendered again, and what was removed is still removed
+        self.assertListEqual(result.pages, ['docs/index.html'])
+        build(BuildConfig())
+        for path in ('docs/b.css', 'docs/blog/tom.html', 'docs/blog/index.html'):
+            self.assertFalse(os.path.exists(path), path)
+
+    def test_site_url_off(self):
+        result = build(BuildConfig(site_url='https://x.dev'))
+        # The blog listing page is in the sitemap
+        self.assertListEqual(result.listings, ['docs/blog/index.html'])
+        self.assertIn('<loc>https://x.dev/blog/</loc>', self.read('docs/sitemap.xml'))
+        self.assertTrue(os.path.isfile('docs/blog/atom.xml'))
+        build(BuildConfig())
+        self.assertFalse(os.path.exists('docs/sitemap.xml'))
+        self.assertFalse(os.path.exists('docs/blog/atom.xml'))
+
+    def test_precompress_off(self):
+        self.write('content/index.md', '# Home\n\n' + 'version one ' * 100)
+        build(BuildConfig(precompress=True))
+        self.assertTrue(os.path.isfile('docs/index.html.gz'))
+        self.write('content/index.md', '# Home\n\nversion two')
+        build(BuildConfig())
+        self.assertFalse(os.path.exists('docs/index.html.gz'))
+
+    def test_failed_pages(self):
+        self.write('content/broken.md', 'No title here')
+        with self.assertRaises(BuildError):
+            build(BuildConfig())
+        # What was built is still recorded
+        self.assertTrue(os.path.isfile('.charlot/manifest.json'))
+        self.assertTrue(os.path.isfile('docs/index.html'))
+
+    def test_failed_pages_profiled(self):
+        self.write('content/broken.md', 'No title here')
+        with self.assertRaises(BuildError) as raised:
+            build(BuildConfig(profile='.charlot/profile.json'))
+        self.assertListEqual([from_path for from_path, _ in raised.exception.errors], ['content/broken.md'])
+        self.assertTrue(os.path.isfile('docs/index.html'))
+        self.assertTrue(os.path.isfile('docs/blog/tom.html'))
+
+
+if __name__ == '__main__':
+    unittest.main()
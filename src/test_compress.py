@@ -0,0 +1,40 @@
+import unittest
+import gzip
+import os
+
+from compress import precompress
+from manifest import new_manifest
+from testing import SiteTestCase
+
+class TestCompress(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write('docs/index.html', '<p>Old Tom Bombadil</p>' * 100)
+        self.write('docs/tiny.css', 'a{}')
+        self.write('docs/images/tom.png', 'png' * 100)
+
+    def test_precompress(self):
+        manifest = new_manifest()
+        self.assertListEqual(sorted(precompress('docs', manifest)), ['docs/index.html', 'docs/tiny.css'])
+        with gzip.open('docs/index.html.gz', 'rt') as gz_file:
+            self.assertEqual(gz_file.read(), '<p>Old Tom Bombadil</p>' * 100)
+        # Not worth it for tiny files, not attempted for images
+        self.assertFalse(os.path.exists('docs/tiny.css.gz'))
+        self.assertFalse(os.path.exists('docs/images/tom.png.gz'))
+
+        # Only changed files are compressed again
+        self.assertListEqual(precompress('docs', manifest), [])
+        self.write('docs/index.html', '<p>Goldberry</p>' * 100)
+        self.assertListEqual(precompress('docs', manifest), ['docs/index.html'])
+        with gzip.open('docs/index.html.gz', 'rt') as gz_file:
+            self.assertEqual(gz_file.read(), '<p>Goldberry</p>' * 100)
+
+        # Siblings of removed files are removed
+        os.remove('docs/index.html')
+        precompress('docs', manifest)
+        self.assertFalse(os.path.exists('docs/index.html.gz'))
+
+
+if __name__ == '__main__':
+    unittest.main()
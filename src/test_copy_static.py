@@ -1,8 +1,11 @@
 import unittest
 import subprocess
 import os
+from unittest import mock
 
-from copy_static import copy_static
+from copy_static import copy_static, sync_static
+from manifest import new_manifest
+from testing import SiteTestCase
 
 class TestCopyStatic(unittest.TestCase):
 
@@ -37,6 +40,61 @@ class TestCopyStatic(unittest.TestCase):
         copy_static(from_dir, to_dir)
         self.assertEqualFilenames(from_dir, to_dir)
 
+class TestSyncStatic(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write('static/index.css', 'body {}')
+        self.write('static/images/tom.png', 'png')
+
+    def test_sync(self):
+        manifest = new_manifest()
+        self.write('docs/index.html', 'page')
+        self.assertEqual(len(sync_static('static', 'docs', manifest)), 2)
+        with open('docs/images/tom.png') as file:
+            self.assertEqual(file.read(), 'png')
+
+        # Nothing changed
+        self.assertListEqual(sync_static('static', 'docs', manifest), [])
+
+        # Only the edited file is copied again
+        self.write('static/index.css', 'body { margin: 0 }')
+        self.assertListEqual(sync_static('static', 'docs', manifest), ['docs/index.css'])
+
+        # Removed sources are deleted, files the sync did not write are kept
+        os.remove('static/images/tom.png')
+        sync_static('static', 'docs', manifest)
+        self.assertFalse(os.path.exists('docs/images'))
+        self.assertTrue(os.path.isfile('docs/index.html'))
+        self.assertListEqual(list(manifest['static']), ['docs/index.css'])
+
+    def test_sync_hash(self):
+        manifest = new_manifest()
+        sync_static('static', 'docs', manifest)
+        # A touched but identical file is only copied when contents are not compared
+        os.utime('static/index.css', ns=(0, 0))
+        self.assertListEqual(sync_static('static', 'docs', manifest, use_hash=True), [])
+        os.utime('static/index.css', ns=(1, 1))
+        self.assertListEqual(sync_static('static', 'docs', manifest), ['docs/index.css'])
+
+    def test_sync_without_copy_file_range(self):
+        with mock.patch('os.copy_file_range', side_effect=OSError("cross-device")):
+            sync_static('static', 'docs', new_manifest())
+        with open('docs/images/tom.png') as file:
+            self.assertEqual(file.read(), 'png')
+
+    def test_sync_short_copy_file_range(self):
+        with mock.patch('os.copy_file_range', return_value=0):
+            sync_static('static', 'docs', new_manifest())
+        with open('docs/images/tom.png') as file:
+            self.assertEqual(file.read(), 'png')
+
+    def test_sync_hardlink(self):
+        manifest = new_manifest()
+        sync_static('static', 'docs', manifest, hardlink=True)
+        self.assertTrue(os.path.samefile('static/index.css', 'docs/index.css'))
+        self.assertListEqual(sync_static('static', 'docs', manifest, hardlink=True), [])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,29 @@
+import unittest
+
+from corpus import SHAPES, generate_corpus
+from benchmark import compare_results
+from textnode import extract_title, markdown_to_html_node
+
+class TestCorpus(unittest.TestCase):
+
+    def test_deterministic(self):
+        for shape in SHAPES:
+            self.assertEqual(generate_corpus(shape, seed=1), generate_corpus(shape, seed=1))
+        self.assertNotEqual(generate_corpus('small-posts', seed=1), generate_corpus('small-posts', seed=2))
+        self.assertEqual(len(generate_corpus('small-posts', scale=2)), 2 * len(generate_corpus('small-posts')))
+
+    def test_pages_build(self):
+        for shape in SHAPES:
+            with self.subTest(shape=shape):
+                markdown = next(iter(generate_corpus(shape).values()))
+                extract_title(markdown)
+                markdown_to_html_node(markdown)
+
+    def test_compare_results(self):
+        baseline = {'results': {'huge-page': {'build': 1.0, 'to_html': 1.0}}}
+        current = {'results': {'huge-page': {'build': 1.05, 'to_html': 1.5}, 'static': {'copy_static': 1.0}}}
+        self.assertListEqual(compare_results(baseline, current), [('huge-page', 'to_html', 1.0, 1.5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
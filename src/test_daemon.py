@@ -0,0 +1,67 @@
+import unittest
+import os
+import stat
+import threading
+
+from build import BuildConfig, build
+from daemon import BuildServer, request_build
+from testing import SiteTestCase
+
+SOCKET_PATH = 'build.sock'
+
+class TestDaemon(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write('content/index.md', '# Home\n\nWelcome')
+        self.write('static/index.css', 'body {}')
+        self.write('template.html', '<title>{{ Title }}</title>{{ Content }}')
+        self.server = BuildServer(SOCKET_PATH)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        super().tearDown()
+
+    def test_request_build(self):
+        response = request_build({'minify': True}, SOCKET_PATH)
+        self.assertTrue(response['ok'])
+        self.assertListEqual(response['result']['pages'], ['docs/index.html'])
+        self.assertListEqual(request_build(None, SOCKET_PATH)['result']['pages'], ['docs/index.html'])
+        self.assertListEqual(request_build(None, SOCKET_PATH)['result']['pages'], [])
+
+        # The daemon picks up the manifest of a build it did not run
+        self.write('content/index.md', '# Home\n\nWelcome back')
+        build(BuildConfig())
+        self.assertListEqual(request_build(None, SOCKET_PATH)['result']['pages'], [])
+
+    def test_failed_requests(self):
+        response = request_build({'minfy': True}, SOCKET_PATH)
+        self.assertFalse(response['ok'])
+        self.assertIn("unexpected keyword argument 'minfy'", response['error'])
+
+        self.write('content/broken.md', 'No title here')
+        response = request_build(None, SOCKET_PATH)
+        self.assertFalse(response['ok'])
+        self.assertListEqual([from_path for from_path, _ in response['errors']], ['content/broken.md'])
+
+    def test_path_options_rejected(self):
+        response = request_build({'public_path': '/tmp/elsewhere'}, SOCKET_PATH)
+        self.assertFalse(response['ok'])
+        self.assertIn('public_path', response['error'])
+        self.assertFalse(os.path.exists('docs'))
+
+    def test_socket_permissions(self):
+        self.assertEqual(stat.S_IMODE(os.stat(SOCKET_PATH).st_mode), 0o600)
+
+    def test_socket_removed(self):
+        self.assertTrue(os.path.exists(SOCKET_PATH))
+        self.server.server_close()
+        self.assertFalse(os.path.exists(SOCKET_PATH))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import io
+import os
+
+from copy_static import sync_static
+from fingerprint import asset_map, fingerprinted_path
+from generate_page import generate_pages_recursive
+from manifest import hash_file, new_manifest
+from template import UrlRewriter, rewrite_urls
+from testing import SiteTestCase
+
+class TestFingerprint(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write('static/index.css', 'body {}')
+        self.write('static/images/tom.png', 'png')
+        self.write('static/robots.txt', 'User-agent: *')
+        self.write('content/index.md', '# Home\n\n![Tom](/images/tom.png) [unknown](/nope.png)')
+        self.write('template.html', '<link href="/index.css">{{ Content }}')
+
+    def test_fingerprinted_path(self):
+        self.assertEqual(fingerprinted_path('docs/index.css', 'abcdef0123456789'), 'docs/index.abcdef0123.css')
+
+    def test_sync_fingerprint(self):
+        manifest = new_manifest()
+        sync_static('static', 'docs', manifest, fingerprint=True)
+        css_path = fingerprinted_path('docs/index.css', hash_file('static/index.css'))
+        png_path = fingerprinted_path('docs/images/tom.png', hash_file('static/images/tom.png'))
+        assets = asset_map(manifest, 'static', 'docs')
+        self.assertDictEqual(assets, {'/index.css': css_path[4:], '/images/tom.png': png_path[4:]})
+        # Original names stay for references the build does not rewrite
+        for path in (css_path, png_path, 'docs/index.css', 'docs/robots.txt'):
+            self.assertTrue(os.path.isfile(path))
+
+        # A changed asset gets a new name and the old one is deleted
+        self.write('static/index.css', 'body { margin: 0 }')
+        sync_static('static', 'docs', manifest, fingerprint=True)
+        self.assertFalse(os.path.exists(css_path))
+        new_assets = asset_map(manifest, 'static', 'docs')
+        self.assertNotEqual(new_assets.digest, assets.digest)
+        self.assertTrue(os.path.isfile('docs' + new_assets['/index.css']))
+
+        # Turning fingerprinting off removes the hashed copies
+        sync_static('static', 'docs', manifest)
+        self.assertListEqual(sorted(manifest['static']), ['docs/images/tom.png', 'docs/index.css', 'docs/robots.txt'])
+
+    def test_pages_use_fingerprints(self):
+        manifest = new_manifest()
+        sync_static('static', 'docs', manifest, fingerprint=True)
+        assets = asset_map(manifest, 'static', 'docs')
+        generate_pages_recursive('content', 'template.html', 'docs', '/charlot/', manifest, assets=assets)
+        html = self.read('docs/index.html')
+        self.assertIn(f'href="/charlot{assets["/index.css"]}"', html)
+        self.assertIn(f'src="/charlot{assets["/images/tom.png"]}"', html)
+        self.assertIn('href="/charlot/nope.png"', html)
+
+        # Pages are rendered again when an asset changes
+        self.write('static/index.css', 'body { margin: 0 }')
+        sync_static('static', 'docs', manifest, fingerprint=True)
+        new_assets = asset_map(manifest, 'static', 'docs')
+        self.assertListEqual(generate_pages_recursive('content', 'template.html', 'docs', '/charlot/', manifest, assets=new_assets), ['docs/index.html'])
+        self.assertIn(new_assets['/index.css'], self.read('docs/index.html'))
+
+    def test_pages_depend_on_their_assets(self):
+        self.write('content/other.md', '# Other\n\nNo images')
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                manifest = new_manifest()
+
+                def build():
+                    sync_static('static', 'docs', manifest, fingerprint=True)
+                    assets = asset_map(manifest, 'static', 'docs')
+                    return sorted(generate_pages_recursive('content', 'template.html', 'docs', '/', manifest, jobs,
+                                                           assets=assets))
+
+                self.assertListEqual(build(), ['docs/index.html', 'docs/other.html'])
+                self.assertListEqual(build(), [])
+                # Only the page showing the image is rendered again
+                self.write('static/images/tom.png', f'png {jobs}')
+                self.assertListEqual(build(), ['docs/index.html'])
+                # and the one linking to a file that becomes an asset
+                self.write('static/nope.png', 'png')
+                self.assertListEqual(build(), ['docs/index.html'])
+                # The template references the stylesheet, so every page does
+                self.write('static/index.css', f'body {{ margin: {jobs} }}')
+                self.assertListEqual(build(), ['docs/index.html', 'docs/other.html'])
+                os.remove('static/nope.png')
+
+    def test_url_rewriter_assets(self):
+        assets = {'/a.css': '/a.123.css'}
+        html = '<link href="/a.css"><a href="/b">b</a>'
+        expected = rewrite_urls(html, '/c/', assets)
+        self.assertEqual(expected, '<link href="/c/a.123.css"><a href="/c/b">b</a>')
+        for split in range(1, len(html)):
+            stream = io.StringIO()
+            rewriter = UrlRewriter(stream, '/c/', assets)
+            rewriter.writelines([html[:split], html[split:]])
+            rewriter.close()
+            self.assertEqual(stream.getvalue(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import os
+
+from frontmatter import MetadataIndex, read_metadata, split_front_matter
+from generate_page import BuildError, generate_pages_recursive
+from manifest import new_manifest
+from testing import SiteTestCase
+
+POST = """---
+title: "Tom: a biography"
+date: 2024-05-01
+tags: [tom, forest]
+template: templates/post.html
+---
+# Old Tom
+
+Bombadil"""
+
+class TestFrontMatter(SiteTestCase):
+
+    def test_split_front_matter(self):
+        metadata, body = split_front_matter(POST)
+        self.assertDictEqual(metadata, {
+            'title': 'Tom: a biography', 'date': '2024-05-01', 'tags': ['tom', 'forest'], 'draft': False,
+            'template': 'templates/post.html', 'summary': None,
+        })
+        self.assertEqual(body, '# Old Tom\n\nBombadil')
+
+        # A horizontal rule, or an unclosed header, is not front matter
+        for markdown in ('---\n\n# Title\n\n---\n', '---\ndraft: true\n# Title'):
+            self.assertEqual(split_front_matter(markdown)[1], markdown)
+        with self.assertRaises(ValueError):
+            split_front_matter('---\ndate: soon\n---\n# Title')
+
+    def test_read_metadata(self):
+        self.write('templates/post.html', '{{ Content }}')
+        self.write('post.md', POST)
+        self.assertEqual(read_metadata('post.md'), split_front_matter(POST)[0])
+        self.write('page.md', '---\ndraft: yes\n---\nIntro\n\n# Old Tom\nBombadil\n\n# Other')
+        self.assertEqual(read_metadata('page.md')['title'], 'Old Tom\nBombadil')
+        self.assertTrue(read_metadata('page.md')['draft'])
+        self.write('page.md', '---\ntemplate: templates/missing.html\n---\n# Old Tom')
+        with self.assertRaises(FileNotFoundError):
+            read_metadata('page.md')
+
+    def test_metadata_index(self):
+        self.write('templates/post.html', '{{ Content }}')
+        self.write('content/a.md', POST)
+        self.write('content/b.md', '# B')
+        index = MetadataIndex('.charlot/metadata.json')
+        self.assertListEqual([source for source, _ in index.query(['content/a.md', 'content/b.md'], tag='tom')],
+                             ['content/a.md'])
+        index.save()
+
+        # Saved entries are used until their source changes
+        index = MetadataIndex('.charlot/metadata.json')
+        self.assertEqual(index.get('content/b.md')['title'], 'B')
+        self.write('content/b.md', '---\ntitle: Bee\n---\n# B')
+        self.assertEqual(index.get('content/b.md')['title'], 'Bee')
+        index.prune(['content/b.md'])
+        self.assertListEqual(list(index.entries), ['content/b.md'])
+
+    def test_build(self):
+        self.write('template.html', '<title>{{ Title }}</title>{{ Content }}')
+        self.write('templates/post.html', '<h2>{{ Title }}</h2>{{ Content }}')
+        self.write('content/post.md', POST)
+        self.write('content/draft.md', '---\ndraft: true\n---\n# Draft')
+        manifest = new_manifest()
+        self.assertListEqual(generate_pages_recursive('content', 'template.html', 'docs', '/', manifest), ['docs/post.html'])
+        self.assertEqual(self.read('docs/post.html'), '<h2>Tom: a biography</h2><div><h1>Old Tom</h1><p>Bombadil</p></div>')
+
+        # Publishing a draft builds it, drafting a page removes it
+        self.write('content/draft.md', '# Draft')
+        self.write('content/post.md', POST.replace('tags', 'draft: true\ntags'))
+        self.assertListEqual(generate_pages_recursive('content', 'template.html', 'docs', '/', manifest), ['docs/draft.html'])
+        self.assertFalse(os.path.exists('docs/post.html'))
+
+    def test_build_errors(self):
+        self.write('template.html', '<title>{{ Title }}</title>{{ Content }}')
+        self.write('content/index.md', '# Home')
+        self.write('content/soon.md', '---\ndate: soon\n---\n# Soon')
+        self.write('content/post.md', '---\ntemplate: templates/post.html\n---\n# Post')
+        self.write('templates/post.html', '<h2>{{ Title }}</h2>{{ Content }}')
+        manifest = new_manifest()
+        with self.assertRaises(BuildError):
+            generate_pages_recursive('content', 'template.html', 'docs', '/', manifest)
+
+        # Every page is attempted, and the failures name their source; the last output is kept
+        self.write('content/index.md', '# Home again')
+        os.remove('templates/post.html')
+        self.write('content/post.md', '---\ntemplate: templates/post.html\n---\n# Post again')
+        with self.assertRaises(BuildError) as raised:
+            generate_pages_recursive('content', 'template.html', 'docs', '/', manifest)
+        errors = dict(raised.exception.errors)
+        self.assertCountEqual(errors, ['content/post.md', 'content/soon.md'])
+        self.assertIn("'soon'", errors['content/soon.md'])
+        self.assertEqual(self.read('docs/index.html'), '<title>Home again</title><div><h1>Home again</h1></div>')
+        self.assertTrue(os.path.isfile('docs/post.html'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import os
+from unittest import mock
+
+import generate_page
+from generate_page import BuildError, collect_pages, generate_pages_recursive
+from manifest import new_manifest
+from profiler import Profiler
+from testing import SiteTestCase
+
+TEMPLATE = '<title>{{ Title }}</title><article>{{ Content }}</article><link href="/index.css">'
+
+class TestGeneratePages(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write('content/index.md', '# Home\n\nWelcome')
+        self.write('content/blog/tom/index.md', '# Tom\n\nOld Tom Bombadil')
+        self.write('template.html', TEMPLATE)
+
+    def records(self, records_dir):
+        return sorted(self.read(os.path.join(records_dir, name)) for name in os.listdir(records_dir))
+
+    def test_collect_pages(self):
+        pages = sorted(collect_pages('content', 'docs'))
+        self.assertListEqual(pages, [
+            ('content/blog/tom/index.md', 'docs/blog/tom/index.html'),
+            ('content/index.md', 'docs/index.html'),
+        ])
+
+    def test_incremental_build(self):
+        manifest = new_manifest()
+        generated = generate_pages_recursive('content', 'template.html', 'docs', '/', manifest)
+        self.assertEqual(len(generated), 2)
+        self.assertEqual(self.read('docs/index.html'), '<title>Home</title><article><div><h1>Home</h1><p>Welcome</p></div></article><link href="/index.css">')
+
+        # Nothing changed
+        self.assertListEqual(generate_pages_recursive('content', 'template.html', 'docs', '/', manifest), [])
+
+        # Only the edited page is rendered again
+        self.write('content/index.md', '# Home\n\nWelcome back')
+        self.assertListEqual(generate_pages_recursive('content', 'template.html', 'docs', '/', manifest), ['docs/index.html'])
+
+        # A deleted output is regenerated even if its inputs did not change
+        os.remove('docs/index.html')
+        self.assertListEqual(generate_pages_recursive('content', 'template.html', 'docs', '/', manifest), ['docs/index.html'])
+
+        # Template and basepath changes invalidate every page
+        self.write('template.html', TEMPLATE + '\n')
+        self.assertEqual(len(generate_pages_recursive('content', 'template.html', 'docs', '/', manifest)), 2)
+        self.assertEqual(len(generate_pages_recursive('content', 'template.html', 'docs', '/charlot/', manifest)), 2)
+        self.assertIn('href="/charlot/index.css"', self.read('docs/index.html'))
+
+    def test_unchanged_output(self):
+        generate_pages_recursive('content', 'template.html', 'docs', '/', new_manifest())
+        os.utime('docs/index.html', ns=(0, 0))
+        # Rendered again to the same page, which is left alone
+        self.write('content/index.md', '# Home\n\nWelcome\n')
+        self.assertListEqual(generate_pages_recursive('content', 'template.html', 'docs', '/', new_manifest()),
+                             ['docs/blog/tom/index.html', 'docs/index.html'])
+        self.assertEqual(os.stat('docs/index.html').st_mtime_ns, 0)
+
+    def test_removed_source(self):
+        manifest = new_manifest()
+        generate_pages_recursive('content', 'template.html', 'docs', '/', manifest)
+        os.remove('content/blog/tom/index.md')
+        generate_pages_recursive('content', 'template.html', 'docs', '/', manifest)
+        self.assertFalse(os.path.exists('docs/blog'))
+        self.assertTrue(os.path.isfile('docs/index.html'))
+        self.assertListEqual(list(manifest['pages']), ['docs/index.html'])
+
+    def test_parallel_matches_serial(self):
+        for idx in range(8):
+            self.write(f'content/posts/post{idx}.md', f'# Post {idx}\n\nSome **bold** [link](/posts/post{idx + 1}) text')
+        serial = generate_pages_recursive('content', 'template.html', 'serial', '/charlot/')
+        parallel = generate_pages_recursive('content', 'template.html', 'parallel', '/charlot/', jobs=3)
+        self.assertEqual(len(serial), len(parallel))
+        for dest_path in serial:
+            with open(dest_path, 'rb') as serial_file, open(dest_path.replace('serial', 'parallel', 1), 'rb') as parallel_file:
+                self.assertEqual(serial_file.read(), parallel_file.read())
+
+    def test_block_cache(self):
+        for idx in range(4):
+            self.write(f'content/posts/post{idx}.md', f'# Post {idx}\n\nShared [link](/about)\n\n- item {idx}')
+        plain = generate_pages_recursive('content', 'template.html', 'plain', '/charlot/', minify=True)
+        for jobs in (1, 2):
+            cached = generate_pages_recursive('content', 'template.html', f'cached{jobs}', '/charlot/', jobs=jobs,
+                                              minify=True, block_cache='.charlot/blocks.sqlite')
+            for dest_path, cached_path in zip(plain, cached):
+                self.assertEqual(self.read(dest_path), self.read(cached_path))
+
+    def test_streamed_pages(self):
+        self.write('content/tom.md', '---\ntags: forest\n---\nOld Tom\n\n# Tom\n\n- Merry dol\n- derry dol\n\n```\ncode\n```')
+        plain = generate_pages_recursive('content', 'template.html', 'plain', '/charlot/', minify=True,
+                                         search_records='plain.search')
+        with mock.patch.object(generate_page, 'STREAM_SIZE', 0):
+            for jobs in (1, 2):
+                streamed = generate_pages_recursive('content', 'template.html', f'streamed{jobs}', '/charlot/', jobs=jobs,
+                                                    minify=True, block_cache='.charlot/blocks.sqlite',
+                                                    search_records=f'streamed{jobs}.search')
+                for dest_path, streamed_path in zip(plain, streamed):
+                    self.assertEqual(self.read(dest_path), self.read(streamed_path))
+                self.assertListEqual(self.records('plain.search'), self.records(f'streamed{jobs}.search'))
+
+    def test_parallel_errors(self):
+        self.write('content/b_broken.md', 'No title here')
+        self.write('content/a_broken.md', 'Nor here')
+        manifest = new_manifest()
+        for jobs in (1, 2): # pipelined and parallel
+            with self.subTest(jobs=jobs), self.assertRaises(BuildError) as context:
+                generate_pages_recursive('content', 'template.html', f'docs{jobs}', '/', manifest, jobs=jobs)
+            pages = collect_pages('content', f'docs{jobs}')
+            failed = [from_path for from_path, _ in context.exception.errors]
+            self.assertListEqual(failed, [from_path for from_path, _ in pages if 'broken' in from_path])
+            # Good pages are still generated and recorded, failed ones will be retried
+            self.assertTrue(os.path.isfile(f'docs{jobs}/index.html'))
+            self.assertListEqual(sorted(manifest['pages']), [f'docs{jobs}/blog/tom/index.html', f'docs{jobs}/index.html'])
+
+    def test_profiled_build(self):
+        generate_pages_recursive('content', 'template.html', 'plain', '/charlot/')
+        profiler = Profiler()
+        profiler.start()
+        generated = generate_pages_recursive('content', 'template.html', 'profiled', '/charlot/', profiler=profiler)
+        profiler.stop()
+        for dest_path in generated:
+            self.assertEqual(self.read(dest_path), self.read(dest_path.replace('profiled', 'plain', 1)))
+
+        report = profiler.report(top=1)
+        self.assertEqual(report['pages'], 2)
+        self.assertListEqual(list(report['stages']), ['read', 'block split', 'inline parse', 'html serialize', 'template', 'write'])
+        self.assertEqual(len(report['slowest_pages']), 1)
+        self.assertIn(report['slowest_pages'][0]['page'], ['content/index.md', 'content/blog/tom/index.md'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,6 @@
 import unittest
+import io
+import sys
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
@@ -72,5 +74,29 @@ class TestParentNode(unittest.TestCase):
         body_result = f"<body><h1>Mega title</h1>{p_result}</body>"
         self.assertEqual(body_node.to_html(), body_result)
 
+    def test_iter_html(self):
+        list_node = ParentNode("ul", [
+            ParentNode("li", [LeafNode("b", "One")]),
+            ParentNode("li", [LeafNode(None, "Two "), LeafNode("a", "three", {"href": "/3"})]),
+        ], {"class": "items"})
+        self.assertListEqual(list(list_node.iter_html()), [
+            '<ul class="items">', '<li>', '<b>One</b>', '</li>', '<li>', 'Two ', '<a href="/3">three</a>', '</li>', '</ul>',
+        ])
+        stream = io.StringIO()
+        list_node.write_html(stream)
+        self.assertEqual(stream.getvalue(), list_node.to_html())
+
+        with self.assertRaises(ValueError):
+            ParentNode("div", [ParentNode("p", [])]).to_html()
+        with self.assertRaises(NotImplementedError):
+            HTMLNode("p", "text").to_html()
+
+    def test_deep_tree(self):
+        depth = sys.getrecursionlimit() * 2
+        node = LeafNode(None, "deep")
+        for _ in range(depth):
+            node = ParentNode("div", [node])
+        self.assertEqual(node.to_html(), "<div>" * depth + "deep" + "</div>" * depth)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,46 @@
+import unittest
+
+from copy_static import sync_static
+from fingerprint import asset_map
+from generate_page import generate_pages_recursive
+from link_checker import check_links, site_index, source_links, target, template_sources
+from manifest import new_manifest
+from testing import SiteTestCase
+
+class TestLinkChecker(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write('static/index.css', 'body {}')
+        self.write('static/images/tom.png', 'png')
+        self.write('content/index.md', '# Home\n\n[Tom](/blog/tom/) and [old](/blog/old.html)\n\n![Tom](/images/tom.png)')
+        self.write('content/blog/tom/index.md', '# Tom\n\n[home](/#top) [missing](/blog/missing)\n\n```\n[code](/not/a/link)\n```')
+        self.write('template.html', '<link href="/index.css">\n<a href="/about">{{ Content }}</a>')
+
+    def build(self, basepath, fingerprint=False):
+        manifest = new_manifest()
+        sync_static('static', 'docs', manifest, fingerprint=fingerprint)
+        assets = asset_map(manifest, 'static', 'docs') if fingerprint else None
+        generate_pages_recursive('content', 'template.html', 'docs', basepath, manifest, assets=assets)
+        sources = [entry['source'] for entry in manifest['pages'].values()] + template_sources('template.html')
+        return sources, site_index(manifest, 'docs', basepath), assets
+
+    def test_source_links(self):
+        self.assertListEqual(list(source_links('content/blog/tom/index.md')), [(3, '/#top'), (3, '/blog/missing')])
+        self.assertListEqual(list(source_links('template.html')), [(1, '/index.css'), (2, '/about')])
+
+    def test_target(self):
+        self.assertEqual(target('/blog/my%20post.html?x=1#top', '/charlot/'), '/charlot/blog/my post.html')
+
+    def test_check_links(self):
+        for basepath, fingerprint, jobs in (('/', False, 1), ('/charlot/', True, 2)):
+            with self.subTest(basepath=basepath, fingerprint=fingerprint):
+                sources, index, assets = self.build(basepath, fingerprint)
+                self.assertListEqual(check_links(sources, index, basepath, assets, jobs), [
+                    ('content/blog/tom/index.md', 3, '/blog/missing'),
+                    ('content/index.md', 3, '/blog/old.html'),
+                    ('template.html', 2, '/about'),
+                ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import os
+from unittest import mock
+
+import listing
+from frontmatter import MetadataIndex
+from generate_page import generate_pages_recursive
+from listing import generate_listings, sort_items
+from manifest import new_manifest
+from testing import SiteTestCase
+
+class TestListing(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write('template.html', '<title>{{ Title }}</title>{{ Content }}')
+        self.write('content/index.md', '---\ntags: forest\n---\n# Home')
+        self.write('content/blog/tom.md', '---\ndate: 2024-05-01\ntags: [forest, Old Tom]\nsummary: Merry dol\n---\n# Tom')
+        self.write('content/blog/majesty.md', '---\ndate: 2024-06-01\n---\n# Majesty')
+        self.write('content/blog/glorfindel.md', '# Glorfindel')
+
+    def build(self, manifest, metadata):
+        generate_pages_recursive('content', 'template.html', 'docs', '/charlot/', manifest, metadata=metadata)
+        return sorted(generate_listings(manifest, metadata, 'content', 'template.html', 'docs', '/charlot/'))
+
+    def test_sort_items(self):
+        items = [['/b', 'B', None, None], ['/a', 'A', None, None], ['/c', 'C', '2024-01-01', None]]
+        self.assertListEqual([item[1] for item in sort_items(items)], ['C', 'A', 'B'])
+
+    @mock.patch.object(listing, 'PAGE_SIZE', 2)
+    def test_listings(self):
+        manifest, metadata = new_manifest(), MetadataIndex(None)
+        self.assertListEqual(self.build(manifest, metadata), [
+            'docs/blog/index.html', 'docs/blog/page/2.html', 'docs/tags/forest/index.html', 'docs/tags/old-tom/index.html',
+        ])
+        self.assertEqual(self.read('docs/blog/index.html'),
+            '<title>Blog</title><div><ul class="listing">'
+            '<li><a href="/charlot/blog/majesty.html">Majesty</a><time datetime="2024-06-01">2024-06-01</time></li>'
+            '<li><a href="/charlot/blog/tom.html">Tom</a><time datetime="2024-05-01">2024-05-01</time><p>Merry dol</p></li>'
+            '</ul><nav><a href="/charlot/blog/page/2.html" rel="next">Older</a></nav></div>')
+        self.assertIn('<a href="/charlot/blog/index.html" rel="prev">Newer</a>', self.read('docs/blog/page/2.html'))
+        self.assertIn('<title>Tagged forest</title>', self.read('docs/tags/forest/index.html'))
+
+        # Nothing changed, and an edit that leaves the metadata alone lists nothing again
+        self.assertListEqual(self.build(manifest, metadata), [])
+        self.write('content/blog/glorfindel.md', '# Glorfindel\n\nof Gondolin')
+        self.assertListEqual(self.build(manifest, metadata), [])
+
+        # Only the listing pages showing a changed page are written again
+        self.write('content/index.md', '---\ntags: forest\n---\n# Home again')
+        self.assertListEqual(self.build(manifest, metadata), ['docs/tags/forest/index.html'])
+
+        # Listing pages nothing belongs to anymore are removed
+        self.write('content/blog/tom.md', '# Tom')
+        self.assertListEqual(self.build(manifest, metadata), [
+            'docs/blog/index.html', 'docs/blog/page/2.html', 'docs/tags/forest/index.html',
+        ])
+        self.assertFalse(os.path.exists('docs/tags/old-tom'))
+
+    def test_hand_written_listing(self):
+        self.write('content/tags/old-tom/index.md', '# All about Tom')
+        manifest, metadata = new_manifest(), MetadataIndex(None)
+        self.assertNotIn('docs/tags/old-tom/index.html', self.build(manifest, metadata))
+        self.assertEqual(self.read('docs/tags/old-tom/index.html'), '<title>All about Tom</title><div><h1>All about Tom</h1></div>')
+        self.assertListEqual(self.build(manifest, metadata), [])
+        self.assertIn('All about Tom', self.read('docs/tags/old-tom/index.html'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import tempfile
+import io
+import os
+
+from htmlnode import LeafNode, ParentNode
+from minify import Minifier, minify_html, minify_segments
+from template import load_template
+from textnode import markdown_to_html_tree
+
+class TestMinify(unittest.TestCase):
+
+    def test_minify_html(self):
+        html = '<!doctype html>\n<html>\n  <head>\n    <meta charset="utf-8" />\n    <!-- styles -->\n    <link href="/index.css" rel="stylesheet">\n  </head>\n  <body>\n    <p>Old  <b>Tom</b> <i>Bombadil</i></p>\n    <pre class="x">  keep\n    this</pre>\n  </body>\n</html>\n'
+        self.assertEqual(
+            minify_html(html),
+            '<!doctype html><html><head><meta charset="utf-8"/><link href=/index.css rel=stylesheet></head>'
+            '<body><p>Old <b>Tom</b> <i>Bombadil</i></p><pre class=x>  keep\n    this</pre></body></html>',
+        )
+        self.assertEqual(minify_html('<a title="Old Tom">x</a>'), '<a title="Old Tom">x</a>')
+        self.assertEqual(minify_html('<!--[if IE]><p>IE</p><![endif]-->'), '<!--[if IE]><p>IE</p><![endif]-->')
+
+    def test_minify_segments(self):
+        segments = ['<title>\n  ', 'Title', '\n</title>\n<a href="', 'Home', '">home</a>']
+        self.assertListEqual(minify_segments(segments), ['<title> ', 'Title', ' </title><a href="', 'Home', '">home</a>'])
+
+    def test_minify_segments_slot_in_comment(self):
+        segments = ['<html>\n<!-- page ', 'Title', ' -->\n<body>', 'Content', '</body></html>']
+        self.assertListEqual(minify_segments(segments),
+                             ['<html><!-- page ', 'Title', ' --><body>', 'Content', '</body></html>'])
+
+    def test_minifier(self):
+        node = ParentNode('div', [
+            ParentNode('p', [LeafNode(None, 'Old   Tom\n Bombadil'), LeafNode('a', 'Tom', {'href': '/tom', 'class': 'name'})]),
+            ParentNode('pre', [ParentNode('code', [LeafNode(None, 'def  tom():\n    pass')])]),
+        ])
+        minifier = Minifier()
+        html = ''.join(node.iter_html(minifier))
+        self.assertEqual(html, '<div><p>Old Tom Bombadil<a href="/tom" class=name>Tom</a></p><pre><code>def  tom():\n    pass</code></pre></div>')
+        self.assertEqual(minifier.saved, len(node.to_html()) - len(html))
+
+    def test_write_minified(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            template_path = os.path.join(tmp_dir, 'template.html')
+            with open(template_path, 'w') as template_file:
+                template_file.write('<html>\n  <head>\n    <title>{{ Title }}</title>\n    <link href="/index.css" rel="stylesheet">\n  </head>\n  <body>\n    <article>{{ Content }}</article>\n  </body>\n</html>\n')
+            template = load_template(template_path)
+        content = markdown_to_html_tree('# Tom\n\nOld  Tom [Bombadil](/tom)\n\n```\nkeep   this\n```')
+        values = {'Title': 'Tom', 'Content': content}
+        for basepath in ('/', '/charlot/'):
+            stream = io.StringIO()
+            minifier = Minifier()
+            template.write(stream, values, basepath, minifier=minifier)
+            html = stream.getvalue()
+            self.assertEqual(html, template.render(values, basepath, minifier=Minifier()))
+            self.assertEqual(minifier.saved, len(template.render(values, basepath)) - len(html))
+            self.assertIn(f'<link href={basepath}index.css rel=stylesheet>', html)
+            self.assertIn(f'<a href="{basepath}tom">Bombadil</a>', html)
+            self.assertIn('<pre><code>keep   this</code></pre>', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import json
+import os
+
+from output import OutputFile, mark_deployed, update_deploy_manifest, write_output
+from testing import SiteTestCase
+
+class TestOutput(SiteTestCase):
+
+    def age(self, path):
+        os.utime(path, ns=(0, 0))
+
+    def test_write_output(self):
+        self.assertTrue(write_output('page.html', 'Old Tom Bombadil'))
+        self.age('page.html')
+        self.assertFalse(write_output('page.html', 'Old Tom Bombadil'))
+        self.assertEqual(os.stat('page.html').st_mtime_ns, 0)
+
+        for text in ('Old Tom Bombadil is a merry fellow', 'Old Tom', 'Old Tim Bombadil', ''):
+            with self.subTest(text=text):
+                self.assertTrue(write_output('page.html', text))
+                self.assertEqual(self.read('page.html'), text)
+        self.assertListEqual(os.listdir('.'), ['page.html'])
+
+    def test_streamed_output(self):
+        chunks = [f'<p>{idx}</p>' * 1000 for idx in range(50)]
+        write_output('page.html', ''.join(chunks))
+        self.age('page.html')
+        chunks[30] = 'changed'
+        with OutputFile('page.html') as page_file:
+            for chunk in chunks:
+                page_file.write(chunk)
+        self.assertEqual(self.read('page.html'), ''.join(chunks))
+
+    def test_failed_output(self):
+        write_output('page.html', 'Old Tom Bombadil')
+        with self.assertRaises(ValueError):
+            with OutputFile('page.html') as page_file:
+                page_file.write('Half a page')
+                raise ValueError("bad page")
+        self.assertEqual(self.read('page.html'), 'Old Tom Bombadil')
+        self.assertListEqual(os.listdir('.'), ['page.html'])
+        with self.assertRaises(FileNotFoundError):
+            OutputFile('missing/page.html')
+
+    def test_deploy_manifest(self):
+        os.makedirs('docs/blog')
+        write_output('docs/index.html', 'Home')
+        write_output('docs/blog/tom.html', 'Tom')
+        write_output('docs/about.html', 'About')
+        write_output('docs/left.html.123-456.tmp', 'Crashed')
+        built, changes = update_deploy_manifest('docs')
+        self.assertListEqual(sorted(changes['added']), ['about.html', 'blog/tom.html', 'index.html'])
+        self.assertDictEqual(built, changes)
+        with open('.charlot/deploy.json') as deploy_file:
+            self.assertDictEqual(json.load(deploy_file), changes)
+        mark_deployed()
+        with open('.charlot/deploy.json') as deploy_file:
+            self.assertDictEqual(json.load(deploy_file)['added'], {})
+
+        # Touched, changed, added and removed
+        os.utime('docs/blog/tom.html', ns=(0, 0))
+        write_output('docs/index.html', 'Home again')
+        write_output('docs/blog/glorfindel.html', 'Glorfindel')
+        os.remove('docs/about.html')
+        built, changes = update_deploy_manifest('docs')
+        self.assertListEqual(list(changes['added']), ['blog/glorfindel.html'])
+        self.assertListEqual(list(changes['changed']), ['index.html'])
+        self.assertListEqual(changes['removed'], ['about.html'])
+
+        # Changes not deployed yet are kept by the next builds
+        write_output('docs/blog/tom.html', 'Tom again')
+        built, changes = update_deploy_manifest('docs')
+        self.assertListEqual(list(built['changed']), ['blog/tom.html'])
+        self.assertListEqual(list(changes['added']), ['blog/glorfindel.html'])
+        self.assertListEqual(list(changes['changed']), ['blog/tom.html', 'index.html'])
+        self.assertListEqual(changes['removed'], ['about.html'])
+
+        mark_deployed()
+        built, changes = update_deploy_manifest('docs')
+        self.assertEqual((changes['added'], changes['changed'], changes['removed']), ({}, {}, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
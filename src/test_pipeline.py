@@ -0,0 +1,53 @@
+import unittest
+import tempfile
+import os
+import threading
+
+from pipeline import make_dirs, run_pipeline
+
+class TestPipeline(unittest.TestCase):
+
+    def test_run_pipeline(self):
+        written = {}
+        def read(item):
+            if item == 3:
+                raise OSError("unreadable")
+            return item * 10
+        def render(item, data):
+            if item == 5:
+                raise ValueError("bad page")
+            return data + 1
+        def write(item, output):
+            if item == 7:
+                raise OSError("disk full")
+            written[item] = output
+
+        errors = run_pipeline(range(100), read, render, write, readers=3, writers=2, queue_size=4, write_batch=3)
+        self.assertListEqual(sorted(errors), [3, 5, 7])
+        self.assertIsInstance(errors[5], ValueError)
+        self.assertDictEqual(written, {item: item * 10 + 1 for item in range(100) if item not in (3, 5, 7)})
+
+    def test_bounded(self):
+        # Items read but not written yet never exceed what the queues and stages can hold
+        lock = threading.Lock()
+        in_flight = [0, 0]
+        def read(item):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            return item
+        def write(item, output):
+            with lock:
+                in_flight[0] -= 1
+        readers, writers, queue_size, write_batch = 2, 2, 4, 2
+        run_pipeline(range(1000), read, lambda item, data: data, write, readers, writers, queue_size, write_batch)
+        self.assertLessEqual(in_flight[1], readers + 2 * queue_size + 1 + writers * write_batch)
+
+    def test_make_dirs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            make_dirs(os.path.join(tmp_dir, path) for path in ('docs/a/b/x.html', 'docs/a/y.html', 'docs/c/z.html', 'top.html'))
+            for dir_path in ('docs/a/b', 'docs/c'):
+                self.assertTrue(os.path.isdir(os.path.join(tmp_dir, dir_path)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+import struct
+import zlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from copy_static import sync_static
+from manifest import new_manifest
+from pngopt import PNG_SIGNATURE, optimize_png, optimize_pngs, read_chunks, write_chunk
+
+def make_png(width=64, height=64, level=1, extra_chunks=()):
+    """An 8-bit RGB PNG with a gradient, its image data deflated at the given level"""
+    rows = b''.join(b'\x00' + bytes((x + y) % 256 for x in range(width) for _ in range(3)) for y in range(height))
+    chunks = [write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))]
+    chunks.extend(write_chunk(chunk_type, chunk_data) for chunk_type, chunk_data in extra_chunks)
+    chunks.append(write_chunk(b'IDAT', zlib.compress(rows, level)))
+    chunks.append(write_chunk(b'IEND', b''))
+    return PNG_SIGNATURE + b''.join(chunks)
+
+def pixels(data):
+    return zlib.decompress(b''.join(chunk_data for chunk_type, chunk_data in read_chunks(data) if chunk_type == b'IDAT'))
+
+class TestPngOpt(unittest.TestCase):
+
+    def test_optimize_png(self):
+        data = make_png(extra_chunks=[(b'tEXt', b'Comment\x00' + b'x' * 500), (b'gAMA', struct.pack('>I', 45455))])
+        optimized = optimize_png(data)
+        self.assertLess(len(optimized), len(data))
+        self.assertEqual(pixels(optimized), pixels(data))
+        self.assertListEqual([chunk_type for chunk_type, _ in read_chunks(optimized)], [b'IHDR', b'gAMA', b'IDAT', b'IEND'])
+        # Already optimal images come back unchanged
+        self.assertEqual(optimize_png(optimized), optimized)
+
+    def test_animated_png(self):
+        data = make_png(extra_chunks=[(b'acTL', struct.pack('>II', 1, 0))])
+        self.assertEqual(optimize_png(data), data)
+
+    def test_corrupt_png(self):
+        data = bytearray(make_png())
+        data[-20] ^= 0xff
+        with self.assertRaises(ValueError):
+            optimize_png(bytes(data))
+        with self.assertRaises(ValueError):
+            optimize_png(b'GIF89a')
+
+    def test_optimize_pngs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            static_dir = os.path.join(tmp_dir, 'static')
+            cache_dir = os.path.join(tmp_dir, 'cache')
+            os.makedirs(static_dir)
+            for name, data in (('a.png', make_png(extra_chunks=[(b'tEXt', b'a\x00' + b'a' * 300)])), ('bad.png', b'nope')):
+                with open(os.path.join(static_dir, name), 'wb') as png_file:
+                    png_file.write(data)
+            manifest = new_manifest()
+            cached = optimize_pngs(static_dir, manifest, cache_dir)
+            # The PNG that fails to decode is cached as it is, and not tried again
+            self.assertCountEqual(cached, [os.path.join(static_dir, 'a.png'), os.path.join(static_dir, 'bad.png')])
+            with open(cached[os.path.join(static_dir, 'bad.png')], 'rb') as cache_file:
+                self.assertEqual(cache_file.read(), b'nope')
+            with mock.patch('pngopt.optimize_png') as optimize:
+                self.assertEqual(optimize_pngs(static_dir, manifest, cache_dir), cached)
+                optimize.assert_not_called()
+
+            # Optimized images are published under the original names
+            docs_dir = os.path.join(tmp_dir, 'docs')
+            sync_static(static_dir, docs_dir, manifest, replacements=cached)
+            with open(os.path.join(docs_dir, 'a.png'), 'rb') as png_file, open(cached[os.path.join(static_dir, 'a.png')], 'rb') as cache_file:
+                self.assertEqual(png_file.read(), cache_file.read())
+            self.assertListEqual(sync_static(static_dir, docs_dir, manifest, replacements=cached), [])
+
+            # The cached files of removed PNGs are deleted
+            os.remove(os.path.join(static_dir, 'bad.png'))
+            optimize_pngs(static_dir, manifest, cache_dir)
+            self.assertListEqual(os.listdir(cache_dir), [os.path.basename(cached[os.path.join(static_dir, 'a.png')])])
+
+    def test_unreadable_png(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            static_dir = os.path.join(tmp_dir, 'static')
+            os.makedirs(static_dir)
+            with open(os.path.join(static_dir, 'a.png'), 'wb') as png_file:
+                png_file.write(make_png())
+            with mock.patch('pngopt.optimize_png', side_effect=PermissionError("denied")):
+                # Run in this process, for the mock to apply
+                with mock.patch('pngopt.ProcessPoolExecutor', ThreadPoolExecutor):
+                    cached = optimize_pngs(static_dir, new_manifest(), os.path.join(tmp_dir, 'cache'))
+            self.assertDictEqual(cached, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
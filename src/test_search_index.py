@@ -0,0 +1,83 @@
+import unittest
+import json
+import os
+import shutil
+
+from generate_page import generate_pages_recursive
+from htmlnode import FragmentNode, LeafNode, ParentNode
+from manifest import new_manifest
+from search_index import page_terms, postings, record_path, update_search_index
+from testing import SiteTestCase
+
+class TestSearchIndex(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write('content/index.md', '# Home\n\nWelcome to the shire')
+        self.write('content/blog/tom/index.md', '# Tom\n\nOld Tom Bombadil, welcome')
+        self.write('template.html', '<title>{{ Title }}</title>{{ Content }}')
+
+    def read_json(self, path):
+        with open(path, 'r') as file:
+            return json.load(file)
+
+    def build(self, manifest):
+        generated = generate_pages_recursive('content', 'template.html', 'docs', '/charlot/', manifest,
+                                             search_records='.charlot/search')
+        return update_search_index(manifest['pages'], generated, 'docs', '/charlot/')
+
+    def test_page_terms(self):
+        content = ParentNode('div', [
+            LeafNode('h1', 'Old Tom'),
+            FragmentNode('<p>Tom <b>Bombadil</b> a</p>'),
+        ])
+        self.assertDictEqual(page_terms(content), {'old': [0], 'tom': [1, 2], 'bombadil': [3]})
+        self.assertListEqual(postings(4, [1, 5, 6]), [4, 1, 4, 1])
+
+    def test_incremental_index(self):
+        manifest = new_manifest()
+        self.assertListEqual(self.build(manifest), ['bo', 'ho', 'ol', 'sh', 'th', 'to', 'we'])
+        pages = self.read_json('docs/search/pages.json')
+        self.assertEqual(pages['prefix_size'], 2)
+        self.assertCountEqual(pages['pages'].values(), [
+            ['/charlot/index.html', 'Home'], ['/charlot/blog/tom/index.html', 'Tom'],
+        ])
+        ids = {url: int(id) for id, (url, _) in pages['pages'].items()}
+        home_id, tom_id = ids['/charlot/index.html'], ids['/charlot/blog/tom/index.html']
+        self.assertListEqual(self.read_json('docs/search/we.json')['welcome'], sorted([[home_id, 1], [tom_id, 4]]))
+
+        # Nothing changed, nothing rewritten
+        self.assertListEqual(self.build(manifest), [])
+
+        # Only the shards with terms of the edited page are rewritten, and ids are kept
+        self.write('content/index.md', '# Home\n\nWelcome home')
+        self.assertListEqual(self.build(manifest), ['ho', 'sh', 'th', 'to', 'we'])
+        self.assertFalse(os.path.exists('docs/search/sh.json'))
+        self.assertListEqual(self.read_json('docs/search/ho.json')['home'], [[home_id, 0, 2]])
+        self.assertListEqual(self.read_json('docs/search/to.json')['tom'], [[tom_id, 0, 2]])
+
+        # Removed pages leave the index
+        os.remove('content/blog/tom/index.md')
+        self.build(manifest)
+        self.assertListEqual(list(self.read_json('docs/search/pages.json')['pages']), [str(home_id)])
+        self.assertFalse(os.path.exists('docs/search/bo.json'))
+
+    def test_missing_records(self):
+        manifest = new_manifest()
+        self.build(manifest)
+        shutil.rmtree('.charlot/search')
+        self.build(manifest)
+        self.assertCountEqual([url for url, _ in self.read_json('docs/search/pages.json')['pages'].values()],
+                              ['/charlot/index.html', '/charlot/blog/tom/index.html'])
+
+        # An unchanged page whose record is lost is rendered again, not left out of the index
+        os.remove(record_path('.charlot/search', 'docs/index.html'))
+        self.assertIn('we', self.build(manifest))
+        self.assertEqual(len(self.read_json('docs/search/we.json')['welcome']), 2)
+
+        # Nothing rendered, no records directory
+        shutil.rmtree('.charlot/search')
+        update_search_index([], [], 'docs')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import os
+
+from build import BuildConfig
+from daemon import BuildDaemon
+from serve import changed_paths, inject_reload_script, rebuild, snapshot, RELOAD_SCRIPT
+from testing import SiteTestCase
+
+class TestServe(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write('content/index.md', '# Home\n\nWelcome')
+        self.write('content/blog/tom/index.md', '# Tom\n\nOld Tom Bombadil')
+        self.write('static/index.css', 'body {}')
+        self.write('template.html', '<html><body>{{ Content }}</body></html>')
+
+    def test_changed_paths(self):
+        states = snapshot(['content', 'static', 'template.html'])
+        self.assertIn('template.html', states)
+        self.assertEqual(changed_paths(states, snapshot(['content', 'static', 'template.html'])), set())
+        self.write('content/index.md', '# Home\n\nWelcome back')
+        os.remove('static/index.css')
+        self.write('content/new.md', '# New')
+        self.assertEqual(changed_paths(states, snapshot(['content', 'static', 'template.html'])),
+                         {'content/index.md', 'static/index.css', 'content/new.md'})
+
+    def test_inject_reload_script(self):
+        self.assertEqual(inject_reload_script('<body>x</body>'), f'<body>x{RELOAD_SCRIPT}</body>')
+        self.assertEqual(inject_reload_script('x'), f'x{RELOAD_SCRIPT}')
+
+    def test_rebuild(self):
+        builder, config = BuildDaemon(), BuildConfig(minify=True)
+        rebuild(builder, config)
+        self.assertTrue(os.path.isfile('docs/index.css'))
+        self.assertTrue(os.path.isfile('.charlot/manifest.json'))
+
+        self.write('content/index.md', '# Home\n\nWelcome back')
+        self.write('content/blog/glorfindel.md', '# Glorfindel')
+        blog_mtime = os.stat('docs/blog/tom/index.html').st_mtime_ns
+        result = rebuild(builder, config)
+        self.assertListEqual(sorted(result.pages), ['docs/blog/glorfindel.html', 'docs/index.html'])
+        with open('docs/index.html') as file:
+            self.assertIn('Welcome back', file.read())
+        self.assertEqual(os.stat('docs/blog/tom/index.html').st_mtime_ns, blog_mtime)
+        # Listing pages follow the pages they list
+        with open('docs/blog/index.html') as file:
+            self.assertIn('Glorfindel', file.read())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import os
+import xml.etree.ElementTree as ET
+
+from manifest import page_entry
+from sitemap import page_url, remove_sitemap, write_feed, write_sitemap
+from testing import SiteTestCase
+
+SITEMAP = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+class TestSitemap(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pages = {}
+        self.add_page('content/index.md', 'docs/index.html', '# Home', 1_700_000_000)
+        self.add_page('content/blog/tom.md', 'docs/blog/tom.html', '# Tom & Goldberry', 1_700_000_100)
+        self.add_page('content/blog/old/index.md', 'docs/blog/old/index.html', '# Old', 1_600_000_000)
+        os.makedirs('docs', exist_ok=True)
+
+    def add_page(self, from_path, dest_path, text, mtime):
+        os.makedirs(os.path.dirname(from_path), exist_ok=True)
+        with open(from_path, 'w') as file:
+            file.write(text)
+        os.utime(from_path, (mtime, mtime))
+        self.pages[dest_path] = page_entry(from_path, '', '', '/charlot/')
+
+    def test_page_url(self):
+        self.assertEqual(page_url('docs/blog/old/index.html', 'docs', 'https://x.dev/', '/charlot/'), 'https://x.dev/charlot/blog/old/')
+        self.assertEqual(page_url('docs/blog/tom.html', 'docs', 'https://x.dev', '/'), 'https://x.dev/blog/tom.html')
+
+    def test_sitemap(self):
+        self.assertListEqual(write_sitemap(self.pages, 'docs', 'https://x.dev', '/charlot/'), ['docs/sitemap.xml'])
+        urls = ET.parse('docs/sitemap.xml').getroot().findall(f'{SITEMAP}url')
+        self.assertListEqual([(url.find(f'{SITEMAP}loc').text, url.find(f'{SITEMAP}lastmod').text) for url in urls], [
+            ('https://x.dev/charlot/blog/old/', '2020-09-13T12:26:40Z'),
+            ('https://x.dev/charlot/blog/tom.html', '2023-11-14T22:15:00Z'),
+            ('https://x.dev/charlot/', '2023-11-14T22:13:20Z'),
+        ])
+
+    def test_sitemap_listings(self):
+        os.makedirs('docs/tags/tom')
+        with open('docs/tags/tom/index.html', 'w') as file:
+            file.write('Tagged tom')
+        os.utime('docs/tags/tom/index.html', (1_700_000_200, 1_700_000_200))
+        write_sitemap(self.pages, 'docs', 'https://x.dev', listings={'docs/tags/tom/index.html': ''})
+        urls = ET.parse('docs/sitemap.xml').getroot().findall(f'{SITEMAP}url')
+        self.assertIn(('https://x.dev/tags/tom/', '2023-11-14T22:16:40Z'),
+                      [(url.find(f'{SITEMAP}loc').text, url.find(f'{SITEMAP}lastmod').text) for url in urls])
+
+    def test_remove_sitemap(self):
+        write_sitemap(self.pages, 'docs', 'https://x.dev', max_urls=2)
+        write_feed(self.pages, 'content', 'docs', 'https://x.dev')
+        with open('docs/robots.txt', 'w') as file:
+            file.write('User-agent: *')
+        remove_sitemap('docs', keep={'docs/sitemap-2.xml'})
+        self.assertListEqual(sorted(os.listdir('docs')), ['blog', 'robots.txt', 'sitemap-2.xml'])
+        self.assertListEqual(os.listdir('docs/blog'), [])
+
+    def test_sitemap_index(self):
+        written = write_sitemap(self.pages, 'docs', 'https://x.dev', max_urls=2)
+        self.assertListEqual(written, ['docs/sitemap-1.xml', 'docs/sitemap-2.xml', 'docs/sitemap.xml'])
+        index = ET.parse('docs/sitemap.xml').getroot()
+        self.assertEqual(index.tag, f'{SITEMAP}sitemapindex')
+        self.assertListEqual([loc.text for loc in index.iter(f'{SITEMAP}loc')],
+                             ['https://x.dev/sitemap-1.xml', 'https://x.dev/sitemap-2.xml'])
+        self.assertEqual(len(ET.parse('docs/sitemap-2.xml').getroot()), 1)
+
+        # Parts of a bigger site are removed once they fit in one sitemap
+        write_sitemap(self.pages, 'docs', 'https://x.dev')
+        self.assertListEqual(sorted(os.listdir('docs')), ['sitemap.xml'])
+
+    def test_feed(self):
+        self.assertEqual(write_feed(self.pages, 'content', 'docs', 'https://x.dev', '/charlot/'), 'docs/blog/atom.xml')
+        feed = ET.parse('docs/blog/atom.xml').getroot()
+        self.assertEqual(feed.find(f'{ATOM}updated').text, '2023-11-14T22:15:00Z')
+        entries = feed.findall(f'{ATOM}entry')
+        self.assertListEqual([entry.find(f'{ATOM}title').text for entry in entries], ['Tom & Goldberry', 'Old'])
+        self.assertEqual(entries[0].find(f'{ATOM}link').get('href'), 'https://x.dev/charlot/blog/tom.html')
+        self.assertIsNone(write_feed(self.pages, 'content', 'docs', 'https://x.dev', feed_dir='news'))
+
+if __name__ == '__main__':
+    unittest.main()
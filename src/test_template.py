@@ -0,0 +1,94 @@
+import unittest
+import io
+import os
+
+from htmlnode import LeafNode, ParentNode
+from template import compile_template, load_template, select_template, rewrite_urls, UrlRewriter
+from testing import SiteTestCase
+
+class TestTemplate(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.write('template.html', '<title>{{ Title }}</title>{{> header }}<article>{{Content}}</article><a href="{{ Home }}">home</a>')
+        self.write('templates/partials/header.html', '<header><img src="/logo.png">{{ Title }}</header>')
+
+    def test_compile(self):
+        template = compile_template('template.html')
+        self.assertListEqual(template.segments, [
+            '<title>', 'Title', '</title><header><img src="/logo.png">', 'Title',
+            '</header><article>', 'Content', '</article><a href="', 'Home', '">home</a>',
+        ])
+        self.assertIn('templates/partials/header.html', template.dependencies)
+
+    def test_render(self):
+        template = load_template('template.html')
+        values = {'Title': 'Tom', 'Content': '<p><a href="/blog/tom">Tom</a></p>', 'Home': '/'}
+        self.assertEqual(
+            template.render(values),
+            '<title>Tom</title><header><img src="/logo.png">Tom</header><article><p><a href="/blog/tom">Tom</a></p></article><a href="/">home</a>',
+        )
+        self.assertEqual(
+            template.render(values, '/charlot/'),
+            '<title>Tom</title><header><img src="/charlot/logo.png">Tom</header><article><p><a href="/charlot/blog/tom">Tom</a></p></article><a href="/charlot/">home</a>',
+        )
+        # Placeholders without a value render empty
+        self.assertEqual(template.render({}), '<title></title><header><img src="/logo.png"></header><article></article><a href="">home</a>')
+
+    def test_rewrite_urls(self):
+        self.assertEqual(rewrite_urls('<a href="/x"><img src="/y.png">', '/'), '<a href="/x"><img src="/y.png">')
+        self.assertEqual(rewrite_urls('<a href="/x"><img src="/y.png">', '/c/'), '<a href="/c/x"><img src="/c/y.png">')
+
+    def test_write(self):
+        template = load_template('template.html')
+        content = ParentNode('p', [LeafNode('a', 'Tom', {'href': '/blog/tom'}), LeafNode('img', '', {'src': '/tom.png'})])
+        values = {'Title': 'Tom', 'Content': content, 'Home': '/'}
+        for basepath in ('/', '/charlot/'):
+            stream = io.StringIO()
+            template.write(stream, values, basepath)
+            self.assertEqual(stream.getvalue(), template.render(values, basepath))
+
+    def test_url_rewriter(self):
+        html = '<a href="/x">x</a><img src="/y.png">'
+        for split in range(1, len(html)):
+            stream = io.StringIO()
+            rewriter = UrlRewriter(stream, '/c/')
+            rewriter.writelines([html[:split], html[split:]])
+            rewriter.close()
+            self.assertEqual(stream.getvalue(), '<a href="/c/x">x</a><img src="/c/y.png">')
+
+    def test_cache(self):
+        template = load_template('template.html')
+        self.assertIs(load_template('template.html'), template)
+
+        # Changing a partial recompiles every template including it
+        self.write('templates/partials/header.html', '<header>Charlot</header>')
+        os.utime('templates/partials/header.html', ns=(0, 0))
+        recompiled = load_template('template.html')
+        self.assertIsNot(recompiled, template)
+        self.assertNotEqual(recompiled.digest, template.digest)
+        self.assertIn('<header>Charlot</header>', recompiled.render({}))
+
+    def test_digest(self):
+        self.write('slot.html', '<h1>{{ Title }}</h1>')
+        self.write('literal.html', '<h1>Title</h1>')
+        self.assertNotEqual(compile_template('slot.html').digest, compile_template('literal.html').digest)
+
+    def test_bad_partials(self):
+        self.write('missing.html', '{{> nope }}')
+        with self.assertRaises(ValueError):
+            compile_template('missing.html')
+        self.write('templates/partials/loop.html', 'again {{> loop }}')
+        self.write('loop.html', '{{> loop }}')
+        with self.assertRaises(ValueError):
+            compile_template('loop.html')
+
+    def test_select_template(self):
+        self.write('templates/blog.html', '<main>{{ Content }}</main>')
+        self.assertEqual(select_template('content/index.md', 'content', 'template.html'), 'template.html')
+        self.assertEqual(select_template('content/blog/tom/index.md', 'content', 'template.html'), 'templates/blog.html')
+        self.assertEqual(select_template('content/contact/index.md', 'content', 'template.html'), 'template.html')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,9 @@
 import unittest
+import io
+import random
+import time
 
+from bench_textnode import text_to_textnodes_multipass
 from textnode import (
     TextNode,
     TextType,
@@ -10,13 +14,34 @@ from textnode import (
     extract_emails,
     split_nodes,
     text_to_textnodes,
+    EMAIL_PATTERN,
     markdown_to_blocks,
     BlockType,
+    Block,
     block_to_block_type,
+    classify_block,
+    scan_blocks,
     markdown_to_html_node,
     extract_title,
+    capture_heading,
 )
 
+# Adversarial lines, each ~100k characters, that made the previous patterns backtrack
+ADVERSARIAL_INPUTS = {
+    'nested url path': "[a](" + "/a" * 50000 + " ",
+    'unclosed brackets': "[" * 100000,
+    'unclosed image brackets': "![" * 50000,
+    'long domain': "[a](http://" + "a." * 50000,
+    'open parentheses': "[a](/" + "(" * 100000,
+    'unclosed email': "<" + "a" * 100000,
+    'many emails openings': "<a@" * 30000,
+    'delimiters': "**_`" * 25000,
+    'heading': "# " + "a " * 50000 + "!",
+    'setext paragraph': "word " * 20000,
+    'setext brackets': "a]" * 50000 + "\n=",
+}
+TIME_BOUND = 1.0 # seconds, for what takes milliseconds in linear time
+
 class TestTextNode(unittest.TestCase):
     empty_node = TextNode("", TextType.NORMAL)
     normal_node = TextNode("This is a text node", TextType.NORMAL)
@@ -194,6 +219,25 @@ class TestTextNode(unittest.TestCase):
         ]
         self.assertListEqual(text_to_textnodes(text), expected_result)
 
+    def test_text_to_textnodes_matches_multipass(self):
+        edge_cases = [
+            "", "plain", "**", "**bold", "a **b** c **d", "_a **b** c_", "`a_b_c`", "**a_b_**", "***a***",
+            "a``b", "[x](/y)[z](/w)", "[x](/y)![i](/p.png)", "[x ![y](/a.png)](/b)", "![a](/x)![b](/y)",
+            "**a [l](http://x.com) b**", "_<a@b.co>_", "`[x](/y)`", "[li]nk](http://example)",
+        ]
+        pieces = [
+            "word", " ", "**", "_", "`", "*", "!", "[", "]", "(", ")", "<", ">", "/",
+            "[to boot dev](https://www.boot.dev)", "[rel](/blog/tom)", "![obi wan](https://i.imgur.com/fJRm4Vk.jpeg)",
+            "<john.doe@gmail.com>", "**bold**", "_italic_", "`code`",
+        ]
+        rng = random.Random(4)
+        lines = edge_cases + [''.join(rng.choices(pieces, k=rng.randint(1, 16))) for _ in range(5000)]
+        for line in lines:
+            # The multipass pipeline also splits emails out of link and image text, losing the link
+            if any(EMAIL_PATTERN.search(match[0]) for match in extract_links(line) + extract_images(line)):
+                continue
+            self.assertListEqual(text_to_textnodes(line), text_to_textnodes_multipass(line), line)
+
     def test_markdown_to_blocks(self):
         md = """This is **bolded** paragraph
 
@@ -211,6 +255,28 @@ This is the same paragraph on a new line
         blocks = markdown_to_blocks(md)
         self.assertEqual(blocks, expected_result)
 
+    def test_scan_blocks(self):
+        md = "\n\n# Title\n\n\n  para\nline  \n\n- a\n- b\n\n\n"
+        self.assertListEqual(list(scan_blocks(io.StringIO(md))), [
+            Block('', BlockType.PARAGRAPH, None, 1),
+            Block('# Title', BlockType.HEADING, ('Title', 1), 3),
+            Block('para\nline', BlockType.PARAGRAPH, None, 6),
+            Block('- a\n- b', BlockType.UNORDERED_LIST, None, 9),
+            Block('', BlockType.PARAGRAPH, None, 12),
+        ])
+
+    def test_scan_blocks_matches_split(self):
+        pieces = [
+            "\n", "\n", "\n", " ", "  \n", "\t", "> q", "> ", "- i", "- ", "1. a", "2. b", "3. ", "1.",
+            "```", "# T", "## t w", "#", "Title", "===", "---", "***", "___", "word", "[x]",
+        ]
+        rng = random.Random(23)
+        for _ in range(5000):
+            md = ''.join(rng.choices(pieces, k=rng.randint(0, 12)))
+            expected = [(block, *classify_block(block)) for block in markdown_to_blocks(md)]
+            blocks = [(block.text, block.block_type, block.heading) for block in scan_blocks(io.StringIO(md))]
+            self.assertListEqual(blocks, expected, repr(md))
+
     def test_capture_heading(self):
         good_headings = """# Heading 1
 
@@ -351,5 +417,42 @@ Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam sed sodales dolo
         with self.assertRaises(ValueError):
             extract_title(fail_case)
 
+class TestAdversarialInputs(unittest.TestCase):
+
+    def assertFast(self, func, text):
+        start = time.perf_counter()
+        func(text)
+        self.assertLess(time.perf_counter() - start, TIME_BOUND, f"{func.__name__} on {text[:20]!r}...")
+
+    def test_inline(self):
+        for name, text in ADVERSARIAL_INPUTS.items():
+            with self.subTest(name):
+                self.assertFast(text_to_textnodes, text)
+                self.assertFast(extract_links, text)
+                self.assertFast(extract_images, text)
+                self.assertFast(extract_emails, text)
+
+    def test_blocks(self):
+        for name, text in ADVERSARIAL_INPUTS.items():
+            with self.subTest(name):
+                self.assertFast(capture_heading, text)
+                self.assertFast(block_to_block_type, text)
+                self.assertFast(markdown_to_html_node, text)
+
+    def test_links(self):
+        # One level of parentheses is part of the URL
+        self.assertListEqual(extract_links("[Foo](/wiki/Foo_(bar))"), [("Foo", "/wiki/Foo_(bar)", "[Foo](/wiki/Foo_(bar))")])
+        # Adjacent links no longer merge into one through the URL
+        self.assertListEqual(extract_links("[a](/x)[b](/y)"), [("a", "/x", "[a](/x)"), ("b", "/y", "[b](/y)")])
+        self.assertListEqual(extract_links("[a [b](/c)"), [("b", "/c", "[b](/c)")])
+
+    def test_capture_heading(self):
+        self.assertEqual(capture_heading("## Heading, with comma"), ("Heading", 2))
+        self.assertEqual(capture_heading("[x] Heading 1\n==="), (" Heading 1", 1))
+        self.assertEqual(capture_heading("Heading 2\n---"), ("Heading 2", 2))
+        self.assertEqual(capture_heading("####### Heading"), ('', 0))
+        self.assertEqual(capture_heading("Heading]\n==="), ('', 0))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
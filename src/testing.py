@@ -0,0 +1,24 @@
+import unittest
+import tempfile
+import os
+
+class SiteTestCase(unittest.TestCase):
+    """Runs each test in an empty temporary directory, where the site's files are written"""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(text)
+
+    def read(self, path):
+        with open(path, 'r') as file:
+            return file.read()
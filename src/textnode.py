@@ -5,14 +5,27 @@ import re
 from htmlnode import LeafNode, ParentNode
 
 
-LINK_REGEX = r"\[([^\]]+)\]\(((?:http[s]?:\/\/(?:[\w\-]+\.)+[\w-]+)?(?:\/[\S]*)*(?:\.\w+)?)\)"
+# Every pattern must match in linear time: no quantified group may match the same text in
+# more than one way, or a long non-matching line backtracks for minutes. The link text stops
+# at brackets and the URL path at whitespace and parentheses, allowing one level of (balanced).
+LINK_REGEX = r"\[([^\[\]]+)\]\(((?:https?://(?:[\w\-]+\.)+[\w-]+)?(?:/(?:[^\s()]|\([^\s()]*\))*)?(?:\.\w+)?)\)"
 EMAIL_REGEX = r"<([\w\-.+]+@[\w.]+)>"
-HEADING_REGEX = r"^(#{1,6} )((?:\s*\w*)+)"
-H1_REGEX = r"([^]]+)\n[=]{1,}$"
-H2_REGEX = r"([^]]+)\n[-]{1,}$"
+HEADING_REGEX = r"^(#{1,6} )([\s\w]*)"
+SETEXT_HEADING_REGEX = r"\n(=+|-+)\n?\Z"
 HR_REGEX = r"(^\*\*{1,}\*$)|(^--{1,}-$)|(^__{1,}_$)"
 
+IMAGE_PATTERN = re.compile(r"!" + LINK_REGEX)
+LINK_PATTERN = re.compile(LINK_REGEX)
+EMAIL_PATTERN = re.compile(EMAIL_REGEX)
+HEADING_PATTERN = re.compile(HEADING_REGEX)
+SETEXT_HEADING_PATTERN = re.compile(SETEXT_HEADING_REGEX)
+HR_PATTERN = re.compile(HR_REGEX)
+
 class TextType(Enum):
+    # Members are singletons: hash them by identity, in C, rather than through Enum.__hash__,
+    # since the inline parser looks text types up in dicts for every node
+    __hash__ = object.__hash__
+
     NORMAL = "normal"
     ITALIC = "italic"
     BOLD = "bold"
@@ -32,6 +45,8 @@ class BlockType(Enum):
 
 
 class TextNode:
+    __slots__ = ('text', 'text_type', 'url')
+
     def __init__(self, text, text_type, url = None):
         self.text = text
         self.text_type = text_type
@@ -45,24 +60,29 @@ class TextNode:
     def __repr__(self):
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
+# HTML tag of each inline text type, shared by text_node_to_html_node and inline_text_to_leaf
+TEXT_TYPE_TAGS = {
+    TextType.NORMAL: None,
+    TextType.ITALIC: "i",
+    TextType.BOLD: "b",
+    TextType.CODE: "code",
+    TextType.LINK: "a",
+    TextType.IMAGE: "img",
+    TextType.EMAIL: "a",
+}
+
 def text_node_to_html_node(text_node):
-    match text_node.text_type:
-        case TextType.NORMAL:
-            return LeafNode(None, text_node.text)
-        case TextType.ITALIC:
-            return LeafNode("i", text_node.text)
-        case TextType.BOLD:
-            return LeafNode("b", text_node.text)
-        case TextType.CODE:
-            return LeafNode("code", text_node.text)
-        case TextType.LINK:
-            return LeafNode("a", text_node.text, {"href": text_node.url})
-        case TextType.IMAGE:
-            return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
-        case TextType.EMAIL:
-            return LeafNode("a", "", {"src": text_node.url})
-        case _:
-            raise Exception(f"Node's text type {text_node.text_type} not supported.")
+    text_type = text_node.text_type
+    if text_type not in TEXT_TYPE_TAGS:
+        raise Exception(f"Node's text type {text_node.text_type} not supported.")
+    tag = TEXT_TYPE_TAGS[text_type]
+    if text_type is TextType.LINK:
+        return LeafNode(tag, text_node.text, {"href": text_node.url})
+    if text_type is TextType.IMAGE:
+        return LeafNode(tag, "", {"src": text_node.url, "alt": text_node.text})
+    if text_type is TextType.EMAIL:
+        return LeafNode(tag, "", {"src": text_node.url})
+    return LeafNode(tag, text_node.text)
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     if (delimiter == '**' and text_type is not TextType.BOLD
@@ -89,17 +109,17 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     return new_nodes
 
 def extract_images(text):
-    matches = re.findall(r"!"+LINK_REGEX, text)
+    matches = IMAGE_PATTERN.findall(text)
     matches_with_markdown = list(map(lambda x: (x[0], x[1], f"![{x[0]}]({x[1]})"), matches))
     return matches_with_markdown
 
 def extract_links(text):
-    matches = re.findall(LINK_REGEX, text)
+    matches = LINK_PATTERN.findall(text)
     matches_with_markdown = list(map(lambda x: (x[0], x[1], f"[{x[0]}]({x[1]})"), matches))
     return matches_with_markdown
 
 def extract_emails(text):
-    matches = re.findall(EMAIL_REGEX, text)
+    matches = EMAIL_PATTERN.findall(text)
     matches_with_delimiter = list(map(lambda x: (x, f"mailto:{x}", f"<{x}>"), matches))
     return matches_with_delimiter
 
@@ -122,140 +142,324 @@ def split_nodes(old_nodes, extractor, text_type):
             new_nodes.append(node)
     return new_nodes
 
+# Inline delimiters by precedence, each split out of the normal text the previous ones left
+DELIMITER_TYPES = (("**", TextType.BOLD), ("_", TextType.ITALIC), ("`", TextType.CODE))
+
+def split_delimiters(text):
+    """TextNodes of a line with no images, links or emails, split at the delimiters with
+    str.split, one pass per delimiter"""
+    nodes = [TextNode(text, TextType.NORMAL)]
+    for delimiter, text_type in DELIMITER_TYPES:
+        nodes = split_nodes_delimiter(nodes, delimiter, text_type)
+    return nodes
+
+def match_inline_element(text, position, token, endpos):
+    """Matches the image, link or email opened by token at position, as a TextNode and its end"""
+    if token == '![':
+        match = IMAGE_PATTERN.match(text, position)
+        if match:
+            return TextNode(match[1], TextType.IMAGE, match[2]), match.end()
+    elif token == '[':
+        match = LINK_PATTERN.match(text, position, endpos)
+        if match:
+            return TextNode(match[1], TextType.LINK, match[2]), match.end()
+    else:
+        match = EMAIL_PATTERN.match(text, position, endpos)
+        if match:
+            return TextNode(match[1], TextType.EMAIL, f"mailto:{match[1]}"), match.end()
+    return None, position
+
+# State machine of the inline scanner. Outside of images, links and emails a span of text is
+# normal, bold, italic or code, and each delimiter moves it to another state. Delimiters with
+# no transition are plain text in that state, and the scanner does not even stop at them.
+INLINE_TRANSITIONS = {
+    TextType.NORMAL: {'**': TextType.BOLD, '_': TextType.ITALIC, '`': TextType.CODE},
+    TextType.BOLD: {'**': TextType.NORMAL},
+    TextType.ITALIC: {'**': TextType.BOLD, '_': TextType.NORMAL},
+    TextType.CODE: {'**': TextType.BOLD, '_': TextType.ITALIC, '`': TextType.NORMAL},
+}
+INLINE_TOKEN_PATTERNS = {
+    state: re.compile('|'.join([r"!\[", r"\[", "<"] + list(map(re.escape, transitions))))
+    for state, transitions in INLINE_TRANSITIONS.items()
+}
+
 def text_to_textnodes(text):
-    initial_node = TextNode(text, TextType.NORMAL)
-    nodes = [initial_node]
-
-    nodes = split_nodes(nodes, extract_images, TextType.IMAGE)
-    nodes = split_nodes(nodes, extract_links, TextType.LINK)
-    nodes = split_nodes(nodes, extract_emails, TextType.EMAIL)
-
-    delimiters_types = [("**", TextType.BOLD), ("_", TextType.ITALIC), ("`", TextType.CODE)]
-    for delimiter, text_type in delimiters_types:
-        try:
-            nodes = split_nodes_delimiter(nodes, delimiter, text_type)
-        except ValueError as e:
-            print(f"Error {e}")
-            continue
+    """Splits a line of markdown into TextNodes in a single left-to-right pass.
+
+    Yields the same nodes as splitting out images, links, emails and then each delimiter in
+    turn (see bench_textnode.py): images, links and emails take precedence over delimiters
+    and close any open one, `**` takes precedence over `_`, which takes precedence over a
+    backtick, and an unclosed delimiter still applies up to the end of its span. Lines with
+    no `[` or `<` have none of the first three, and are split at their delimiters by
+    split_delimiters instead, as a Python step per delimiter is slower than str.split on
+    emphasis-heavy lines.
+    """
+    if not text:
+        return [TextNode(text, TextType.NORMAL)]
+    if '[' not in text and '<' not in text:
+        return split_delimiters(text)
+
+    nodes = []
+    state = TextType.NORMAL
+    search = INLINE_TOKEN_PATTERNS[state].search
+    start = position = 0
+    # Images are split out first, so links and emails must end before the next image
+    next_image = IMAGE_PATTERN.search(text)
+    while (match := search(text, position)):
+        token, idx = match[0], match.start()
+        if token in ('![', '[', '<'):
+            if next_image and next_image.start() < idx:
+                next_image = IMAGE_PATTERN.search(text, idx)
+            node, end = match_inline_element(text, idx, token, next_image.start() if next_image else len(text))
+            if node is None:
+                position = idx + 1
+                continue
+            if start < idx:
+                nodes.append(TextNode(text[start:idx], state))
+            nodes.append(node)
+            state = TextType.NORMAL
+        else:
+            if start < idx:
+                nodes.append(TextNode(text[start:idx], state))
+            state = INLINE_TRANSITIONS[state][token]
+            end = match.end()
+        search = INLINE_TOKEN_PATTERNS[state].search
+        start = position = end
+    if start < len(text):
+        nodes.append(TextNode(text[start:], state))
     return nodes
 
 def markdown_to_blocks(markdown):
     markdown_blocks = markdown.split('\n\n')
     return list(map(lambda x: x.strip(), markdown_blocks))
 
+class Block:
+    """A block of markdown_to_blocks, with its classify_block type and heading, and the source
+    line it starts on."""
+    __slots__ = ('text', 'block_type', 'heading', 'line')
+
+    def __init__(self, text, block_type, heading=None, line=1):
+        self.text = text
+        self.block_type = block_type
+        self.heading = heading
+        self.line = line
+
+    def __eq__(self, block):
+        return (self.text == block.text
+                and self.block_type == block.block_type
+                and self.heading == block.heading
+                and self.line == block.line)
+
+    def __repr__(self):
+        return f"Block({self.text!r}, {self.block_type.value}, {self.heading}, {self.line})"
+
+class BlockScanner:
+    """Classifies the lines of one block as they are read, each once.
+
+    The block is stripped like markdown_to_blocks strips it: blank lines before its first
+    line of text and after its last one do not count, and neither do the spaces before the
+    first and after the last. So the last line is only classified once the block ends.
+    """
+    def __init__(self, line):
+        self.parts = []
+        self.line = line
+        self.lines = 0
+        self.quotes = 0
+        self.items = 0
+        self.ordered = True
+        self.first = None
+        self.tail = None
+        self.blanks = 0
+
+    def add(self, line, number):
+        self.parts.append(line)
+        if line.isspace():
+            if self.first is not None:
+                self.blanks += 1
+            return
+        if self.first is None:
+            line = line.lstrip()
+            self.first = line.rstrip('\n')
+            self.line = number
+        else:
+            self.classify(self.tail)
+            if self.blanks:
+                self.lines += self.blanks
+                self.ordered = False
+                self.blanks = 0
+        self.tail = line
+
+    def classify(self, line):
+        self.quotes += line.startswith('> ')
+        self.items += line.startswith('- ')
+        if self.ordered:
+            self.ordered = line.startswith(f"{self.lines + 1}. ")
+        self.lines += 1
+
+    def finish(self):
+        text = ''.join(self.parts).strip()
+        if self.first is None:
+            return Block(text, BlockType.PARAGRAPH, None, self.line)
+        last = self.tail.rstrip()
+        self.classify(last)
+        first = last if self.lines == 1 else self.first
+        # Setext headings are underlined by a last line of only = or -
+        if first.startswith('#') or self.lines > 1 and (not last.strip('=') or not last.strip('-')):
+            heading = capture_heading(text)
+            if heading[0]:
+                return Block(text, BlockType.HEADING, heading, self.line)
+        if first == '```' and last == '```':
+            block_type = BlockType.CODE
+        elif self.quotes == self.lines:
+            block_type = BlockType.QUOTE
+        elif self.items == self.lines:
+            block_type = BlockType.UNORDERED_LIST
+        elif self.lines == 1 and HR_PATTERN.match(text):
+            block_type = BlockType.HORIZONTAL_RULE
+        elif self.ordered:
+            block_type = BlockType.ORDERED_LIST
+        else:
+            block_type = BlockType.PARAGRAPH
+        return Block(text, block_type, None, self.line)
+
+def scan_blocks(lines, first_line=1):
+    """Yields the blocks of markdown_to_blocks, typed by classify_block, from an iterable of
+    lines such as an open file, in a single pass.
+
+    Only the block being scanned is held in memory, not the whole markdown. As when splitting
+    on two newlines, an empty line ends a block unless it starts one.
+    """
+    scanner = BlockScanner(first_line)
+    for number, line in enumerate(lines, first_line):
+        if line == '\n' and scanner.parts:
+            yield scanner.finish()
+            scanner = BlockScanner(number + 1)
+        else:
+            scanner.add(line, number)
+    yield scanner.finish()
+
 def block_to_block_type(block):
+    return classify_block(block)[0]
+
+def classify_block(block):
+    """Returns the block type, and the (text, level) of the heading for heading blocks"""
     # Headings
-    result = capture_heading(block)
-    if result[0]:
-        return BlockType.HEADING
+    heading = capture_heading(block)
+    if heading[0]:
+        return BlockType.HEADING, heading
 
     # Code Block
     lines = block.split('\n')
     if lines[0] == '```' and lines[-1] == '```':
-        return BlockType.CODE
+        return BlockType.CODE, None
 
     # Quote Block, then Unordered list
     list_types = [('>', BlockType.QUOTE), ('-', BlockType.UNORDERED_LIST)]
     for list_type, block_type in list_types:
         if len(lines) == sum(list(map(lambda x: x.startswith(f"{list_type} "), lines))):
-            return block_type
+            return block_type, None
 
     # Horizontal Rule
-    match = re.match(HR_REGEX, block)
+    match = HR_PATTERN.match(block)
     if match:
-        return BlockType.HORIZONTAL_RULE
+        return BlockType.HORIZONTAL_RULE, None
 
     # Ordered List, otherwise is Paragraph
     for idx, line in enumerate(lines):
         if not line.startswith(f"{idx+1}. "):
-            return BlockType.PARAGRAPH
-    return BlockType.ORDERED_LIST
+            return BlockType.PARAGRAPH, None
+    return BlockType.ORDERED_LIST, None
 
 def capture_heading(markdown):
-    text = ''
-    num_hashtags = 0
-    match = re.findall(HEADING_REGEX, markdown)
-    if match:
-        hashtags, text = match[0]
-        num_hashtags = len(hashtags) - 1 # w/o space
-        return text, num_hashtags
-    match = re.findall(H1_REGEX, markdown)
+    """Returns the text and level of an ATX (`## Title`) or setext (`Title` over `===`) heading.
+
+    The text is empty when the markdown is no heading. At most one pattern runs, each in
+    linear time.
+    """
+    if markdown.startswith('#'):
+        match = HEADING_PATTERN.match(markdown)
+        if match:
+            hashtags, text = match.groups()
+            return text, len(hashtags) - 1 # w/o space
+    match = SETEXT_HEADING_PATTERN.search(markdown)
     if match:
-        text = match[0]
-        num_hashtags = 1
-        return text, num_hashtags
-    match = re.findall(H2_REGEX, markdown)
-    if match:
-        text = match[0]
-        num_hashtags = 2
-    return text, num_hashtags
+        # The text runs from the last closing bracket, if any, to the underline
+        text = markdown[:match.start()]
+        text = text[text.rfind(']') + 1:]
+        if text:
+            return text, 1 if match[1][0] == '=' else 2
+    return '', 0
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    super_html_node = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        match block_type:
-            case BlockType.PARAGRAPH:
-                lines = block.split('\n')
-                lines_of_text_nodes = list(map(text_to_textnodes, lines))
-                html_p = generate_leafnodes_list(lines_of_text_nodes)
-                html_p = list(map(lambda x: ParentNode('p', children=x), html_p))
-                if len(html_p) > 1:
-                    super_html_node.append(ParentNode('div', children=html_p))
-                else:
-                    super_html_node.append(html_p[0])
-            case BlockType.HEADING:
-                text, num_hashtags = capture_heading(block)
-                html_h = LeafNode(f"h{num_hashtags}", text)
-                super_html_node.append(html_h)
-            case BlockType.CODE:
-                lines = block.split('\n')
-                text_lines = '\n'.join(lines[1:-1])
-                super_html_node.append(ParentNode('pre', children=[ParentNode('code', children=[LeafNode(None, text_lines)])]))
-            case BlockType.ORDERED_LIST | BlockType.UNORDERED_LIST:
-                offset = 2 if block_type == BlockType.UNORDERED_LIST else 3
-                lines = block.split('\n')
-                text_lines = list(map(lambda x: x[offset:], lines))
-                lines_of_text_nodes = list(map(text_to_textnodes, text_lines))
-                html_p = generate_leafnodes_list(lines_of_text_nodes)
-                html_p = list(map(lambda x: ParentNode('li', children=x), html_p))
-                if block_type == BlockType.UNORDERED_LIST:
-                    super_html_node.append(ParentNode('ul', children=html_p))
-                else:
-                    super_html_node.append(ParentNode('ol', children=html_p))
-            case BlockType.QUOTE:
-                lines = block.split('\n')
-                text_lines = list(map(lambda x: x[2:], lines))
-                quoted_text = reduce(lambda x, y: f"{x} {y}", text_lines, '').strip()
-                lines_of_text_nodes = list(map(text_to_textnodes, [quoted_text]))
-                html_p = generate_leafnodes_list(lines_of_text_nodes)
-                super_html_node.append(ParentNode('blockquote', children=html_p[0]))
-            case BlockType.HORIZONTAL_RULE:
-                html_node = LeafNode('hr', None)
-                super_html_node.append(html_node)
-            case _:
-                raise Exception(f"Markdown block type {block_type} not supported.")
-    full_html = ParentNode('div', children=super_html_node)
-    return full_html.to_html()
+    return markdown_to_html_tree(markdown).to_html()
+
+def markdown_to_html_tree(markdown):
+    return blocks_to_html_tree(markdown_to_blocks(markdown))
+
+def blocks_to_html_tree(blocks):
+    return ParentNode('div', children=[block_to_html_node(block) for block in blocks])
+
+def scanned_html_tree(lines):
+    """The tree of markdown_to_html_tree, its blocks scanned lazily from lines as it is serialized"""
+    return ParentNode('div', children=(block_to_html_node(block.text, block.block_type, block.heading)
+                                       for block in scan_blocks(lines)))
+
+def block_to_html_node(block, block_type=None, heading=None):
+    """The HTML node of one block. It depends on the text of the block alone, classified
+    unless scan_blocks already did."""
+    if block_type is None:
+        block_type, heading = classify_block(block)
+    match block_type:
+        case BlockType.PARAGRAPH:
+            lines = block.split('\n')
+            lines_of_text_nodes = list(map(text_to_textnodes, lines))
+            html_p = generate_leafnodes_list(lines_of_text_nodes)
+            html_p = list(map(lambda x: ParentNode('p', children=x), html_p))
+            if len(html_p) > 1:
+                return ParentNode('div', children=html_p)
+            else:
+                return html_p[0]
+        case BlockType.HEADING:
+            text, num_hashtags = heading
+            html_h = LeafNode(f"h{num_hashtags}", text)
+            return html_h
+        case BlockType.CODE:
+            lines = block.split('\n')
+            text_lines = '\n'.join(lines[1:-1])
+            return ParentNode('pre', children=[ParentNode('code', children=[LeafNode(None, text_lines)])])
+        case BlockType.ORDERED_LIST | BlockType.UNORDERED_LIST:
+            offset = 2 if block_type == BlockType.UNORDERED_LIST else 3
+            lines = block.split('\n')
+            text_lines = list(map(lambda x: x[offset:], lines))
+            lines_of_text_nodes = list(map(text_to_textnodes, text_lines))
+            html_p = generate_leafnodes_list(lines_of_text_nodes)
+            html_p = list(map(lambda x: ParentNode('li', children=x), html_p))
+            if block_type == BlockType.UNORDERED_LIST:
+                return ParentNode('ul', children=html_p)
+            else:
+                return ParentNode('ol', children=html_p)
+        case BlockType.QUOTE:
+            lines = block.split('\n')
+            text_lines = list(map(lambda x: x[2:], lines))
+            quoted_text = reduce(lambda x, y: f"{x} {y}", text_lines, '').strip()
+            lines_of_text_nodes = list(map(text_to_textnodes, [quoted_text]))
+            html_p = generate_leafnodes_list(lines_of_text_nodes)
+            return ParentNode('blockquote', children=html_p[0])
+        case BlockType.HORIZONTAL_RULE:
+            html_node = LeafNode('hr', None)
+            return html_node
+        case _:
+            raise Exception(f"Markdown block type {block_type} not supported.")
 
 def inline_text_to_leaf(text_node):
-    match text_node.text_type:
-        case TextType.NORMAL:
-            html_node = LeafNode(tag='', value=text_node.text)
-        case TextType.BOLD:
-            html_node = LeafNode('b', text_node.text)
-        case TextType.ITALIC:
-            html_node = LeafNode('i', text_node.text)
-        case TextType.CODE:
-            html_node = LeafNode('code', text_node.text)
-        case (TextType.LINK | TextType.EMAIL):
-            html_node = LeafNode('a', text_node.text, {"href": text_node.url})
-        case TextType.IMAGE:
-            html_node = LeafNode('img', text_node.text, props={"src": text_node.url, "alt": text_node.text})
-        case _:
-            html_node = LeafNode('', text_node.text)
-    return html_node
+    text_type = text_node.text_type
+    if text_type is TextType.LINK or text_type is TextType.EMAIL:
+        props = {"href": text_node.url}
+    elif text_type is TextType.IMAGE:
+        props = {"src": text_node.url, "alt": text_node.text}
+    else:
+        props = None
+    return LeafNode(TEXT_TYPE_TAGS[text_type], text_node.text, props)
 
 def generate_leafnodes_list(lines_of_text_nodes):
     leaf_nodes_list = []
@@ -265,13 +469,17 @@ def generate_leafnodes_list(lines_of_text_nodes):
     return leaf_nodes_list
 
 def extract_title(markdown):
+    # The blocks of markdown_to_blocks, split one at a time up to the first heading
     H1_PREFIX = '# '
-    md_blocks = markdown_to_blocks(markdown)
-    heading_md = list(filter(lambda x: x.startswith(H1_PREFIX), md_blocks))
-    if heading_md:
-        return heading_md[0].split(H1_PREFIX)[1]
-    else:
-        raise ValueError("No h1 markdown syntax found. Should start with '# '.", 1)
+    start = 0
+    while True:
+        end = markdown.find('\n\n', start)
+        block = markdown[start:end if end != -1 else len(markdown)].strip()
+        if block.startswith(H1_PREFIX):
+            return block.split(H1_PREFIX)[1]
+        if end == -1:
+            raise ValueError("No h1 markdown syntax found. Should start with '# '.", 1)
+        start = end + 2
 
 if __name__ == '__main__':
     md = """